@@ -51,6 +51,7 @@ function Show-Help {
     Write-Host "  .\make.ps1 test-models     - Tester uniquement les modèles"
     Write-Host "  .\make.ps1 test-api        - Tester uniquement l'API"
     Write-Host "  .\make.ps1 test-import     - Tester la commande d'import"
+    Write-Host "  .\make.ps1 test-perf       - Temps de réponse comparés à la référence"
     Write-Host "  .\make.ps1 coverage        - Tests avec couverture de code"
     Write-Host ""
     Write-Green "Import et données:"
@@ -138,6 +139,13 @@ function Run-TestImport {
     & $VENV_PYTHON palmaresimara\manage.py test students.tests.test_import_command --verbosity=2
 }
 
+function Run-TestPerf {
+    Write-Blue "Temps de réponse comparés à la référence..."
+    $env:PERF_TESTS = "1"
+    & $VENV_PYTHON palmaresimara\manage.py test students.tests.test_performance --tag performance_timing --verbosity=2
+    Remove-Item Env:PERF_TESTS
+}
+
 function Run-Coverage {
     Write-Blue "Tests avec couverture de code..."
     & $VENV\Scripts\coverage.exe run --source="palmaresimara" palmaresimara\manage.py test students.tests
@@ -234,6 +242,7 @@ switch ($Target.ToLower()) {
     "test-models" { Run-TestModels }
     "test-api" { Run-TestApi }
     "test-import" { Run-TestImport }
+    "test-perf" { Run-TestPerf }
     "coverage" { Run-Coverage }
     "import-example" { Import-Example }
     "import-real" { Import-Real }
@@ -0,0 +1,80 @@
+"""
+Exécution concurrente des requêtes indépendantes d'analytics.
+
+Les groupes de requêtes d'un tableau de bord (statistiques générales,
+meilleurs élèves, regroupements par classe, section et année, comptages)
+ne dépendent pas les uns des autres : ils sont soumis ensemble à un pool de
+threads borné (ANALYTICS_QUERY_WORKERS), partagé par le processus. Chaque
+thread a sa propre connexion, réutilisée selon DB_CONN_MAX_AGE (ou empruntée
+au pool avec DB_POOL) comme celle d'un thread de requête : la latence
+devient celle du groupe le plus lent plutôt que leur somme.
+
+Les groupes sont exécutés dans l'ordre, sur la connexion de l'appelant,
+quand le pool est désactivé (ANALYTICS_QUERY_WORKERS <= 1), pendant une
+transaction (les autres connexions n'en verraient pas les écritures), ou
+depuis un thread du pool lui-même.
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+
+from palmaresimara.middleware import instrument_thread
+
+_executor = None
+_executor_lock = threading.Lock()
+_in_worker = threading.local()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ANALYTICS_QUERY_WORKERS,
+                thread_name_prefix='analytics-query',
+            )
+        return _executor
+
+
+def _run_in_thread(task):
+    """Exécute un groupe dans un thread du pool, connexion gérée comme pour une requête"""
+    _in_worker.active = True
+    close_old_connections()
+    try:
+        with instrument_thread():
+            return task()
+    finally:
+        close_old_connections()
+        _in_worker.active = False
+
+
+def is_sequential(using=DEFAULT_DB_ALIAS):
+    """Vrai si les groupes doivent s'exécuter dans le thread appelant"""
+    return (
+        settings.ANALYTICS_QUERY_WORKERS <= 1
+        or connections[using].in_atomic_block
+        or getattr(_in_worker, 'active', False)
+    )
+
+
+def run_concurrently(tasks, using=DEFAULT_DB_ALIAS):
+    """
+    Exécute les fonctions sans argument de `tasks` ({nom: fonction}) et
+    retourne {nom: résultat}, dans le même ordre.
+
+    Chaque groupe reçoit une copie du contexte de l'appelant (réplica choisi
+    par use_replica(), mesures de la requête) ; la première exception levée
+    par un groupe est propagée.
+    """
+    if is_sequential(using):
+        return {name: task() for name, task in tasks.items()}
+
+    executor = _get_executor()
+    futures = {
+        name: executor.submit(contextvars.copy_context().run, _run_in_thread, task)
+        for name, task in tasks.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
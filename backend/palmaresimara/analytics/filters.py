@@ -0,0 +1,34 @@
+"""
+Résolution des filtres d'analytics en identifiants de dimensions.
+
+Les filtres par nom (année, classe, section) sont convertis en listes
+d'identifiants dans le cache des dimensions (students.dimensions), afin que
+les agrégats portent uniquement sur la table des inscriptions, sans
+jointure, et puissent utiliser ses index composés.
+"""
+from asgiref.sync import sync_to_async
+
+from students import dimensions
+from students.models import SchoolYear, Classe, Section
+
+
+def resolve_dimension_filters(year=None, classe=None, section=None):
+    """
+    Retourne les lookups à appliquer sur Enrollment pour les filtres donnés.
+
+    Un filtre qui ne correspond à aucune dimension produit une liste vide,
+    ce qui donne un queryset vide sans requête supplémentaire.
+    """
+    lookups = {}
+    if year:
+        lookups['school_year_id__in'] = dimensions.ids(SchoolYear, exact=year)
+    if classe:
+        lookups['classe_id__in'] = dimensions.ids(Classe, contains=classe)
+    if section:
+        lookups['section_id__in'] = dimensions.ids(Section, contains=section)
+    return lookups
+
+
+async def aresolve_dimension_filters(year=None, classe=None, section=None):
+    """Variante asynchrone de resolve_dimension_filters (le cache peut se recharger)"""
+    return await sync_to_async(resolve_dimension_filters)(year, classe, section)
@@ -0,0 +1,125 @@
+"""
+Tableau croisé des statistiques par année, classe et section.
+
+Une seule requête groupée au grain le plus fin (année × classe × section)
+est exécutée ; chaque regroupement demandé est ensuite obtenu en
+agrégeant ces lignes en Python, ce qui reste peu coûteux puisque leur
+nombre est borné par le nombre de combinaisons de dimensions.
+"""
+from django.db.models import Count, Max, Min, Sum
+
+from students import dimensions
+from students.models import SchoolYear, Classe, Section
+
+# Dimension -> (colonne de regroupement, modèle, champ du libellé)
+DIMENSIONS = {
+    'year': ('school_year_id', SchoolYear, 'year'),
+    'classe': ('classe_id', Classe, 'name'),
+    'section': ('section_id', Section, 'name'),
+}
+
+DEFAULT_GROUPINGS = [('year',), ('classe',), ('section',)]
+
+
+def parse_groupings(values):
+    """
+    Transforme les paramètres `group_by` en regroupements normalisés.
+
+    Chaque valeur est une liste de dimensions séparées par des virgules ;
+    plusieurs regroupements peuvent être passés en répétant le paramètre
+    ou en les séparant par des points-virgules. Lève ValueError si une
+    dimension est inconnue.
+    """
+    groupings = []
+    for value in values:
+        for spec in value.split(';'):
+            dims = {dim.strip() for dim in spec.split(',') if dim.strip()}
+            if not dims:
+                continue
+            unknown = dims - DIMENSIONS.keys()
+            if unknown:
+                raise ValueError(f'Dimension inconnue: {", ".join(sorted(unknown))}')
+            # Ordre canonique pour que "classe,year" et "year,classe" coïncident
+            grouping = tuple(dim for dim in DIMENSIONS if dim in dims)
+            if grouping not in groupings:
+                groupings.append(grouping)
+    return groupings or list(DEFAULT_GROUPINGS)
+
+
+def _empty_bucket():
+    return {'count': 0, 'sum': 0.0, 'max': None, 'min': None}
+
+
+def _merge(bucket, cell):
+    bucket['count'] += cell['count']
+    bucket['sum'] += cell['sum']
+    bucket['max'] = cell['max'] if bucket['max'] is None else max(bucket['max'], cell['max'])
+    bucket['min'] = cell['min'] if bucket['min'] is None else min(bucket['min'], cell['min'])
+
+
+def _metrics(bucket):
+    return {
+        'total_enrollments': bucket['count'],
+        'average_percentage': bucket['sum'] / bucket['count'] if bucket['count'] else None,
+        'max_percentage': bucket['max'],
+        'min_percentage': bucket['min'],
+    }
+
+
+def compute_pivot(enrollments, groupings):
+    """
+    Calcule le total et chaque regroupement demandé à partir d'un seul
+    parcours groupé du queryset d'inscriptions
+    """
+    columns = [column for column, _, _ in DIMENSIONS.values()]
+    cells = list(
+        enrollments.order_by().values(*columns).annotate(
+            count=Count('id'),
+            sum=Sum('percentage'),
+            max=Max('percentage'),
+            min=Min('percentage'),
+        )
+    )
+
+    labels = {
+        dim: dimensions.labels(model, {cell[column] for cell in cells})
+        for dim, (column, model, _) in DIMENSIONS.items()
+    }
+
+    total = _empty_bucket()
+    buckets = {grouping: {} for grouping in groupings}
+    for cell in cells:
+        _merge(total, cell)
+        for grouping, grouped in buckets.items():
+            key = tuple(cell[DIMENSIONS[dim][0]] for dim in grouping)
+            _merge(grouped.setdefault(key, _empty_bucket()), cell)
+
+    results = {}
+    for grouping, grouped in buckets.items():
+        rows = []
+        for key, bucket in grouped.items():
+            row = {dim: labels[dim].get(pk) for dim, pk in zip(grouping, key)}
+            row.update(_metrics(bucket))
+            rows.append(row)
+        # Même ordre que les vues existantes : années récentes d'abord, puis libellés
+        rows.sort(key=lambda row: tuple(
+            sort_key(row[dim], descending=dim == 'year') for dim in grouping
+        ))
+        results[','.join(grouping)] = rows
+
+    return {'total': _metrics(total), 'groupings': results}
+
+
+def sort_key(value, descending=False):
+    """
+    Clé de tri d'un libellé, dans l'ordre inverse si `descending` ; libellé
+    absent (None) en dernier
+    """
+    if value is None:
+        return (True, ())
+    return (False, _descending(value) if descending else value)
+
+
+def _descending(value):
+    """Clé de tri inversant l'ordre d'une chaîne de type YYYY-YYYY"""
+    return tuple(-ord(char) for char in value)
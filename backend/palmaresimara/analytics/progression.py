@@ -0,0 +1,187 @@
+"""
+Calculs de progression des élèves d'une année scolaire à l'autre.
+
+Les écarts sont calculés en base avec des fonctions de fenêtrage
+(LAG partitionné par élève et ordonné par année scolaire). Moyennes par
+cohorte, plus fortes progressions et régressions sont tirées d'un même
+calcul de la fenêtre (une CTE) en une seule requête, sans jamais parcourir
+les inscriptions des élèves en Python.
+"""
+from django.db import connections
+from django.db.models import F, Window
+from django.db.models.functions import Lag
+
+from students import dimensions
+from students.models import Enrollment, Student, SchoolYear, Classe
+
+
+def _school_years_up_to(year):
+    """
+    Identifiants des années jusqu'à `year` comprise, résolus dans le cache
+    des dimensions ; liste vide si l'année est inconnue
+    """
+    found = dimensions.ids(SchoolYear, exact=year)
+    if not found:
+        return []
+    labels = dimensions.labels(SchoolYear)
+    # Libellés YYYY-YYYY existants : leur ordre est celui de la fenêtre
+    return [pk for pk, label in labels.items() if label <= labels[found[0]]]
+
+
+def _progression_queryset(student_id=None, school_year_ids=None):
+    """
+    Inscriptions annotées avec les valeurs de l'inscription précédente
+    du même élève (année, classe, pourcentage)
+    """
+    window = {
+        'partition_by': [F('student_id')],
+        'order_by': F('school_year__year').asc(),
+    }
+    queryset = Enrollment.objects.order_by()
+    if student_id is not None:
+        queryset = queryset.filter(student_id=student_id)
+    if school_year_ids is not None:
+        # Les années postérieures n'influencent pas LAG : on les écarte tôt
+        queryset = queryset.filter(school_year_id__in=school_year_ids)
+
+    return queryset.annotate(
+        year=F('school_year__year'),
+        previous_year=Window(Lag('school_year__year'), **window),
+        previous_classe_id=Window(Lag('classe_id'), **window),
+        previous_percentage=Window(Lag('percentage'), **window),
+    ).values(
+        'id', 'student_id', 'school_year_id', 'classe_id', 'percentage',
+        'year', 'previous_year', 'previous_classe_id', 'previous_percentage',
+    )
+
+
+# Colonnes communes aux trois parties : moyennes pour une cohorte, valeurs
+# de l'inscription pour une progression ou une régression
+SUMMARY_SQL = """
+WITH progression AS (
+    SELECT p.*, p.percentage - p.previous_percentage AS delta,
+        ROW_NUMBER() OVER (
+            ORDER BY p.percentage - p.previous_percentage DESC, p.student_id, p.id
+        ) AS improved_rank,
+        ROW_NUMBER() OVER (
+            ORDER BY p.percentage - p.previous_percentage ASC, p.student_id, p.id
+        ) AS declined_rank
+    FROM ({inner}) p
+    WHERE {where}
+)
+SELECT 'cohort' AS kind,
+    ROW_NUMBER() OVER (ORDER BY year DESC, AVG(delta) DESC) AS ordinal,
+    previous_year, year, previous_classe_id, classe_id, NULL AS student_id,
+    COUNT(*) AS students_count, AVG(previous_percentage) AS previous_percentage,
+    AVG(percentage) AS percentage, AVG(delta) AS delta
+FROM progression
+GROUP BY previous_year, year, previous_classe_id, classe_id
+UNION ALL
+SELECT 'improved', improved_rank, previous_year, year, previous_classe_id, classe_id,
+    student_id, 1, previous_percentage, percentage, delta
+FROM progression WHERE improved_rank <= %s
+UNION ALL
+SELECT 'declined', declined_rank, previous_year, year, previous_classe_id, classe_id,
+    student_id, 1, previous_percentage, percentage, delta
+FROM progression WHERE declined_rank <= %s
+ORDER BY kind, ordinal
+"""
+
+
+def _summary_rows(school_year_ids=None, year_id=None, classe_ids=None, limit=10):
+    """
+    Lignes des trois parties (colonne `kind`), en une requête.
+
+    Les conditions portant sur le résultat de LAG (année/classe d'arrivée)
+    doivent être appliquées après le calcul de la fenêtre, d'où la CTE.
+    """
+    queryset = _progression_queryset(school_year_ids=school_year_ids)
+    inner_sql, inner_params = queryset.query.sql_with_params()
+    where, params = ['p.previous_percentage IS NOT NULL'], []
+    if year_id is not None:
+        where.append('p.school_year_id = %s')
+        params.append(year_id)
+    if classe_ids is not None:
+        placeholders = ', '.join(['%s'] * len(classe_ids)) or 'NULL'
+        where.append(f'p.classe_id IN ({placeholders})')
+        params.extend(classe_ids)
+
+    sql = SUMMARY_SQL.format(inner=inner_sql, where=' AND '.join(where))
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, [*inner_params, *params, limit, limit])
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def student_history(student_id):
+    """Historique d'un élève avec l'écart par rapport à l'année précédente"""
+    rows = list(
+        _progression_queryset(student_id=student_id)
+        .annotate(classe_name=F('classe__name'), section_name=F('section__name'))
+        .order_by('year')
+    )
+    return [
+        {
+            'year': row['year'],
+            'classe': row['classe_name'],
+            'section': row['section_name'],
+            'percentage': row['percentage'],
+            'previous_year': row['previous_year'],
+            'previous_percentage': row['previous_percentage'],
+            'delta': (
+                round(row['percentage'] - row['previous_percentage'], 2)
+                if row['previous_percentage'] is not None else None
+            ),
+        }
+        for row in rows
+    ]
+
+
+def summary(year=None, classe_ids=None, limit=10):
+    """
+    Moyennes par cohorte (élèves passés de la classe X, année N, à la classe
+    Y, année suivante de leur parcours) et `limit` plus fortes progressions
+    et régressions, pour l'année d'arrivée `year` et les classes données
+    """
+    result = {'cohorts': [], 'most_improved': [], 'most_declined': []}
+    school_year_ids = year_id = None
+    if year:
+        school_year_ids = _school_years_up_to(year)
+        if not school_year_ids:
+            return result
+        year_id = dimensions.ids(SchoolYear, exact=year)[0]
+
+    rows = _summary_rows(school_year_ids, year_id, classe_ids, limit)
+
+    # Seuls les noms des élèves retenus sont chargés
+    names = dict(
+        Student.objects.filter(id__in={row['student_id'] for row in rows if row['student_id']})
+        .values_list('id', 'full_name')
+    )
+    class_names = dimensions.labels(
+        Classe, {pk for row in rows for pk in (row['previous_classe_id'], row['classe_id']) if pk}
+    )
+    for row in rows:
+        if row['kind'] == 'cohort':
+            result['cohorts'].append({
+                'from_year': row['previous_year'],
+                'to_year': row['year'],
+                'from_classe': class_names.get(row['previous_classe_id']),
+                'to_classe': class_names.get(row['classe_id']),
+                'students_count': row['students_count'],
+                'average_previous': round(row['previous_percentage'], 2),
+                'average_percentage': round(row['percentage'], 2),
+                'average_delta': round(row['delta'], 2),
+            })
+        else:
+            result[f"most_{row['kind']}"].append({
+                'student_id': row['student_id'],
+                'student__full_name': names.get(row['student_id']),
+                'from_year': row['previous_year'],
+                'to_year': row['year'],
+                'classe': class_names.get(row['classe_id']),
+                'previous_percentage': row['previous_percentage'],
+                'percentage': row['percentage'],
+                'delta': round(row['delta'], 2),
+            })
+    return result
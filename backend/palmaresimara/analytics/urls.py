@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import AnalyticsView, ClassAnalyticsView
+from .views import AnalyticsView, ClassAnalyticsView, PivotAnalyticsView, ProgressionView
 
 urlpatterns = [
     path('', AnalyticsView.as_view(), name='analytics'),
     path('classes/<int:classe_id>/', ClassAnalyticsView.as_view(), name='class-analytics'),
+    path('pivot/', PivotAnalyticsView.as_view(), name='pivot-analytics'),
+    path('progression/', ProgressionView.as_view(), name='progression-analytics'),
 ]
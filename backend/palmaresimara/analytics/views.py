@@ -1,119 +1,200 @@
+import asyncio
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.db.models import Avg, Count, Max, Min, Q
+from palmaresimara.throttling import ExpensiveAnonRateThrottle
+from students import coalesce, dimensions
+from students.async_views import AsyncReadView, api_response
 from students.models import Enrollment, Student, SchoolYear, Classe, Section
-from students.views import IsAdminOrReadOnly
+from students.views import IsAdminOrReadOnly, ReplicaReadMixin
+from . import pivot, progression
+from .concurrency import run_concurrently
+from .filters import aresolve_dimension_filters, resolve_dimension_filters
+
+
+# Tranches de la distribution des notes
+GRADE_BANDS = {
+    'excellent': Q(percentage__gte=90),
+    'tres_bien': Q(percentage__gte=80, percentage__lt=90),
+    'bien': Q(percentage__gte=70, percentage__lt=80),
+    'assez_bien': Q(percentage__gte=60, percentage__lt=70),
+    'passable': Q(percentage__gte=50, percentage__lt=60),
+    'insuffisant': Q(percentage__lt=50),
+}
+
+GENERAL_STATS_KEYS = ['total_enrollments', 'average_percentage', 'max_percentage', 'min_percentage']
+
+TOP_STUDENT_FIELDS = ['student__full_name', 'percentage', 'school_year__year', 'classe__name', 'section__name']
+
+# Regroupements des statistiques : colonne, dimension, champ et clé du libellé
+GROUPINGS = {
+    'stats_by_class': ('classe_id', Classe, 'classe__name'),
+    'stats_by_section': ('section_id', Section, 'section__name'),
+    'stats_by_year': ('school_year_id', SchoolYear, 'school_year__year'),
+}
+
+ENTITY_MODELS = {
+    'total_students': Student,
+    'total_school_years': SchoolYear,
+    'total_classes': Classe,
+    'total_sections': Section,
+}
+
+
+def _general_aggregates():
+    """Statistiques générales et distribution des notes, en un seul agrégat"""
+    return {
+        'total_enrollments': Count('id'),
+        'average_percentage': Avg('percentage'),
+        'max_percentage': Max('percentage'),
+        'min_percentage': Min('percentage'),
+        **{band: Count('id', filter=condition) for band, condition in GRADE_BANDS.items()},
+    }
+
+
+def _grouped_rows(enrollments, column):
+    """
+    Statistiques regroupées sur une colonne de clé étrangère, sans jointure ;
+    les libellés sont ajoutés ensuite depuis le cache des dimensions
+    """
+    return enrollments.values(column).annotate(
+        total_students=Count('student_id', distinct=True),
+        average_percentage=Avg('percentage'),
+        max_percentage=Max('percentage'),
+        min_percentage=Min('percentage')
+    ).order_by('-average_percentage')
+
+
+def _label_rows(rows, labels, column, label_key):
+    return [
+        {label_key: labels.get(row.pop(column)), **row}
+        for row in rows
+    ]
+
+
+def _grouped_stats(enrollments, column, model, label_key):
+    rows = list(_grouped_rows(enrollments, column))
+    labels = dimensions.labels(model, [row[column] for row in rows])
+    return _label_rows(rows, labels, column, label_key)
+
+
+async def _agrouped_stats(enrollments, column, model, label_key):
+    rows = [row async for row in _grouped_rows(enrollments, column)]
+    # Le cache peut se recharger depuis la base : hors de la boucle d'événements
+    labels = await sync_to_async(dimensions.labels)(model, [row[column] for row in rows])
+    return _label_rows(rows, labels, column, label_key)
+
+
+async def _alist(queryset):
+    return [row async for row in queryset]
+
+
+def _analytics_response(stats, top_students, grouped, entity_counts, filters):
+    """Corps de la réponse d'analytics à partir des résultats des requêtes"""
+    general_stats = {key: stats.pop(key) for key in GENERAL_STATS_KEYS}
+    grouped['stats_by_year'].sort(key=lambda row: pivot.sort_key(row['school_year__year'], descending=True))
+    return {
+        'general_stats': general_stats,
+        'entity_counts': entity_counts,
+        'top_students': top_students,
+        **grouped,
+        'grade_distribution': stats,
+        'filters_applied': filters,
+    }
+
+
+def compute_analytics(filters):
+    """Corps de la réponse d'analytics pour les filtres donnés (année, classe, section)"""
+    # Les filtres par nom sont résolus en identifiants : les agrégats
+    # portent alors sur la seule table des inscriptions, sans jointure
+    enrollments = Enrollment.objects.filter(**resolve_dimension_filters(**filters))
+
+    # Groupes de requêtes indépendants, exécutés en parallèle (voir
+    # analytics.concurrency) : statistiques générales et distribution
+    # en un seul agrégat, top 10 (jointures limitées aux 10 lignes
+    # retenues), regroupements par classe, section et année, comptages
+    results = run_concurrently({
+        'stats': lambda: enrollments.aggregate(**_general_aggregates()),
+        'top_students': lambda: list(
+            enrollments.order_by('-percentage')[:10].values(*TOP_STUDENT_FIELDS)
+        ),
+        **{
+            key: partial(_grouped_stats, enrollments, *grouping)
+            for key, grouping in GROUPINGS.items()
+        },
+        'entity_counts': lambda: {
+            key: model.objects.count() for key, model in ENTITY_MODELS.items()
+        },
+    })
+    stats = results.pop('stats')
+    top_students = results.pop('top_students')
+    entity_counts = results.pop('entity_counts')
+    grouped = results
+
+    return _analytics_response(stats, top_students, grouped, entity_counts, filters)
+
+
+async def acompute_analytics(filters):
+    """
+    compute_analytics en asynchrone : les requêtes indépendantes sont lancées
+    ensemble avec asyncio.gather. L'ORM asynchrone de Django les exécute sur
+    la connexion de la requête, l'une après l'autre, sans bloquer la boucle
+    d'événements pendant ce temps.
+    """
+    enrollments = Enrollment.objects.filter(**await aresolve_dimension_filters(**filters))
+
+    stats, top_students, *results = await asyncio.gather(
+        enrollments.aaggregate(**_general_aggregates()),
+        _alist(enrollments.order_by('-percentage')[:10].values(*TOP_STUDENT_FIELDS)),
+        *[_agrouped_stats(enrollments, *grouping) for grouping in GROUPINGS.values()],
+        *[model.objects.acount() for model in ENTITY_MODELS.values()],
+    )
+    grouped = dict(zip(GROUPINGS, results[:len(GROUPINGS)]))
+    entity_counts = dict(zip(ENTITY_MODELS, results[len(GROUPINGS):]))
+    return _analytics_response(stats, top_students, grouped, entity_counts, filters)
+
+
+def analytics_filters(query_params):
+    return {
+        'year': query_params.get('year'),
+        'classe': query_params.get('classe'),
+        'section': query_params.get('section'),
+    }
+
+
+def analytics_key(filters):
+    """Clé du résultat en cache, commune aux vues synchrone et asynchrone"""
+    return coalesce.result_key('analytics', filters['year'], filters['classe'], filters['section'])
 
 
-class AnalyticsView(APIView):
+def cached_analytics(filters):
+    """
+    Analytics depuis le cache (ANALYTICS_CACHE_TIMEOUT), calculées une seule
+    fois pour des requêtes identiques simultanées (voir students.coalesce)
+    """
+    return coalesce.single_flight(
+        analytics_key(filters), partial(compute_analytics, filters), settings.ANALYTICS_CACHE_TIMEOUT
+    )
+
+
+class AnalyticsView(ReplicaReadMixin, APIView):
     """
     Endpoint pour les analyses et statistiques
     """
     permission_classes = [IsAdminOrReadOnly]
+    throttle_classes = [ExpensiveAnonRateThrottle]
     
     def get(self, request):
         """
         Retourne des statistiques globales sur les données
         """
         try:
-            year_filter = request.query_params.get('year')
-            classe_filter = request.query_params.get('classe')
-            section_filter = request.query_params.get('section')
-            
-            # Base queryset
-            enrollments = Enrollment.objects.select_related(
-                'student', 'school_year', 'classe', 'section'
-            )
-            
-            # Appliquer les filtres
-            if year_filter:
-                enrollments = enrollments.filter(school_year__year=year_filter)
-            if classe_filter:
-                enrollments = enrollments.filter(classe__name__icontains=classe_filter)
-            if section_filter:
-                enrollments = enrollments.filter(section__name__icontains=section_filter)
-            
-            # Statistiques générales
-            general_stats = enrollments.aggregate(
-                total_enrollments=Count('id'),
-                average_percentage=Avg('percentage'),
-                max_percentage=Max('percentage'),
-                min_percentage=Min('percentage')
-            )
-            
-            # Top 10 étudiants
-            top_students = enrollments.order_by('-percentage')[:10].values(
-                'student__full_name',
-                'percentage',
-                'school_year__year',
-                'classe__name',
-                'section__name'
-            )
-            
-            # Statistiques par classe
-            stats_by_class = enrollments.values(
-                'classe__name'
-            ).annotate(
-                total_students=Count('student', distinct=True),
-                average_percentage=Avg('percentage'),
-                max_percentage=Max('percentage'),
-                min_percentage=Min('percentage')
-            ).order_by('-average_percentage')
-            
-            # Statistiques par section
-            stats_by_section = enrollments.values(
-                'section__name'
-            ).annotate(
-                total_students=Count('student', distinct=True),
-                average_percentage=Avg('percentage'),
-                max_percentage=Max('percentage'),
-                min_percentage=Min('percentage')
-            ).order_by('-average_percentage')
-            
-            # Statistiques par année
-            stats_by_year = enrollments.values(
-                'school_year__year'
-            ).annotate(
-                total_students=Count('student', distinct=True),
-                average_percentage=Avg('percentage'),
-                max_percentage=Max('percentage'),
-                min_percentage=Min('percentage')
-            ).order_by('-school_year__year')
-            
-            # Distribution des notes (par tranches)
-            grade_distribution = {
-                'excellent': enrollments.filter(percentage__gte=90).count(),
-                'tres_bien': enrollments.filter(percentage__gte=80, percentage__lt=90).count(),
-                'bien': enrollments.filter(percentage__gte=70, percentage__lt=80).count(),
-                'assez_bien': enrollments.filter(percentage__gte=60, percentage__lt=70).count(),
-                'passable': enrollments.filter(percentage__gte=50, percentage__lt=60).count(),
-                'insuffisant': enrollments.filter(percentage__lt=50).count(),
-            }
-            
-            # Nombre total d'entités
-            entity_counts = {
-                'total_students': Student.objects.count(),
-                'total_school_years': SchoolYear.objects.count(),
-                'total_classes': Classe.objects.count(),
-                'total_sections': Section.objects.count(),
-            }
-            
-            response_data = {
-                'general_stats': general_stats,
-                'entity_counts': entity_counts,
-                'top_students': list(top_students),
-                'stats_by_class': list(stats_by_class),
-                'stats_by_section': list(stats_by_section),
-                'stats_by_year': list(stats_by_year),
-                'grade_distribution': grade_distribution,
-                'filters_applied': {
-                    'year': year_filter,
-                    'classe': classe_filter,
-                    'section': section_filter
-                }
-            }
-            
+            response_data = cached_analytics(analytics_filters(request.query_params))
             return Response(response_data, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -123,7 +204,89 @@ class AnalyticsView(APIView):
             )
 
 
-class ClassAnalyticsView(APIView):
+class AsyncAnalyticsView(AsyncReadView):
+    """
+    Statistiques globales en asynchrone (équivalent de GET /api/analytics/,
+    voir students.async_views), calculées par acompute_analytics et
+    partagées en cache avec la vue synchrone
+    """
+    throttle_classes = [ExpensiveAnonRateThrottle]
+
+    async def get(self, request):
+        try:
+            filters = analytics_filters(request.GET)
+            response_data = await coalesce.asingle_flight(
+                analytics_key(filters), partial(acompute_analytics, filters),
+                settings.ANALYTICS_CACHE_TIMEOUT
+            )
+            return api_response(response_data, request=request)
+
+        except Exception as e:
+            return api_response(
+                {'error': f'Erreur lors du calcul des statistiques: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+def compute_class_analytics(classe, year_filter=None):
+    """Statistiques détaillées d'une classe (dict du cache des dimensions)"""
+    # Base queryset pour cette classe
+    enrollments = Enrollment.objects.filter(classe_id=classe['id'])
+
+    if year_filter:
+        enrollments = enrollments.filter(
+            school_year_id__in=dimensions.ids(SchoolYear, exact=year_filter)
+        )
+
+    # Statistiques générales pour cette classe
+    class_stats = enrollments.aggregate(
+        total_enrollments=Count('id'),
+        total_students=Count('student', distinct=True),
+        average_percentage=Avg('percentage'),
+        max_percentage=Max('percentage'),
+        min_percentage=Min('percentage')
+    )
+
+    # Évolution par année pour cette classe
+    evolution_by_year = enrollments.values(
+        'school_year__year'
+    ).annotate(
+        students_count=Count('student', distinct=True),
+        average_percentage=Avg('percentage')
+    ).order_by('school_year__year')
+
+    # Statistiques par section dans cette classe
+    stats_by_section = enrollments.values(
+        'section__name'
+    ).annotate(
+        students_count=Count('student', distinct=True),
+        average_percentage=Avg('percentage')
+    ).order_by('-average_percentage')
+
+    return {
+        'classe_info': {
+            'id': classe['id'],
+            'name': classe['name']
+        },
+        'class_stats': class_stats,
+        'evolution_by_year': list(evolution_by_year),
+        'stats_by_section': list(stats_by_section),
+        'filters_applied': {
+            'year': year_filter
+        }
+    }
+
+
+def cached_class_analytics(classe, year_filter=None):
+    """compute_class_analytics depuis le cache, comme cached_analytics"""
+    return coalesce.single_flight(
+        coalesce.result_key('class-analytics', classe['id'], year_filter),
+        partial(compute_class_analytics, classe, year_filter),
+        settings.ANALYTICS_CACHE_TIMEOUT
+    )
+
+
+class ClassAnalyticsView(ReplicaReadMixin, APIView):
     """
     Endpoint pour les analyses spécifiques à une classe
     """
@@ -134,65 +297,116 @@ class ClassAnalyticsView(APIView):
         Retourne des statistiques détaillées pour une classe spécifique
         """
         try:
-            # Vérifier que la classe existe
-            try:
-                classe = Classe.objects.get(id=classe_id)
-            except Classe.DoesNotExist:
+            # Vérifier que la classe existe (cache des dimensions)
+            classe = dimensions.get(Classe, classe_id)
+            if classe is None:
                 return Response(
                     {'error': 'Classe non trouvée'},
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            year_filter = request.query_params.get('year')
-            
-            # Base queryset pour cette classe
-            enrollments = Enrollment.objects.filter(classe=classe)
-            
-            if year_filter:
-                enrollments = enrollments.filter(school_year__year=year_filter)
+            response_data = cached_class_analytics(classe, request.query_params.get('year'))
+            return Response(response_data, status=status.HTTP_200_OK)
             
-            # Statistiques générales pour cette classe
-            class_stats = enrollments.aggregate(
-                total_enrollments=Count('id'),
-                total_students=Count('student', distinct=True),
-                average_percentage=Avg('percentage'),
-                max_percentage=Max('percentage'),
-                min_percentage=Min('percentage')
+        except Exception as e:
+            return Response(
+                {'error': f'Erreur lors du calcul des statistiques: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-            
-            # Évolution par année pour cette classe
-            evolution_by_year = enrollments.values(
-                'school_year__year'
-            ).annotate(
-                students_count=Count('student', distinct=True),
-                average_percentage=Avg('percentage')
-            ).order_by('school_year__year')
-            
-            # Statistiques par section dans cette classe
-            stats_by_section = enrollments.values(
-                'section__name'
-            ).annotate(
-                students_count=Count('student', distinct=True),
-                average_percentage=Avg('percentage')
-            ).order_by('-average_percentage')
-            
+
+
+class PivotAnalyticsView(ReplicaReadMixin, APIView):
+    """
+    Endpoint de tableau croisé : tous les regroupements d'un tableau de bord
+    (année, classe, section et leurs combinaisons) en une seule requête HTTP
+    """
+    permission_classes = [IsAdminOrReadOnly]
+
+    def get(self, request):
+        """
+        Retourne les statistiques pour chaque regroupement `group_by` demandé,
+        par ex. ?group_by=year&group_by=classe,year&group_by=classe,section
+        """
+        year_filter = request.query_params.get('year')
+        classe_filter = request.query_params.get('classe')
+        section_filter = request.query_params.get('section')
+
+        try:
+            groupings = pivot.parse_groupings(request.query_params.getlist('group_by'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            enrollments = Enrollment.objects.filter(
+                **resolve_dimension_filters(year_filter, classe_filter, section_filter)
+            )
+
+            response_data = pivot.compute_pivot(enrollments, groupings)
+            response_data['filters_applied'] = {
+                'year': year_filter,
+                'classe': classe_filter,
+                'section': section_filter,
+                'group_by': [','.join(grouping) for grouping in groupings]
+            }
+
+            return Response(response_data, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response(
+                {'error': f'Erreur lors du calcul des statistiques: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class ProgressionView(ReplicaReadMixin, APIView):
+    """
+    Endpoint pour la progression des élèves d'une année scolaire à l'autre
+    """
+    permission_classes = [IsAdminOrReadOnly]
+    max_limit = 100
+
+    def get(self, request):
+        """
+        Retourne les moyennes par cohorte, les plus fortes progressions et
+        régressions, et l'historique d'un élève si `student` est fourni
+        """
+        year_filter = request.query_params.get('year')
+        classe_filter = request.query_params.get('classe')
+        student_filter = request.query_params.get('student')
+
+        try:
+            limit = int(request.query_params.get('limit', 10))
+            student_id = int(student_filter) if student_filter else None
+        except ValueError:
+            return Response(
+                {'error': 'Les paramètres limit et student doivent être des entiers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= limit <= self.max_limit:
+            return Response(
+                {'error': f'Le paramètre limit doit être entre 1 et {self.max_limit}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            classe_ids = resolve_dimension_filters(classe=classe_filter).get('classe_id__in')
+
             response_data = {
-                'classe_info': {
-                    'id': classe.id,
-                    'name': classe.name
-                },
-                'class_stats': class_stats,
-                'evolution_by_year': list(evolution_by_year),
-                'stats_by_section': list(stats_by_section),
+                **progression.summary(year_filter, classe_ids, limit),
                 'filters_applied': {
-                    'year': year_filter
+                    'year': year_filter,
+                    'classe': classe_filter,
+                    'student': student_id,
+                    'limit': limit
                 }
             }
-            
+            if student_id is not None:
+                response_data['student_history'] = progression.student_history(student_id)
+
             return Response(response_data, status=status.HTTP_200_OK)
-            
+
         except Exception as e:
             return Response(
-                {'error': f'Erreur lors du calcul des statistiques: {str(e)}'},
+                {'error': f'Erreur lors du calcul de la progression: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
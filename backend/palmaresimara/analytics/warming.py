@@ -0,0 +1,124 @@
+"""
+Préchauffage des caches après un import (et commande `warm_caches`).
+
+Un import invalide les résultats en cache : sans préchauffage, les premières
+lectures des tableaux de bord et des classements après la publication des
+résultats recalculent tout. Pour les années données, sont calculés et mis en
+cache :
+
+- les analytics globales, de chaque année et de chaque classe de l'année ;
+- les statistiques de chaque classe, toutes années et pour chaque année ;
+- les classements global, de chaque année, classe et section de l'année.
+
+Les calculs sont répartis sur le pool borné des analytics
+(ANALYTICS_QUERY_WORKERS, voir analytics.concurrency) et passent par
+students.coalesce : une requête arrivant pendant le préchauffage attend le
+résultat en cours au lieu de le recalculer.
+
+Depuis une commande (import_excel, run_import_jobs, warm_caches), les
+résultats ne servent aux processus web qu'avec un cache partagé : avec le
+cache local (LocMem, par défaut), ils disparaîtraient avec la commande, et
+le préchauffage est ignoré avec un avertissement.
+"""
+import logging
+from functools import partial
+
+from django.db import DEFAULT_DB_ALIAS
+
+from students import dimensions, leaderboard
+from students.cache import is_process_local
+from students.listing import changed_years
+from students.models import Enrollment, SchoolYear, Classe
+from .concurrency import run_concurrently
+from .views import cached_analytics, cached_class_analytics
+
+logger = logging.getLogger('students')
+
+KINDS = ('analytics', 'class_analytics', 'leaderboards')
+
+LOCAL_CACHE_WARNING = (
+    'Cache propre au processus (LocMem) : préchauffage ignoré, les processus web '
+    'n\'en profiteraient pas. Configurer un cache partagé (CACHE_BACKEND).'
+)
+
+
+def command_skip_reason():
+    """Avertissement si le préchauffage depuis une commande serait perdu, sinon None"""
+    return LOCAL_CACHE_WARNING if is_process_local() else None
+
+
+def _analytics_filters(year=None, classe=None):
+    return {'year': year, 'classe': classe, 'section': None}
+
+
+def warming_tasks(school_year_ids=None):
+    """
+    Calculs à mettre en cache pour les années données (toutes par défaut) :
+    {(type, périmètre): fonction}
+    """
+    enrollments = Enrollment.objects.all()
+    if school_year_ids is not None:
+        enrollments = enrollments.filter(school_year_id__in=school_year_ids)
+    combinations = list(
+        enrollments.order_by().values_list('school_year_id', 'classe_id', 'section_id').distinct()
+    )
+
+    tasks = {
+        ('analytics', ()): partial(cached_analytics, _analytics_filters()),
+        ('leaderboards', (None, None, None)): partial(leaderboard.get_leaderboard, (None, None, None)),
+    }
+    for school_year_id, classe_id, section_id in combinations:
+        year = dimensions.label(SchoolYear, school_year_id)
+        classe = dimensions.get(Classe, classe_id)
+        for kind, scope, function in [
+            ('analytics', (year,), partial(cached_analytics, _analytics_filters(year))),
+            ('analytics', (year, classe['name']),
+             partial(cached_analytics, _analytics_filters(year, classe['name']))),
+            ('class_analytics', (classe_id,), partial(cached_class_analytics, classe)),
+            ('class_analytics', (classe_id, year), partial(cached_class_analytics, classe, year)),
+            *[
+                ('leaderboards', board, partial(leaderboard.get_leaderboard, board))
+                for board in [
+                    (school_year_id, None, None),
+                    (school_year_id, classe_id, None),
+                    (school_year_id, classe_id, section_id),
+                ]
+            ],
+        ]:
+            tasks.setdefault((kind, scope), function)
+    return tasks
+
+
+def _warm(name, function):
+    """Un calcul ; une erreur est journalisée sans interrompre les autres"""
+    try:
+        function()
+        return True
+    except Exception as e:
+        logger.warning(f'Préchauffage {name} échoué: {str(e)}', exc_info=True)
+        return False
+
+
+def warm_caches(school_year_ids=None):
+    """
+    Calcule et met en cache analytics, statistiques des classes et
+    classements des années données (toutes par défaut) ; retourne le nombre
+    de résultats par type et d'erreurs
+    """
+    tasks = warming_tasks(school_year_ids)
+    results = run_concurrently({
+        name: partial(_warm, name, function) for name, function in tasks.items()
+    })
+    counts = {kind: 0 for kind in KINDS}
+    for (kind, _), warmed in results.items():
+        counts[kind] += warmed
+    counts['errors'] = list(results.values()).count(False)
+    return counts
+
+
+def warm_after_import(since, using=DEFAULT_DB_ALIAS):
+    """Préchauffe les années des inscriptions écrites depuis `since` (fin d'un import)"""
+    school_year_ids = changed_years(since, using)
+    if not school_year_ids:
+        return None
+    return warm_caches(school_year_ids)
@@ -0,0 +1,224 @@
+"""
+Banc de charge HTTP minimal pour mesurer l'API sur un serveur local.
+
+Chaque client est un thread qui garde sa connexion ouverte (keep-alive) et
+enchaîne les requêtes ; les latences sont agrégées en percentiles
+(p50/p95/p99) et en débit (requêtes/s). Aucune dépendance externe : les
+mesures sont donc comparables d'une machine à l'autre tant que le client
+n'est pas le goulet d'étranglement (surveiller le CPU du client).
+"""
+import http.client
+import itertools
+import os
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, p):
+    """Percentile par interpolation linéaire sur des valeurs triées"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class _Client:
+    """Connexion HTTP persistante d'un client du banc"""
+
+    def __init__(self, base_url, headers, timeout):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.headers = headers
+        self.timeout = timeout
+        self.connection = None
+
+    def _connect(self):
+        connection_class = (
+            http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        )
+        self.connection = connection_class(self.netloc, timeout=self.timeout)
+
+    def get(self, path):
+        """Retourne (statut, taille du corps) ; rouvre la connexion si nécessaire"""
+        for attempt in range(2):
+            if self.connection is None:
+                self._connect()
+            try:
+                self.connection.request('GET', self.prefix + path, headers=self.headers)
+                response = self.connection.getresponse()
+                body = response.read()
+                if response.getheader('Connection', '').lower() == 'close':
+                    self.close()
+                return response.status, len(body)
+            except (http.client.HTTPException, ConnectionError):
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def check_reachable(base_url, timeout):
+    """Lève OSError si le serveur de `base_url` n'accepte pas de connexion"""
+    parts = urlsplit(base_url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    socket.create_connection((parts.hostname, port), timeout=timeout).close()
+
+
+def run_load(base_url, paths, concurrency=10, requests=None, duration=None,
+             headers=None, timeout=30, warmup=0, until=None):
+    """
+    Envoie des requêtes GET sur `paths` (à tour de rôle) avec `concurrency`
+    clients, jusqu'à `requests` requêtes au total, pendant `duration`
+    secondes ou jusqu'à ce que `until()` soit vrai. Retourne les
+    statistiques globales et par chemin.
+
+    Lève OSError si le serveur est injoignable au départ ; les échecs
+    pendant le banc sont comptés comme erreurs.
+    """
+    if requests is None and duration is None and until is None:
+        requests = 100 * len(paths)
+    check_reachable(base_url, timeout)
+    headers = {'Accept': 'application/json', **(headers or {})}
+
+    counter = itertools.count()
+    lock = threading.Lock()
+    samples = {path: [] for path in paths}
+    errors = {path: 0 for path in paths}
+    statuses = {}
+    transferred = [0]
+    deadline = None
+
+    def next_path():
+        index = next(counter)
+        if requests is not None and index >= requests:
+            return None
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        if until is not None and until():
+            return None
+        return paths[index % len(paths)]
+
+    def worker():
+        client = _Client(base_url, headers, timeout)
+        try:
+            try:
+                for _ in range(warmup):
+                    for path in paths:
+                        client.get(path)
+            except (OSError, http.client.HTTPException):
+                client.close()
+            start_barrier.wait()
+            while (path := next_path()) is not None:
+                start = time.perf_counter()
+                try:
+                    status, size = client.get(path)
+                except (OSError, http.client.HTTPException):
+                    status, size = 'error', 0
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    statuses[status] = statuses.get(status, 0) + 1
+                    if status == 'error' or status >= 400:
+                        errors[path] += 1
+                    else:
+                        samples[path].append(elapsed)
+                        transferred[0] += size
+        finally:
+            client.close()
+
+    start_barrier = threading.Barrier(concurrency + 1)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(worker) for _ in range(concurrency)]
+        start_barrier.wait()
+        started = time.perf_counter()
+        if duration is not None:
+            deadline = started + duration
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - started
+
+    def summarize(latencies, failed):
+        latencies = sorted(latencies)
+        count = len(latencies) + failed
+        return {
+            'requests': count,
+            'errors': failed,
+            'rps': round(count / elapsed, 1) if elapsed else None,
+            'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else None,
+            'p50_ms': _round(percentile(latencies, 50)),
+            'p95_ms': _round(percentile(latencies, 95)),
+            'p99_ms': _round(percentile(latencies, 99)),
+            'max_ms': _round(latencies[-1] if latencies else None),
+        }
+
+    all_latencies = [value for values in samples.values() for value in values]
+    return {
+        'base_url': base_url,
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'bytes': transferred[0],
+        'statuses': {str(key): value for key, value in statuses.items()},
+        'total': summarize(all_latencies, sum(errors.values())),
+        'paths': {path: summarize(samples[path], errors[path]) for path in paths},
+    }
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def free_port():
+    """Port TCP libre sur l'interface locale"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def running_server(command, base_url, env=None, cwd=None, ready_path='/api/', timeout=30):
+    """
+    Démarre un serveur (sous-processus) avec des variables d'environnement
+    supplémentaires et attend qu'il réponde sur `ready_path`.
+
+    Lève RuntimeError, avec la sortie d'erreur du serveur, s'il s'arrête ou
+    ne répond pas dans le délai.
+    """
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(
+            command, cwd=cwd, env={**os.environ, **(env or {})},
+            stdout=subprocess.DEVNULL, stderr=errors,
+        )
+        try:
+            client = _Client(base_url, {}, timeout=5)
+            deadline = time.monotonic() + timeout
+            while True:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    errors.seek(0)
+                    output = errors.read().decode(errors='replace')[-2000:]
+                    raise RuntimeError(f'Le serveur n\'a pas démarré : {output}')
+                try:
+                    client.get(ready_path)
+                    break
+                except OSError:
+                    time.sleep(0.2)
+            client.close()
+            yield process
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
@@ -0,0 +1,136 @@
+"""
+Compression des réponses (RESPONSE_COMPRESSION).
+
+Les pages d'inscriptions, les analytics et les flux groupés sont du JSON
+très répétitif. Les réponses de l'API (JSON, JSON en colonnes, MessagePack)
+d'au moins RESPONSE_COMPRESSION_MIN_SIZE octets sont compressées selon
+l'en-tête Accept-Encoding du client : brotli ou zstd quand le paquet
+correspondant est installé (brotli, zstandard), gzip sinon. Les réponses en
+flux (by_class?stream=true) sont compressées en gzip au fil de l'eau, comme
+le fait GZipMiddleware.
+
+Les pages HTML (administration, connexion), qui portent le jeton CSRF, ne
+sont pas compressées (attaque BREACH) ; gzip garde le bourrage aléatoire de
+GZipMiddleware (max_random_bytes).
+
+L'en-tête Vary: Accept-Encoding est ajouté pour les caches intermédiaires.
+"""
+import importlib
+import re
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+
+def _brotli(content):
+    import brotli
+    # Qualité 5 : compromis usuel pour une compression à la volée
+    return brotli.compress(content, quality=5)
+
+
+def _zstd(content):
+    import zstandard
+    return zstandard.ZstdCompressor(level=3).compress(content)
+
+
+def _gzip(content):
+    return compress_string(content, max_random_bytes=GZipMiddleware.max_random_bytes)
+
+
+# Encodages par ordre de préférence : (nom, module requis, fonction)
+ENCODINGS = [
+    ('br', 'brotli', _brotli),
+    ('zstd', 'zstandard', _zstd),
+    ('gzip', None, _gzip),
+]
+
+# Types de contenu compressés : formats de l'API (voir palmaresimara/renderers.py)
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/vnd.palmaresimara.columnar+json',
+    'application/msgpack',
+}
+
+_TOKEN = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def accepted_encodings(header):
+    """Encodages acceptés par le client (q > 0)"""
+    accepted = set()
+    for part in header.split(','):
+        match = _TOKEN.match(part)
+        if not match:
+            continue
+        name, quality = match.groups()
+        try:
+            if quality is not None and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name.lower())
+    return accepted
+
+
+def is_compressible(response):
+    """Vrai pour les formats de l'API (jamais le HTML)"""
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return content_type in COMPRESSIBLE_TYPES
+
+
+def available_encodings():
+    """Encodages utilisables ici (paquets optionnels installés)"""
+    available = []
+    for name, module, compress in ENCODINGS:
+        if module is not None:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                continue
+        available.append((name, compress))
+    return available
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Compression brotli, zstd ou gzip des réponses au-delà d'un seuil"""
+
+    def __init__(self, get_response):
+        if not settings.RESPONSE_COMPRESSION:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.encodings = available_encodings()
+
+    def choose(self, request):
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        for name, compress in self.encodings:
+            if name in accepted or '*' in accepted:
+                return name, compress
+        return None, None
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not is_compressible(response):
+            return response
+        if response.streaming:
+            # Flux : gzip incrémental de GZipMiddleware
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.RESPONSE_COMPRESSION_MIN_SIZE:
+            return response
+        name, compress = self.choose(request)
+        if name is None:
+            return response
+
+        compressed = compress(response.content)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = name
+        # ETag fort invalide une fois le corps compressé
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,214 @@
+"""
+Middleware d'instrumentation des requêtes.
+
+Pour chaque requête, mesure le nombre de requêtes SQL, le temps passé en
+base, le temps des serializers DRF hors SQL (objets -> données, voir
+measure_serialization), le temps du reste de la vue, le temps de rendu de la
+réponse (données -> JSON) et la taille de la réponse. Les mesures sont
+renvoyées dans l'en-tête `Server-Timing` et journalisées sur le logger de
+l'application concernée (`students`, `analytics`), avec un avertissement
+lorsque les seuils configurés sont dépassés : c'est ainsi que l'on repère
+les régressions N+1.
+
+Sont aussi relevées les connexions ouvertes (ou empruntées au pool)
+pendant la requête et, si le pool PostgreSQL est activé (DB_POOL), son
+état : taille, connexions disponibles et requêtes en attente d'une
+connexion. Une attente non nulle indique un pool trop petit.
+
+Activé par REQUEST_INSTRUMENTATION=True.
+"""
+import contextvars
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+INSTRUMENTED_APPS = ('students', 'analytics')
+
+_current_metrics = contextvars.ContextVar('request_metrics', default=None)
+
+
+def pool_stats(alias='default'):
+    """État du pool de connexions d'une base (None sans pool)"""
+    pool = getattr(connections[alias], 'pool', None)
+    if pool is None:
+        return None
+    stats = pool.get_stats()
+    return {
+        'size': stats.get('pool_size', 0),
+        'available': stats.get('pool_available', 0),
+        'waiting': stats.get('requests_waiting', 0),
+        'max': stats.get('pool_max', 0),
+    }
+
+
+def _count_connection(sender, connection, **kwargs):
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.connections += 1
+
+
+class RequestMetrics:
+    """Mesures collectées pendant une requête"""
+
+    def __init__(self):
+        self.queries = 0
+        self.connections = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.render_start = None
+        self.render_time = 0.0
+        # Requêtes SQL exécutées aussi par des threads auxiliaires (analytics)
+        self._lock = threading.Lock()
+
+    def record_query(self, execute, sql, params, many, context):
+        """Wrapper d'exécution SQL (voir connection.execute_wrapper)"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self._lock:
+                self.db_time += time.perf_counter() - start
+                self.queries += 1
+
+
+@contextmanager
+def instrument_thread():
+    """
+    Compte dans les mesures de la requête courante les requêtes SQL d'un
+    thread auxiliaire (exécuté avec une copie de son contexte). Le temps en
+    base est alors cumulé sur les threads et peut dépasser la durée totale.
+    """
+    metrics = _current_metrics.get()
+    with ExitStack() as stack:
+        if metrics is not None:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(metrics.record_query))
+        yield
+
+
+def measure_serialization(serializer):
+    """
+    Compte la sérialisation du serializer (to_representation, appelé par
+    `.data`) dans les mesures de la requête courante, hors temps SQL des
+    relations chargées à la demande ; sans effet hors instrumentation
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return serializer
+    to_representation = serializer.to_representation
+
+    def timed_to_representation(instance):
+        start = time.perf_counter()
+        db_before = metrics.db_time
+        try:
+            return to_representation(instance)
+        finally:
+            elapsed = time.perf_counter() - start - (metrics.db_time - db_before)
+            with metrics._lock:
+                metrics.serialize_time += max(elapsed, 0)
+
+    serializer.to_representation = timed_to_representation
+    return serializer
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Mesure le coût de chaque requête et l'expose via Server-Timing et les logs
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        connection_created.connect(_count_connection, dispatch_uid='request_instrumentation')
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        request.metrics = metrics
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(metrics.record_query))
+                response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+
+        total = time.perf_counter() - start
+        self._report(request, response, metrics, total)
+        return response
+
+    def process_template_response(self, request, response):
+        """Mesure le rendu des réponses différées (Response de DRF)"""
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            metrics.render_start = time.perf_counter()
+
+            def render_done(rendered):
+                metrics.render_time = time.perf_counter() - metrics.render_start
+
+            response.add_post_render_callback(render_done)
+        return response
+
+    def _report(self, request, response, metrics, total):
+        db_ms = metrics.db_time * 1000
+        ser_ms = metrics.serialize_time * 1000
+        render_ms = metrics.render_time * 1000
+        total_ms = total * 1000
+        app_ms = max(total_ms - db_ms - ser_ms - render_ms, 0)
+        size = len(response.content) if not response.streaming else None
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db_ms:.1f};desc="{metrics.queries} queries"',
+            f'app;dur={app_ms:.1f}',
+            f'ser;dur={ser_ms:.1f}',
+            f'render;dur={render_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+        flags = []
+        if total_ms > settings.INSTRUMENTATION_SLOW_REQUEST_MS:
+            flags.append('slow')
+        if metrics.queries > settings.INSTRUMENTATION_MAX_QUERIES:
+            flags.append('too_many_queries')
+
+        line = (
+            f'method={request.method} path={request.path} status={response.status_code} '
+            f'queries={metrics.queries} db_ms={db_ms:.1f} app_ms={app_ms:.1f} '
+            f'ser_ms={ser_ms:.1f} render_ms={render_ms:.1f} total_ms={total_ms:.1f} '
+            f'size={size if size is not None else "stream"} connections={metrics.connections}'
+        )
+        pool = pool_stats()
+        if pool is not None:
+            line += (
+                f' pool_size={pool["size"]} pool_available={pool["available"]} '
+                f'pool_waiting={pool["waiting"]}'
+            )
+            if pool['waiting']:
+                flags.append('pool_exhausted')
+        if flags:
+            line += f' flags={",".join(flags)}'
+
+        logger = logging.getLogger(self._logger_name(request))
+        logger.log(logging.WARNING if flags else logging.INFO, line)
+
+    @staticmethod
+    def _logger_name(request):
+        """Logger de l'application qui a traité la requête"""
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            view = match.func
+            view_class = getattr(view, 'cls', None) or getattr(view, 'view_class', None)
+            module = (view_class or view).__module__
+            app = module.split('.')[0]
+            if app in INSTRUMENTED_APPS:
+                return app
+        return 'django.request'
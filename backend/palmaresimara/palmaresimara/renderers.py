@@ -0,0 +1,122 @@
+"""
+Renderers et parser de l'API.
+
+JSON est rendu et lu avec orjson (ORJSONRenderer, ORJSONParser), bien plus
+rapide que le module json sur les grandes pages et les analytics. La sortie
+est octet pour octet celle de JSONRenderer (séparateurs compacts, UTF-8,
+dates au format de DRF, U+2028 et U+2029 échappés), à deux exceptions
+près : l'exposant des flottants très petits ou très grands (1e-5 au lieu
+de 1e-05, même valeur une fois lue) et NaN/Infinity, rendus null au lieu
+d'une erreur. L'indentation demandée (`Accept: application/json; indent=4`)
+et les entiers hors 64 bits passent par JSONRenderer ; sans orjson
+installé, tout y passe.
+
+Formats compacts, choisis par l'en-tête Accept (ou le paramètre `format`) :
+
+- JSON en colonnes (`application/vnd.palmaresimara.columnar+json`,
+  `?format=columnar`) : chaque liste d'objets de mêmes clés (page de
+  résultats, regroupements des analytics) devient un objet avec un tableau
+  par champ. Les noms de champs ne sont plus répétés à chaque ligne.
+- MessagePack (`application/msgpack`, `?format=msgpack`) : JSON binaire,
+  disponible si le paquet msgpack est installé.
+
+Les deux formats s'ajoutent à la compression des réponses (voir
+palmaresimara.compression) ; `benchmark_payloads` compare tailles et temps
+d'encodage.
+"""
+import importlib.util
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (
+    # Dates, heures : format de JSONEncoder (…Z pour UTC, microsecondes gardées)
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    if orjson is not None else 0
+)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer rendu par orjson, même sortie"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=JSONEncoder().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # Entier hors 64 bits, par exemple : erreur éventuelle levée par json
+            return super().render(data, accepted_media_type, renderer_context)
+        # Sous-ensemble strict de JavaScript, comme JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser lu par orjson (corps en UTF-8)"""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            # NaN et Infinity refusés, comme avec STRICT_JSON
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+def to_columns(data):
+    """
+    Remplace récursivement chaque liste non vide d'objets ayant les mêmes
+    clés par {clé: [valeurs]} ; les objets imbriqués dans les lignes restent
+    tels quels
+    """
+    if isinstance(data, dict):
+        return {key: to_columns(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)) and data and all(isinstance(row, dict) for row in data):
+        keys = list(data[0])
+        if all(list(row) == keys for row in data):
+            return {key: [row[key] for row in data] for key in keys}
+    return data
+
+
+class ColumnarJSONRenderer(ORJSONRenderer):
+    """JSON dont les listes d'objets sont transposées en colonnes"""
+    media_type = 'application/vnd.palmaresimara.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_columns(data), accepted_media_type, renderer_context)
+
+
+def msgpack_available():
+    return importlib.util.find_spec('msgpack') is not None
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack (nécessite msgpack) ; dates, décimaux... encodés comme en JSON"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        import msgpack
+
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=JSONEncoder().default, use_bin_type=True)
@@ -0,0 +1,64 @@
+"""
+Routage des lectures vers les réplicas (DATABASE_URL_REPLICA_*).
+
+Seules les lectures effectuées dans un bloc `use_replica()` (requêtes GET des
+vues d'élèves, d'inscriptions et d'analytics) partent sur un réplica, le même
+pour tout le bloc (tiré à son entrée) : les lectures d'une requête voient un
+état cohérent et n'ouvrent qu'une connexion. Les
+écritures vont toujours sur la base principale ; dès qu'une écriture a lieu
+dans le bloc, ou pendant une transaction ouverte sur la base principale, les
+lectures suivantes y restent aussi (lecture après écriture cohérente).
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# État du bloc use_replica() courant : None hors bloc
+_state = ContextVar('replica_state', default=None)
+
+# Applications lues sur la base principale : un jeton ou un compte tout juste
+# créé doit être visible immédiatement, quel que soit le retard du réplica
+PRIMARY_ONLY_APPS = {'auth', 'authtoken', 'contenttypes', 'sessions', 'admin'}
+
+
+@contextmanager
+def use_replica():
+    """Autorise les lectures sur un réplica pour la durée du bloc"""
+    replicas = settings.REPLICA_DATABASES
+    token = _state.set({'pinned': False, 'replica': random.choice(replicas) if replicas else None})
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+class ReplicaRouter:
+    """Routeur de base de données : lectures sur réplica, écritures sur la principale"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            state is None
+            or state['pinned']
+            or state['replica'] is None
+            or model._meta.app_label in PRIMARY_ONLY_APPS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return state['replica']
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state['pinned'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplicas et base principale contiennent les mêmes données
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Les réplicas reçoivent le schéma par la réplication
+        return db not in settings.REPLICA_DATABASES
@@ -10,8 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
 import os
 from pathlib import Path
+import dj_database_url
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -53,6 +55,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "palmaresimara.middleware.RequestInstrumentationMiddleware",
+    "palmaresimara.compression.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -88,9 +92,41 @@ WSGI_APPLICATION = "palmaresimara.wsgi.application"
 
 # Configuration de la base de données depuis les variables d'environnement
 DATABASE_URL = os.getenv('DATABASE_URL')
+# Connexions persistantes : durée de vie en secondes (0 = une connexion par
+# requête, par défaut comme Django ; vide = illimitée ; 60 recommandé en
+# production) et vérification avant réutilisation
+DB_CONN_MAX_AGE = os.getenv('DB_CONN_MAX_AGE', '0')
+DB_CONN_MAX_AGE = int(DB_CONN_MAX_AGE) if DB_CONN_MAX_AGE else None
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true'
+# Pool de connexions dans le processus (PostgreSQL, nécessite psycopg[pool]) ;
+# remplace les connexions persistantes
+DB_POOL = os.getenv('DB_POOL', 'False').lower() == 'true'
+
+
+def parse_database_url(url):
+    """Configuration d'une base depuis son URL, avec les options de connexion"""
+    config = dj_database_url.parse(
+        url,
+        conn_max_age=0 if DB_POOL else DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+    )
+    if DB_POOL:
+        config.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            # Attente maximale d'une connexion libre (secondes)
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            # Fermeture des connexions inutilisées / trop anciennes (secondes)
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+            'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '3600')),
+            'name': 'palmaresimara',
+        }
+    return config
+
+
 if DATABASE_URL:
     DATABASES = {
-        'default': dj_database_url.parse(DATABASE_URL)
+        'default': parse_database_url(DATABASE_URL)
     }
 else:
     # Configuration par défaut pour le développement (SQLite)
@@ -101,6 +137,49 @@ else:
         }
     }
 
+# Réplicas en lecture seule : DATABASE_URL_REPLICA_1, DATABASE_URL_REPLICA_EU...
+# deviennent les alias replica_1, replica_eu. Les lectures des vues d'élèves,
+# d'inscriptions et d'analytics y sont réparties (voir palmaresimara.routers)
+REPLICA_DATABASES = []
+for name, url in sorted(os.environ.items()):
+    if name.startswith('DATABASE_URL_REPLICA_') and url:
+        alias = 'replica_' + name[len('DATABASE_URL_REPLICA_'):].lower()
+        DATABASES[alias] = parse_database_url(url)
+        # En test, le réplica pointe sur la base de test principale
+        DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+        REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['palmaresimara.routers.ReplicaRouter'] if REPLICA_DATABASES else []
+
+# Profil SQLite de production, à activer explicitement (SQLITE_TUNING=True) :
+# journal WAL (les lectures ne sont plus bloquées par une écriture en cours),
+# PRAGMA exécutés à chaque nouvelle connexion et transactions IMMEDIATE (le
+# verrou d'écriture est pris dès BEGIN : un second écrivain attend
+# busy_timeout au lieu d'échouer sur « database is locked »). Désactivé par
+# défaut : WAL crée des fichiers -wal/-shm à sauvegarder avec la base, et
+# IMMEDIATE verrouille en écriture toute transaction, même en lecture seule
+SQLITE_TUNING = os.getenv('SQLITE_TUNING', 'False').lower() == 'true'
+SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', '20'))  # secondes
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '65536'))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_TUNING_OPTIONS = {
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': SQLITE_BUSY_TIMEOUT,
+    'init_command': ';'.join([
+        'PRAGMA journal_mode=WAL',
+        f'PRAGMA synchronous={SQLITE_SYNCHRONOUS}',
+        f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}',
+        f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}',
+        'PRAGMA temp_store=MEMORY',
+        f'PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT * 1000)}',
+    ]),
+}
+
+for database in DATABASES.values():
+    if SQLITE_TUNING and database['ENGINE'] == 'django.db.backends.sqlite3':
+        database.setdefault('OPTIONS', {}).update(SQLITE_TUNING_OPTIONS)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -159,9 +238,93 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    # JSON (orjson) par défaut ; formats compacts sur demande (Accept ou
+    # ?format=), voir palmaresimara/renderers.py
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'palmaresimara.renderers.ORJSONRenderer',
+        'palmaresimara.renderers.ColumnarJSONRenderer',
+        *(['palmaresimara.renderers.MessagePackRenderer'] if importlib.util.find_spec('msgpack') else []),
     ],
+    'DEFAULT_PARSER_CLASSES': [
+        'palmaresimara.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Débit des clients anonymes sur analytics et top_students, voir
+    # palmaresimara/throttling.py (vide, par défaut : pas de limite ; à activer
+    # avec un cache partagé et API_NUM_PROXIES derrière un proxy)
+    'DEFAULT_THROTTLE_RATES': {
+        'anon_expensive': os.getenv('ANON_EXPENSIVE_THROTTLE_RATE', '') or None,
+    },
+    # Proxys devant l'application : adresse du client lue dans X-Forwarded-For
+    'NUM_PROXIES': int(os.getenv('API_NUM_PROXIES')) if os.getenv('API_NUM_PROXIES') else None,
+}
+
+# Nombre maximal de lignes acceptées par /api/enrollments/bulk/
+BULK_ENROLLMENT_MAX_ROWS = int(os.getenv('BULK_ENROLLMENT_MAX_ROWS', '10000'))
+
+# Classements précalculés (/api/enrollments/top_students/) : taille des
+# classements tenus en cache (limite maximale acceptée) et durée de vie,
+# plus courte avec un cache propre au processus (LocMem) qui ne voit pas les
+# écritures des autres processus
+LEADERBOARD_SIZE = int(os.getenv('LEADERBOARD_SIZE', '100'))
+LEADERBOARD_TIMEOUT = int(os.getenv('LEADERBOARD_TIMEOUT', '3600'))
+LEADERBOARD_LOCAL_TIMEOUT = int(os.getenv('LEADERBOARD_LOCAL_TIMEOUT', '30'))
+
+# Analytics : threads exécutant en parallèle les groupes de requêtes
+# indépendants d'un tableau de bord, partagés par le processus (1 = en série).
+# Chaque thread garde sa connexion : prévoir autant de connexions en plus.
+# En série par défaut sur SQLite, où les requêtes consomment le CPU du
+# processus web lui-même
+ANALYTICS_QUERY_WORKERS = int(os.getenv(
+    'ANALYTICS_QUERY_WORKERS',
+    '1' if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3' else '4'
+))
+# Durée de vie en secondes des réponses d'analytics en cache (toute écriture
+# les invalide, voir students.coalesce)
+ANALYTICS_CACHE_TIMEOUT = int(os.getenv('ANALYTICS_CACHE_TIMEOUT', '300'))
+
+# Requêtes identiques simultanées (analytics, classements froids) : un seul
+# calcul, les autres attendent son résultat au plus N secondes
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_TIMEOUT', '30'))
+
+# Préchauffage des analytics, statistiques des classes et classements des
+# années importées, à la fin de chaque import (voir analytics.warming)
+CACHE_WARMING_AFTER_IMPORT = os.getenv('CACHE_WARMING_AFTER_IMPORT', 'True').lower() == 'true'
+
+# Sauvegardes incrémentales (backup_db --incremental) : recouvrement en
+# secondes avec la sauvegarde précédente, pour les lignes validées après son
+# watermark mais datées d'avant (transactions longues, imports)
+BACKUP_WATERMARK_OVERLAP = int(os.getenv('BACKUP_WATERMARK_OVERLAP', '3600'))
+
+# Vue de lecture dénormalisée des inscriptions (students.listing) : la liste
+# /api/enrollments/ filtre, trie et compte sur la table EnrollmentListing,
+# tenue à jour à l'écriture. Après activation sur une base existante,
+# exécuter `python manage.py rebuild_listing`
+ENROLLMENT_READ_MODEL = os.getenv('ENROLLMENT_READ_MODEL', 'False').lower() == 'true'
+
+# Cache en mémoire des années, classes et sections (students.dimensions) :
+# comparé à la version partagée une fois par requête, et hors requête au
+# plus toutes les N secondes (threads d'import, commandes)
+DIMENSION_CACHE_CHECK_INTERVAL = float(os.getenv('DIMENSION_CACHE_CHECK_INTERVAL', '5'))
+
+# Imports asynchrones (/api/imports/)
+# Nombre de threads exécutant les imports dans le processus web ;
+# 0 pour les confier à la commande `run_import_jobs`
+IMPORT_JOBS_WORKERS = int(os.getenv('IMPORT_JOBS_WORKERS', '1'))
+# Fréquence (en lignes) de publication de la progression
+IMPORT_JOBS_PROGRESS_BATCH = int(os.getenv('IMPORT_JOBS_PROGRESS_BATCH', '100'))
+# Durée (en secondes) au-delà de laquelle un import en cours est tenu pour
+# interrompu (processus arrêté) et marqué en échec ; supérieure à l'import le plus long
+IMPORT_JOBS_STALE_AFTER = int(os.getenv('IMPORT_JOBS_STALE_AFTER', '21600'))
+
+# Cache (progression des imports...) ; utiliser un cache partagé
+# (base de données, Redis) lorsque plusieurs processus sont déployés
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'palmaresimara'),
+    }
 }
 
 # CORS Configuration
@@ -175,6 +338,18 @@ STATIC_ROOT = os.getenv('STATIC_ROOT', BASE_DIR / 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.getenv('MEDIA_ROOT', BASE_DIR / 'media')
 
+# Instrumentation des requêtes (requêtes SQL, temps, taille ; voir palmaresimara/middleware.py)
+REQUEST_INSTRUMENTATION = os.getenv('REQUEST_INSTRUMENTATION', 'False').lower() == 'true'
+# Seuils au-delà desquels une requête est signalée (log WARNING)
+INSTRUMENTATION_SLOW_REQUEST_MS = float(os.getenv('INSTRUMENTATION_SLOW_REQUEST_MS', '500'))
+INSTRUMENTATION_MAX_QUERIES = int(os.getenv('INSTRUMENTATION_MAX_QUERIES', '30'))
+
+# Compression des réponses de l'API (JSON, MessagePack ; brotli, zstd si
+# installés, gzip sinon ; voir palmaresimara/compression.py) à partir de
+# cette taille en octets. Les pages HTML ne sont jamais compressées (BREACH)
+RESPONSE_COMPRESSION = os.getenv('RESPONSE_COMPRESSION', 'True').lower() == 'true'
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv('RESPONSE_COMPRESSION_MIN_SIZE', '1024'))
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -0,0 +1,22 @@
+"""
+Limitation du débit des endpoints coûteux (analytics, top_students).
+
+Seuls les clients anonymes sont limités, par adresse IP (derrière un proxy,
+NUM_PROXIES de REST_FRAMEWORK désigne l'adresse à retenir dans
+X-Forwarded-For). L'historique des requêtes est tenu dans le cache par
+défaut : partagé entre processus avec Redis ou Memcached.
+"""
+from rest_framework.settings import api_settings
+from rest_framework.throttling import AnonRateThrottle
+
+
+class ExpensiveAnonRateThrottle(AnonRateThrottle):
+    """
+    Débit des clients anonymes sur les endpoints coûteux
+    (ANON_EXPENSIVE_THROTTLE_RATE, vide par défaut : pas de limite)
+    """
+    scope = 'anon_expensive'
+
+    def get_rate(self):
+        # Taux lu à chaque requête : THROTTLE_RATES est figé à l'import de DRF
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
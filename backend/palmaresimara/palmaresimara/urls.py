@@ -18,9 +18,20 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.authtoken.views import obtain_auth_token
+from analytics.views import AsyncAnalyticsView
+from students.async_views import AsyncStudentListView, AsyncEnrollmentListView, AsyncTopStudentsView
+
+# Lectures asynchrones, pour un déploiement ASGI (voir students.async_views)
+async_urlpatterns = [
+    path("students/", AsyncStudentListView.as_view(), name='async-student-list'),
+    path("enrollments/", AsyncEnrollmentListView.as_view(), name='async-enrollment-list'),
+    path("enrollments/top_students/", AsyncTopStudentsView.as_view(), name='async-top-students'),
+    path("analytics/", AsyncAnalyticsView.as_view(), name='async-analytics'),
+]
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("api/async/", include(async_urlpatterns)),
     path("api/", include("students.urls")),
     path("api/analytics/", include("analytics.urls")),
     path("api/auth/login/", obtain_auth_token, name='api_token_auth'),
@@ -1,7 +1,8 @@
 from django.contrib import admin
+from django.db.models import Count, Prefetch
 from django.http import HttpResponse
 from django.utils.safestring import mark_safe
-from .models import SchoolYear, Classe, Section, Student, Enrollment
+from .models import SchoolYear, Classe, Section, Student, Enrollment, ImportJob
 import csv
 import datetime
 
@@ -34,8 +35,54 @@ def export_to_csv(modeladmin, request, queryset):
 export_to_csv.short_description = "Exporter en CSV"
 
 
+class EnrollmentCountMixin:
+    """
+    Annote le nombre d'inscriptions dans la requête de la liste
+    (au lieu d'un COUNT par ligne affichée)
+    """
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _enrollment_count=Count('enrollments', distinct=True)
+        )
+    
+    @admin.display(description="Nombre d'inscriptions", ordering='_enrollment_count')
+    def enrollment_count(self, obj):
+        """Retourne le nombre d'inscriptions"""
+        return obj._enrollment_count
+
+
+class PercentageBandFilter(admin.SimpleListFilter):
+    """
+    Filtre par tranche de pourcentage (un filtre sur chaque valeur distincte
+    chargerait toutes les valeurs de la table)
+    """
+    title = "Pourcentage"
+    parameter_name = 'percentage_band'
+    bands = {
+        'excellent': ("Excellent (≥ 90)", 90, None),
+        'tres_bien': ("Très bien (80-90)", 80, 90),
+        'bien': ("Bien (70-80)", 70, 80),
+        'assez_bien': ("Assez bien (60-70)", 60, 70),
+        'passable': ("Passable (50-60)", 50, 60),
+        'insuffisant': ("Insuffisant (< 50)", None, 50),
+    }
+    
+    def lookups(self, request, model_admin):
+        return [(key, label) for key, (label, _, _) in self.bands.items()]
+    
+    def queryset(self, request, queryset):
+        if self.value() not in self.bands:
+            return queryset
+        _, low, high = self.bands[self.value()]
+        if low is not None:
+            queryset = queryset.filter(percentage__gte=low)
+        if high is not None:
+            queryset = queryset.filter(percentage__lt=high)
+        return queryset
+
+
 @admin.register(SchoolYear)
-class SchoolYearAdmin(admin.ModelAdmin):
+class SchoolYearAdmin(EnrollmentCountMixin, admin.ModelAdmin):
     """
     Administration des années scolaires
     """
@@ -44,15 +91,10 @@ class SchoolYearAdmin(admin.ModelAdmin):
     search_fields = ['year']
     ordering = ['-year']
     actions = [export_to_csv]
-    
-    def enrollment_count(self, obj):
-        """Retourne le nombre d'inscriptions pour cette année"""
-        return obj.enrollments.count()
-    enrollment_count.short_description = "Nombre d'inscriptions"
 
 
 @admin.register(Classe)
-class ClasseAdmin(admin.ModelAdmin):
+class ClasseAdmin(EnrollmentCountMixin, admin.ModelAdmin):
     """
     Administration des classes
     """
@@ -61,15 +103,10 @@ class ClasseAdmin(admin.ModelAdmin):
     search_fields = ['name']
     ordering = ['name']
     actions = [export_to_csv]
-    
-    def enrollment_count(self, obj):
-        """Retourne le nombre d'inscriptions pour cette classe"""
-        return obj.enrollments.count()
-    enrollment_count.short_description = "Nombre d'inscriptions"
 
 
 @admin.register(Section)
-class SectionAdmin(admin.ModelAdmin):
+class SectionAdmin(EnrollmentCountMixin, admin.ModelAdmin):
     """
     Administration des sections
     """
@@ -78,11 +115,6 @@ class SectionAdmin(admin.ModelAdmin):
     search_fields = ['name']
     ordering = ['name']
     actions = [export_to_csv]
-    
-    def enrollment_count(self, obj):
-        """Retourne le nombre d'inscriptions pour cette section"""
-        return obj.enrollments.count()
-    enrollment_count.short_description = "Nombre d'inscriptions"
 
 
 class EnrollmentInline(admin.TabularInline):
@@ -97,7 +129,7 @@ class EnrollmentInline(admin.TabularInline):
 
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(EnrollmentCountMixin, admin.ModelAdmin):
     """
     Administration des étudiants
     """
@@ -108,14 +140,21 @@ class StudentAdmin(admin.ModelAdmin):
     inlines = [EnrollmentInline]
     actions = [export_to_csv]
     
-    def enrollment_count(self, obj):
-        """Retourne le nombre d'inscriptions pour cet étudiant"""
-        return obj.enrollments.count()
-    enrollment_count.short_description = "Nombre d'inscriptions"
+    def get_queryset(self, request):
+        """Précharge les inscriptions pour la colonne de dernière inscription"""
+        return super().get_queryset(request).prefetch_related(
+            Prefetch(
+                'enrollments',
+                queryset=Enrollment.objects.select_related(
+                    'school_year', 'classe', 'section'
+                ).order_by('-school_year__year'),
+                to_attr='enrollments_by_year'
+            )
+        )
     
     def latest_enrollment(self, obj):
         """Retourne la dernière inscription de l'étudiant"""
-        latest = obj.enrollments.order_by('-school_year__year').first()
+        latest = obj.enrollments_by_year[0] if obj.enrollments_by_year else None
         if latest:
             return f"{latest.school_year.year} - {latest.classe.name} {latest.section.name} ({latest.percentage}%)"
         return "Aucune inscription"
@@ -133,7 +172,7 @@ class EnrollmentAdmin(admin.ModelAdmin):
     ]
     list_filter = [
         'school_year', 'classe', 'section', 
-        'created_at', 'percentage'
+        'created_at', PercentageBandFilter
     ]
     search_fields = [
         'student__full_name', 'school_year__year', 
@@ -182,6 +221,21 @@ class EnrollmentAdmin(admin.ModelAdmin):
         )
 
 
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    """
+    Administration des imports asynchrones
+    """
+    list_display = ['id', 'file', 'status', 'stage', 'rows_processed', 'rows_total', 'created_by', 'created_at']
+    list_filter = ['status', 'created_at']
+    ordering = ['-created_at']
+    readonly_fields = [
+        'status', 'stage', 'rows_total', 'rows_processed', 'errors', 'result',
+        'created_by', 'started_at', 'finished_at', 'created_at', 'updated_at'
+    ]
+    list_select_related = ['created_by']
+
+
 # Configuration de l'admin
 admin.site.site_header = "Administration Palmares Imara"
 admin.site.site_title = "Palmares Imara"
@@ -0,0 +1,173 @@
+"""
+Vues asynchrones (ASGI) des lectures les plus sollicitées.
+
+Servies sous /api/async/ : liste et recherche d'élèves, liste des
+inscriptions, top_students et analytics (voir
+analytics.views.AsyncAnalyticsView). Sous un serveur ASGI (uvicorn), une vue
+DRF synchrone occupe un thread pendant toute la requête ; ces vues restent
+sur la boucle d'événements et n'attendent que leurs requêtes SQL, faites
+avec l'ORM asynchrone (`acount`, `aiterator`, `aaggregate`...).
+
+Elles reprennent les filtres, la recherche, le tri, la pagination et les
+serializers des viewsets DRF correspondants : les réponses sont les mêmes.
+Comme les lectures des viewsets (IsAdminOrReadOnly), elles sont ouvertes à
+tous, et servies par les réplicas s'ils sont configurés.
+
+Le middleware d'instrumentation (REQUEST_INSTRUMENTATION) est synchrone :
+activé, il ramène toute la chaîne de middlewares dans un thread.
+"""
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound, Throttled
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from palmaresimara.routers import use_replica
+from palmaresimara.throttling import ExpensiveAnonRateThrottle
+
+from . import leaderboard, listing
+from .models import EnrollmentListing
+from .views import StudentViewSet, EnrollmentViewSet, top_students_limit, top_students_scope
+
+
+def api_response(data, status=status.HTTP_200_OK, request=None):
+    """
+    Réponse rendue par les renderers de DRF (mêmes octets que les viewsets) :
+    celui demandé par `request` (Accept ou `?format=`), JSON par défaut
+    """
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    if request is not None:
+        renderers = [renderer_class() for renderer_class in api_settings.DEFAULT_RENDERER_CLASSES]
+        renderer, _ = DefaultContentNegotiation().select_renderer(Request(request), renderers)
+    return HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """Pagination de DRF dont le comptage et la lecture de la page sont asynchrones"""
+
+    async def apaginate_queryset(self, queryset, request):
+        self.request = request
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        # Comptage fait ici : le Paginator ne lit plus la base ensuite
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+        return [obj async for obj in self.page.object_list.aiterator()]
+
+
+class AsyncReadView(View):
+    """
+    Base des vues asynchrones en lecture : réplicas, limites de débit
+    (`throttle_classes`, comme les vues DRF), et erreurs de l'API (filtre
+    invalide, page inexistante...) rendues comme par DRF
+    """
+    http_method_names = ['get', 'head', 'options']
+    throttle_classes = ()
+
+    def check_throttles(self, request):
+        """Lève Throttled si une limite est atteinte (authentification et cache : synchrone)"""
+        request = Request(request, authenticators=[
+            authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ])
+        waits = [
+            throttle.wait() for throttle in (throttle_class() for throttle_class in self.throttle_classes)
+            if not throttle.allow_request(request, self)
+        ]
+        if waits:
+            waits = [wait for wait in waits if wait is not None]
+            raise Throttled(max(waits, default=None))
+
+    async def dispatch(self, request, *args, **kwargs):
+        with use_replica():
+            try:
+                if self.throttle_classes:
+                    await sync_to_async(self.check_throttles)(request)
+                return await super().dispatch(request, *args, **kwargs)
+            except APIException as exc:
+                data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+                response = api_response(data, status=exc.status_code)
+                if getattr(exc, 'wait', None):
+                    response.headers['Retry-After'] = '%d' % exc.wait
+                return response
+
+
+class AsyncListView(AsyncReadView):
+    """
+    Action list d'un viewset DRF en asynchrone : mêmes filtres, recherche,
+    tri, pagination et serializer
+    """
+    viewset_class = None
+
+    async def get(self, request):
+        viewset = self.viewset_class(
+            request=Request(request), args=(), kwargs={}, format_kwarg=None, action='list'
+        )
+        # Filtres et serializer lisent le cache des dimensions, qui peut se
+        # recharger depuis la base : hors de la boucle d'événements
+        queryset = await sync_to_async(viewset.filter_queryset)(viewset.get_queryset())
+
+        paginator = AsyncPageNumberPagination()
+        page = await paginator.apaginate_queryset(queryset, viewset.request)
+        data = await self.serialize(viewset, page)
+        return api_response(paginator.get_paginated_response(data).data, request=request)
+
+    @staticmethod
+    async def serialize(viewset, objects):
+        return await sync_to_async(lambda: viewset.get_serializer(objects, many=True).data)()
+
+
+class AsyncStudentListView(AsyncListView):
+    """Liste et recherche d'élèves (équivalent de GET /api/students/)"""
+    viewset_class = StudentViewSet
+
+
+class AsyncEnrollmentListView(AsyncListView):
+    """Liste des inscriptions (équivalent de GET /api/enrollments/)"""
+    viewset_class = EnrollmentViewSet
+
+    async def get(self, request):
+        if not listing.is_enabled():
+            return await super().get(request)
+
+        # Vue de lecture : page d'identifiants, puis inscriptions de la page
+        viewset = self.viewset_class(
+            request=Request(request), args=(), kwargs={}, format_kwarg=None, action='list'
+        )
+        ids = await sync_to_async(listing.filter_queryset)(viewset.request, EnrollmentListing.objects.all())
+        paginator = AsyncPageNumberPagination()
+        page = await paginator.apaginate_queryset(ids.values_list('enrollment_id', flat=True), viewset.request)
+        objects = await viewset.get_queryset().ain_bulk(page)
+        enrollments = [objects[pk] for pk in page if pk in objects]
+        data = await self.serialize(viewset, enrollments)
+        return api_response(paginator.get_paginated_response(data).data, request=request)
+
+
+class AsyncTopStudentsView(AsyncReadView):
+    """Meilleurs élèves (équivalent de GET /api/enrollments/top_students/)"""
+    throttle_classes = [ExpensiveAnonRateThrottle]
+
+    async def get(self, request):
+        try:
+            limit = top_students_limit(request.GET)
+        except ValueError as e:
+            return api_response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Identifiants des filtres donnés par nom : cache des dimensions,
+        # rechargé depuis la base si besoin (API synchrone)
+        scope = await sync_to_async(top_students_scope)(request.GET)
+        if scope is None:
+            return api_response([], request=request)
+
+        # Classement lu dans le cache (calculé s'il est froid) : API synchrone
+        entries = await sync_to_async(leaderboard.top)(scope, limit)
+        return api_response(entries, request=request)
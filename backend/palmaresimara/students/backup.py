@@ -0,0 +1,411 @@
+"""
+Sauvegarde et restauration rapides de la base (commandes backup_db et
+restore_db).
+
+Une sauvegarde est un fichier NDJSON compressé (gzip) : un en-tête, puis
+chaque table dans l'ordre des dépendances (clés étrangères), ses lignes
+étant des tableaux de valeurs brutes lus par morceaux avec `.iterator()`.
+Ni instances de modèle ni sérialiseur Django : la mémoire ne dépend pas de
+la taille des tables et la lecture comme l'écriture restent linéaires.
+
+La restauration vide les tables sauvegardées puis réinsère les lignes par
+lots (`executemany`, avec leurs identifiants et horodatages d'origine) dans
+une seule transaction ; les séquences sont ensuite recalées.
+
+Une sauvegarde incrémentale ne contient, pour les modèles munis de
+`updated_at`, que les lignes modifiées depuis le watermark de la sauvegarde
+précédente (moins une marge de recouvrement, pour les transactions validées
+après coup) et les suppressions journalisées dans DeletionLog ; les autres
+tables, petites (comptes, jetons...), y sont copiées entières. Elle se
+rejoue après la sauvegarde complète et les incrémentales qui la précèdent.
+"""
+import base64
+import datetime
+import decimal
+import gzip
+import json
+import uuid
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+from . import dimensions, leaderboard, listing
+
+FORMAT = 'palmaresimara-backup'
+VERSION = 1
+CHUNK_SIZE = 5000
+COMPRESS_LEVEL = 6
+
+# Exclus par défaut : sessions éphémères, journal des suppressions et vue de
+# lecture des inscriptions (reconstruite à la restauration)
+DEFAULT_EXCLUDE = ['sessions', 'students.deletionlog', 'students.enrollmentlisting']
+
+# Champ de date de modification des modèles sauvegardés en incrémental
+WATERMARK_FIELD = 'updated_at'
+
+# Types de colonnes dont la valeur JSON s'insère telle quelle
+PASSTHROUGH_TYPES = {
+    'AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField', 'BigIntegerField',
+    'SmallIntegerField', 'PositiveIntegerField', 'PositiveBigIntegerField',
+    'PositiveSmallIntegerField', 'FloatField', 'BooleanField', 'CharField', 'TextField',
+    'SlugField', 'EmailField', 'URLField', 'FileField', 'ImageField', 'FilePathField',
+}
+
+
+def _encode(value):
+    """Valeurs non JSON lues en base"""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if isinstance(value, (bytes, memoryview)):
+        return base64.b64encode(bytes(value)).decode('ascii')
+    raise TypeError(f'Valeur non sauvegardable : {type(value).__name__}')
+
+
+def _dumps(value):
+    return json.dumps(value, default=_encode, ensure_ascii=False, separators=(',', ':'))
+
+
+def backup_models(exclude=DEFAULT_EXCLUDE):
+    """
+    Modèles concrets à sauvegarder, chaque modèle après ceux qu'il référence.
+
+    `exclude` contient des applications ("sessions") ou des modèles
+    ("students.importjob").
+    """
+    exclude = {label.lower() for label in exclude}
+    candidates = [
+        model for model in apps.get_models(include_auto_created=True)
+        if model._meta.managed and not model._meta.proxy
+        and model._meta.app_label not in exclude
+        and model._meta.label_lower not in exclude
+    ]
+    ordered = []
+    visiting = set()
+
+    def visit(model):
+        if model in ordered or model in visiting:
+            return
+        visiting.add(model)
+        for field in model._meta.concrete_fields:
+            related = field.related_model
+            if related is not None and related is not model and related in candidates:
+                visit(related._meta.concrete_model)
+        visiting.discard(model)
+        ordered.append(model)
+
+    for model in candidates:
+        visit(model)
+    return ordered
+
+
+def incremental_models():
+    """Modèles sauvegardés en incrémental : ceux munis de updated_at"""
+    return [
+        model for model in backup_models()
+        if any(field.name == WATERMARK_FIELD for field in model._meta.concrete_fields)
+    ]
+
+
+def log_deletion(sender, instance, **kwargs):
+    """Receveur post_delete : journalise la suppression pour l'incrémental suivant"""
+    from .models import DeletionLog
+    DeletionLog.objects.create(model=sender._meta.label_lower, object_id=str(instance.pk))
+
+
+@contextmanager
+def _snapshot(connection):
+    """
+    Transaction de lecture donnant une vue cohérente de toutes les tables,
+    sans bloquer les écritures (SQLite en WAL, PostgreSQL REPEATABLE READ)
+    """
+    if connection.in_atomic_block:
+        yield
+    elif connection.vendor == 'sqlite':
+        # transaction.atomic() prendrait le verrou d'écriture (mode IMMEDIATE)
+        with connection.cursor() as cursor:
+            cursor.execute('BEGIN DEFERRED')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('COMMIT')
+    else:
+        with transaction.atomic(using=connection.alias):
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+            yield
+
+
+def write_backup(path, using='default', exclude=DEFAULT_EXCLUDE, progress=None,
+                 previous=None, overlap=None):
+    """
+    Écrit une sauvegarde de la base `using` dans `path` : complète, ou
+    incrémentale depuis la sauvegarde d'en-tête `previous`.
+
+    `overlap` (secondes, défaut BACKUP_WATERMARK_OVERLAP) recule le début
+    de l'incrémentale pour inclure les lignes validées après le watermark
+    précédent mais datées d'avant. `progress(label, rows, done)` est appelé
+    après chaque morceau et à la fin de chaque table. Retourne le nombre de
+    lignes par table.
+    """
+    from .models import DeletionLog
+
+    models = backup_models(exclude)
+    tracked = set(incremental_models()) if previous else set()
+    if overlap is None:
+        overlap = settings.BACKUP_WATERMARK_OVERLAP
+    watermark = timezone.now()
+    since = None
+    if previous:
+        since = datetime.datetime.fromisoformat(previous['watermark']) - datetime.timedelta(seconds=overlap)
+    tables = {}
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=COMPRESS_LEVEL) as handle:
+        handle.write(_dumps({'backup': {
+            'format': FORMAT,
+            'version': VERSION,
+            'kind': 'incremental' if previous else 'full',
+            'created_at': watermark.isoformat(),
+            'watermark': watermark.isoformat(),
+            'previous_watermark': previous['watermark'] if previous else None,
+            'since': since.isoformat() if since else None,
+            'vendor': connections[using].vendor,
+            'models': [model._meta.label_lower for model in models],
+        }}) + '\n')
+
+        with _snapshot(connections[using]):
+            # Suppressions d'abord : elles libèrent les contraintes d'unicité
+            for model in reversed(models):
+                if model not in tracked:
+                    continue
+                label = model._meta.label_lower
+                ids = list(
+                    DeletionLog.objects.using(using)
+                    .filter(model=label, deleted_at__gte=since)
+                    .values_list('object_id', flat=True).distinct()
+                )
+                for start in range(0, len(ids), CHUNK_SIZE):
+                    handle.write(_dumps({'deleted': label, 'ids': ids[start:start + CHUNK_SIZE]}) + '\n')
+
+            for model in models:
+                label = model._meta.label_lower
+                columns = [field.attname for field in model._meta.concrete_fields]
+                queryset = model._base_manager.using(using).order_by('pk')
+                mode = 'replace'
+                if model in tracked:
+                    queryset = queryset.filter(**{f'{WATERMARK_FIELD}__gte': since})
+                    mode = 'upsert'
+                handle.write(_dumps({'model': label, 'columns': columns, 'mode': mode}) + '\n')
+                rows = 0
+                buffer = []
+                for row in queryset.values_list(*columns).iterator(chunk_size=CHUNK_SIZE):
+                    buffer.append(_dumps(row))
+                    if len(buffer) >= CHUNK_SIZE:
+                        rows += len(buffer)
+                        handle.write('\n'.join(buffer) + '\n')
+                        buffer = []
+                        if progress:
+                            progress(label, rows, False)
+                if buffer:
+                    rows += len(buffer)
+                    handle.write('\n'.join(buffer) + '\n')
+                handle.write(_dumps({'end': label, 'rows': rows}) + '\n')
+                tables[label] = rows
+                if progress:
+                    progress(label, rows, True)
+
+        handle.write(_dumps({'complete': True, 'rows': sum(tables.values())}) + '\n')
+    return tables
+
+
+def prune_deletions(before, using='default'):
+    """Supprime le journal des suppressions antérieur à `before`"""
+    from .models import DeletionLog
+    return DeletionLog.objects.using(using).filter(deleted_at__lt=before).delete()[0]
+
+
+def read_header(path):
+    """En-tête d'une sauvegarde ; ValueError si le fichier n'en est pas une"""
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as handle:
+            header = json.loads(handle.readline()).get('backup')
+    except (OSError, ValueError, AttributeError):
+        header = None
+    if not header or header.get('format') != FORMAT:
+        raise ValueError(f'{path} n\'est pas une sauvegarde {FORMAT}')
+    if header.get('version') != VERSION:
+        raise ValueError(f'Version de sauvegarde non supportée : {header.get("version")}')
+    return header
+
+
+def _converter(field, connection):
+    """Conversion d'une valeur JSON vers la valeur à insérer, ou None si inutile"""
+    target = field
+    while target.remote_field is not None and not target.many_to_many:
+        target = target.target_field
+    if target.get_internal_type() in PASSTHROUGH_TYPES:
+        return None
+
+    def convert(value):
+        if value is None:
+            return None
+        return field.get_db_prep_save(field.to_python(value), connection)
+    return convert
+
+
+class _TableWriter:
+    """Insertion par lots des lignes d'une table"""
+
+    def __init__(self, model, columns, connection, upsert=False):
+        fields = {field.attname: field for field in model._meta.concrete_fields}
+        unknown = [column for column in columns if column not in fields]
+        if unknown:
+            raise ValueError(
+                f'{model._meta.label_lower} : colonnes inconnues {unknown} '
+                '(appliquer les migrations de la sauvegarde ?)'
+            )
+        quote = connection.ops.quote_name
+        self.cursor = connection.cursor()
+        self.sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(model._meta.db_table),
+            ', '.join(quote(fields[column].column) for column in columns),
+            ', '.join(['%s'] * len(columns)),
+        )
+        if upsert:
+            # Ligne déjà présente (modifiée depuis la sauvegarde précédente)
+            pk = model._meta.pk
+            self.sql += ' ' + connection.ops.on_conflict_suffix_sql(
+                [fields[column] for column in columns],
+                OnConflict.UPDATE,
+                [fields[column].column for column in columns if column != pk.attname],
+                [pk.column],
+            )
+        self.converters = [
+            (index, convert) for index, column in enumerate(columns)
+            if (convert := _converter(fields[column], connection)) is not None
+        ]
+        self.batch = []
+        self.rows = 0
+
+    def add(self, row):
+        for index, convert in self.converters:
+            row[index] = convert(row[index])
+        self.batch.append(row)
+        if len(self.batch) >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.cursor.executemany(self.sql, self.batch)
+            self.rows += len(self.batch)
+            self.batch = []
+
+
+def _records(path):
+    """Enregistrements décodés d'une sauvegarde"""
+    with gzip.open(path, 'rt', encoding='utf-8') as handle:
+        for line in handle:
+            yield json.loads(line)
+
+
+def _check_chain(path, incrementals):
+    """En-têtes de la sauvegarde complète et de ses incrémentales, dans l'ordre"""
+    headers = [read_header(path)]
+    if headers[0]['kind'] != 'full':
+        raise ValueError(f'{path} est une sauvegarde incrémentale : commencer par la sauvegarde complète')
+    for incremental in incrementals:
+        header = read_header(incremental)
+        if header['kind'] != 'incremental' or header['previous_watermark'] != headers[-1]['watermark']:
+            raise ValueError(f'{incremental} ne fait pas suite à la sauvegarde précédente')
+        headers.append(header)
+    return headers
+
+
+def _delete_ids(connection, model, ids):
+    pk = model._meta.pk
+    ids = [pk.to_python(value) for value in ids]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM {} WHERE {} IN ({})'.format(
+                quote(model._meta.db_table), quote(pk.column), ', '.join(['%s'] * len(ids))
+            ),
+            ids,
+        )
+
+
+def _apply(path, connection, progress, tables):
+    """Rejoue les enregistrements d'une sauvegarde"""
+    writer = None
+    label = None
+    complete = False
+    records = _records(path)
+    incremental = next(records)['backup']['kind'] == 'incremental'
+    for record in records:
+        if writer is None and (isinstance(record, list) or 'end' in record):
+            raise ValueError(f'{path} est invalide : ligne avant l\'en-tête de table')
+        if isinstance(record, list):
+            writer.add(record)
+            if progress and not writer.batch:
+                progress(label, writer.rows, False)
+        elif 'model' in record:
+            label = record['model']
+            model = apps.get_model(label)
+            upsert = record.get('mode') == 'upsert'
+            if incremental and not upsert:
+                # Petite table copiée entière : remplacée
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
+            writer = _TableWriter(model, record['columns'], connection, upsert=upsert)
+        elif 'deleted' in record:
+            _delete_ids(connection, apps.get_model(record['deleted']), record['ids'])
+        elif 'end' in record:
+            writer.flush()
+            if writer.rows != record['rows']:
+                raise ValueError(f'{label} : {writer.rows} lignes lues, {record["rows"]} attendues')
+            tables[label] = tables.get(label, 0) + writer.rows
+            if progress:
+                progress(label, writer.rows, True)
+            writer = None
+        elif record.get('complete'):
+            complete = True
+    if not complete:
+        raise ValueError(f'{path} est incomplet (sauvegarde interrompue ?)')
+
+
+def restore_backup(path, incrementals=(), using='default', progress=None):
+    """
+    Remplace le contenu des tables sauvegardées par celui de `path`, puis
+    rejoue les sauvegardes incrémentales `incrementals` dans l'ordre.
+
+    Tout se fait dans une transaction : une sauvegarde tronquée, hors
+    séquence ou incompatible laisse la base intacte (ValueError). Retourne
+    le nombre de lignes restaurées par table.
+    """
+    headers = _check_chain(path, incrementals)
+    models = [apps.get_model(label) for label in headers[0]['models']]
+    connection = connections[using]
+    tables = {}
+
+    with leaderboard.bulk_update(), transaction.atomic(using=using), \
+            listing.bulk_update(full=True, using=using):
+        # Tables vidées des dépendantes vers les référencées
+        with connection.cursor() as cursor:
+            for model in reversed(models):
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
+
+        for backup in [path, *incrementals]:
+            _apply(backup, connection, progress, tables)
+
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+        dimensions.invalidate(using)
+    return tables
@@ -0,0 +1,203 @@
+"""
+Création ou mise à jour en masse des inscriptions.
+
+Les lignes sont validées en Python, les références (par identifiant ou par
+nom, comme dans l'import Excel) sont résolues par lots et l'écriture se fait
+avec bulk_create(update_conflicts=True), ou ignore_conflicts=True sans mise à
+jour : une inscription écrite entre-temps par un autre processus n'est
+jamais écrasée contre l'avis de l'appelant. Le statut de chaque ligne est
+ensuite établi par une seule requête sur ce qui a réellement été écrit
+(created_at de la ligne insérée). Le nombre de requêtes ne dépend donc pas
+du nombre de lignes.
+"""
+import math
+
+from django.db import transaction
+
+from . import dimensions, leaderboard, listing
+from .models import Student, SchoolYear, Classe, Section, Enrollment
+
+
+# Champ -> (modèle, clé du nom dans la ligne, champ du nom sur le modèle)
+REFERENCES = {
+    'student': (Student, 'student_name', 'full_name'),
+    'school_year': (SchoolYear, 'year', 'year'),
+    'classe': (Classe, 'classe_name', 'name'),
+    'section': (Section, 'section_name', 'name'),
+}
+
+UPDATE_FIELDS = ['classe', 'section', 'percentage', 'updated_at']
+
+
+def _parse_percentage(value):
+    """Valide le pourcentage comme le fait EnrollmentSerializer"""
+    if isinstance(value, bool):
+        raise ValueError("Un nombre valide est requis.")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("Un nombre valide est requis.")
+    if math.isnan(value) or value < 0 or value > 100:
+        raise ValueError("Le pourcentage doit être entre 0 et 100")
+    return value
+
+
+def _parse_row(row):
+    """
+    Valide la forme d'une ligne et retourne (références, pourcentage, erreurs).
+
+    Chaque référence est un couple ('id', valeur) ou ('name', valeur).
+    """
+    if not isinstance(row, dict):
+        return None, None, {'non_field_errors': ["Chaque ligne doit être un objet."]}
+
+    errors = {}
+    references = {}
+    for field, (_, name_key, _) in REFERENCES.items():
+        if row.get(field) not in (None, ''):
+            value = row[field]
+            if isinstance(value, bool) or not str(value).isdigit():
+                errors[field] = ["Identifiant invalide."]
+            else:
+                references[field] = ('id', int(value))
+        elif isinstance(row.get(name_key), str) and row[name_key].strip():
+            references[field] = ('name', row[name_key].strip())
+        else:
+            errors[field] = [f"Ce champ est obligatoire (identifiant ou {name_key})."]
+
+    percentage = None
+    try:
+        percentage = _parse_percentage(row.get('percentage'))
+    except ValueError as e:
+        errors['percentage'] = [str(e)]
+
+    return references, percentage, errors
+
+
+def _resolve_ids(model, ids):
+    """Retourne les identifiants existants parmi ceux demandés"""
+    if not ids:
+        return set()
+    return set(model.objects.filter(id__in=ids).values_list('id', flat=True))
+
+
+def _resolve_names(model, label_field, names):
+    """
+    Retourne {nom: id}, en créant les entrées manquantes comme l'import Excel.
+
+    Pour les élèves (nom non unique), l'élève le plus ancien est retenu.
+    """
+    if not names:
+        return {}
+
+    def lookup(wanted):
+        return dict(
+            model.objects.filter(**{f'{label_field}__in': wanted})
+            .order_by('-id').values_list(label_field, 'id')
+        )
+
+    mapping = lookup(names)
+    missing = names - mapping.keys()
+    if missing:
+        model.objects.bulk_create(
+            [model(**{label_field: name}) for name in sorted(missing)],
+            ignore_conflicts=True
+        )
+        if model in dimensions.LABEL_FIELDS:
+            # bulk_create n'envoie pas de signal
+            dimensions.invalidate()
+        mapping.update(lookup(missing))
+    return mapping
+
+
+def upsert_enrollments(rows, update_existing=True, batch_size=1000):
+    """
+    Crée ou met à jour les inscriptions décrites par `rows`.
+
+    Retourne un résumé et le statut de chaque ligne : created, updated,
+    duplicate (existante et update_existing=False) ou error.
+    """
+    results = [{'index': index, 'status': 'error'} for index in range(len(rows))]
+    parsed = {}
+
+    for index, row in enumerate(rows):
+        references, percentage, errors = _parse_row(row)
+        if errors:
+            results[index]['errors'] = errors
+        else:
+            parsed[index] = (references, percentage)
+
+    with leaderboard.bulk_update(), transaction.atomic(), listing.bulk_update():
+        # Vérifier les identifiants fournis : une requête par modèle
+        for field, (model, _, _) in REFERENCES.items():
+            requested = {refs[field][1] for refs, _ in parsed.values() if refs[field][0] == 'id'}
+            existing = _resolve_ids(model, requested)
+            for index, (refs, _) in list(parsed.items()):
+                kind, value = refs[field]
+                if kind == 'id' and value not in existing:
+                    results[index]['errors'] = {field: ["Identifiant invalide."]}
+                    del parsed[index]
+
+        # Résoudre les noms (et créer les entrées manquantes) pour les lignes valides
+        resolved = {}
+        for field, (model, _, label_field) in REFERENCES.items():
+            names = {refs[field][1] for refs, _ in parsed.values() if refs[field][0] == 'name'}
+            resolved[field] = _resolve_names(model, label_field, names)
+
+        candidates = {}
+        for index, (refs, percentage) in parsed.items():
+            ids = {
+                field: value if kind == 'id' else resolved[field][value]
+                for field, (kind, value) in refs.items()
+            }
+            key = (ids['student'], ids['school_year'])
+            if key in candidates:
+                results[index]['errors'] = {
+                    'non_field_errors': ["Doublon dans la requête pour cet élève et cette année."]
+                }
+                continue
+            candidates[key] = (index, ids, percentage)
+
+        to_write = {
+            key: Enrollment(
+                student_id=ids['student'],
+                school_year_id=ids['school_year'],
+                classe_id=ids['classe'],
+                section_id=ids['section'],
+                percentage=percentage,
+            )
+            for key, (index, ids, percentage) in candidates.items()
+        }
+        if to_write:
+            if update_existing:
+                conflicts = {
+                    'update_conflicts': True,
+                    'unique_fields': ['student', 'school_year'],
+                    'update_fields': UPDATE_FIELDS,
+                }
+            else:
+                conflicts = {'ignore_conflicts': True}
+            Enrollment.objects.bulk_create(list(to_write.values()), batch_size=batch_size, **conflicts)
+
+            # Une seule requête pour le statut : une ligne insérée porte le
+            # created_at fixé par bulk_create, une ligne existante (même
+            # insérée entre-temps par un autre processus) garde le sien
+            written = {
+                (student, year): created_at
+                for student, year, created_at in Enrollment.objects.filter(
+                    student_id__in={student for student, _ in to_write},
+                    school_year_id__in={year for _, year in to_write},
+                ).values_list('student_id', 'school_year_id', 'created_at')
+            }
+            for key, enrollment in to_write.items():
+                index = candidates[key][0]
+                if written.get(key) == enrollment.created_at:
+                    results[index]['status'] = 'created'
+                else:
+                    results[index]['status'] = 'updated' if update_existing else 'duplicate'
+
+    summary = {status: 0 for status in ('created', 'updated', 'duplicate', 'error')}
+    for result in results:
+        summary[result['status']] += 1
+
+    return {**summary, 'results': results}
@@ -0,0 +1,50 @@
+"""
+Espaces de noms versionnés dans le cache.
+
+Chaque espace (classement, dimensions...) a un numéro de version stocké dans
+le cache et inclus dans toutes ses clés : incrémenter la version invalide
+d'un coup toutes les entrées de l'espace, sans avoir à les énumérer (les
+anciennes expirent d'elles-mêmes).
+"""
+import time
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def _version_key(namespace):
+    return f'{namespace}:version'
+
+
+def get_version(namespace):
+    """Version courante de l'espace de noms"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Version initiale horodatée : si la clé de version a été évincée,
+        # les entrées restantes de l'ancienne version ne sont pas réutilisées
+        cache.add(key, time.time_ns() // 1000, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(namespace):
+    """Invalide toutes les entrées de l'espace de noms"""
+    key = _version_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return get_version(namespace)
+
+
+def versioned_key(namespace, *parts, version=None):
+    """Clé d'une entrée pour la version courante (ou celle donnée)"""
+    if version is None:
+        version = get_version(namespace)
+    return ':'.join([namespace, f'v{version}', *(str(part) for part in parts)])
+
+
+def is_process_local():
+    """Vrai si le cache n'est pas partagé entre processus (LocMem, Dummy)"""
+    return isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
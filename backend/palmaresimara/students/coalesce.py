@@ -0,0 +1,105 @@
+"""
+Calcul unique des résultats coûteux (single-flight), partagé par le cache.
+
+À la publication des résultats, des milliers de requêtes identiques
+(analytics, classements) arrivent en même temps sur un cache froid. Un seul
+appelant calcule le résultat : il prend un verrou dans le cache
+(`cache.add`, atomique), calcule puis stocke le résultat. Les autres
+attendent qu'il apparaisse dans le cache, en l'interrogeant à intervalles
+croissants. Si le verrou disparaît sans résultat (calcul en erreur) ou
+après SINGLE_FLIGHT_TIMEOUT secondes, l'appelant calcule lui-même.
+
+Avec plusieurs processus, le cache doit être partagé (Redis, Memcached) ;
+avec le cache local par défaut, le calcul est unique par processus.
+
+Les résultats mis en cache par `result_key` dépendent des inscriptions et
+des noms : toute écriture incrémente la version de l'espace `results`
+(signaux, et fin des écritures en masse via leaderboard.bulk_update) ;
+ANALYTICS_CACHE_TIMEOUT borne le délai pour les écritures sans signal.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .cache import bump_version, versioned_key
+
+NAMESPACE = 'results'
+
+# Attentes successives entre deux lectures du cache (secondes), puis la dernière
+POLL_DELAYS = (0.01, 0.02, 0.05, 0.1, 0.2)
+
+
+def result_key(*parts):
+    """Clé versionnée d'un résultat ; les paramètres des requêtes sont hachés"""
+    digest = hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+    return versioned_key(NAMESPACE, digest)
+
+
+def invalidate(using=DEFAULT_DB_ALIAS):
+    """
+    Invalide tous les résultats de `result_key`, puis de nouveau à la
+    validation de la transaction en cours : un résultat calculé entre-temps
+    sans les écritures non validées n'est pas réutilisé
+    """
+    bump_version(NAMESPACE)
+    transaction.on_commit(partial(bump_version, NAMESPACE), using=using)
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def _delays():
+    yield from POLL_DELAYS
+    while True:
+        yield POLL_DELAYS[-1]
+
+
+def single_flight(key, compute, timeout):
+    """
+    Valeur de `key` dans le cache, sinon calculée par `compute()` (jamais
+    None) et mise en cache pour `timeout` secondes par un seul appelant à la
+    fois
+    """
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_TIMEOUT
+    delays = _delays()
+    while True:
+        value = cache.get(key)
+        if value is not None:
+            return value
+        if cache.add(_lock_key(key), 1, settings.SINGLE_FLIGHT_TIMEOUT):
+            try:
+                value = compute()
+                cache.set(key, value, timeout)
+                return value
+            finally:
+                cache.delete(_lock_key(key))
+        if time.monotonic() >= deadline:
+            return compute()
+        time.sleep(next(delays))
+
+
+async def asingle_flight(key, compute, timeout):
+    """single_flight pour les vues asynchrones : `compute` est une coroutine"""
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_TIMEOUT
+    delays = _delays()
+    while True:
+        value = await cache.aget(key)
+        if value is not None:
+            return value
+        if await cache.aadd(_lock_key(key), 1, settings.SINGLE_FLIGHT_TIMEOUT):
+            try:
+                value = await compute()
+                await cache.aset(key, value, timeout)
+                return value
+            finally:
+                await cache.adelete(_lock_key(key))
+        if time.monotonic() >= deadline:
+            return await compute()
+        await asyncio.sleep(next(delays))
@@ -0,0 +1,172 @@
+"""
+Génération déterministe de jeux de données synthétiques.
+
+Utilisé par la commande `generate_dataset` (insertion directe en base ou
+fichiers pour `import_excel`) et par les tests de performance. Pour une
+même graine et les mêmes paramètres, le jeu de données produit est
+identique.
+"""
+import random
+from dataclasses import dataclass, field
+
+from . import dimensions
+from .models import Student, SchoolYear, Classe, Section, Enrollment
+
+
+# Noms pondérés par fréquence approximative ; une part des noms porte des
+# accents ou des apostrophes, comme dans les fichiers réels
+LAST_NAMES = [
+    ('KOUAMÉ', 8), ('KOUAME', 6), ('BAMBA', 7), ('TRAORÉ', 7), ('TRAORE', 5),
+    ('KONÉ', 7), ('KONE', 5), ('OUATTARA', 8), ('COULIBALY', 8), ('YAO', 6),
+    ("N'GUESSAN", 6), ('DIALLO', 5), ('KOFFI', 6), ('KOUASSI', 6), ('DIABATÉ', 3),
+    ('TOURÉ', 4), ('SANGARÉ', 3), ('ASSI', 3), ('GBAGBO', 2), ('AKÉ', 2),
+    ('MARTIN', 2), ('LEFÈVRE', 1), ('DUPONT', 1), ('BÉRÉTÉ', 1), ("D'ALMEIDA", 1),
+]
+FIRST_NAMES = [
+    ('Jean', 6), ('Marie', 8), ('Salimata', 4), ('Aminata', 5), ('Sékou', 3),
+    ('Adjoua', 4), ('Hervé', 3), ('Éric', 3), ('Fatou', 4), ('Chloé', 2),
+    ('Moussa', 4), ('Awa', 4), ('Yao', 3), ('Aya', 4), ('Kader', 2),
+    ('Ibrahim', 3), ('Mariam', 4), ('Grâce', 2), ('Noël', 1), ('Anaïs', 1),
+    ('Claire', 2), ('Emmanuel', 3), ('Josué', 2), ('Désiré', 2), ('Koffi', 2),
+]
+CLASSES = ['6ème', '5ème', '4ème', '3ème', 'Seconde', 'Première', 'Terminale']
+SECTIONS = ['A', 'C', 'D', 'E', 'G1', 'G2']
+
+FILE_COLUMNS = ['nom_complet', 'annee', 'classe', 'section', 'pourcentage']
+
+
+@dataclass
+class DatasetSpec:
+    """Paramètres d'un jeu de données synthétique"""
+    students: int = 1000
+    years: int = 3
+    start_year: int = 2021
+    classes: list = field(default_factory=lambda: list(CLASSES))
+    sections: list = field(default_factory=lambda: list(SECTIONS))
+    mean: float = 62.0
+    stddev: float = 14.0
+    repeat_rate: float = 0.08
+    dropout_rate: float = 0.05
+    seed: int = 42
+
+    @property
+    def school_years(self):
+        return [f'{self.start_year + i}-{self.start_year + i + 1}' for i in range(self.years)]
+
+
+class DatasetGenerator:
+    """Génère élèves et parcours (une inscription par élève et par année)"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        self._last_names, self._last_weights = zip(*LAST_NAMES)
+        self._first_names, self._first_weights = zip(*FIRST_NAMES)
+
+    def full_name(self, index):
+        """
+        Nom de famille suivi d'un ou deux prénoms et du matricule de l'élève
+        (`index` sur une largeur fixe) : import_excel identifie les élèves
+        par leur nom, qui doit donc être unique
+        """
+        last = self.rng.choices(self._last_names, self._last_weights)[0]
+        count = 2 if self.rng.random() < 0.6 else 1
+        firsts = self.rng.choices(self._first_names, self._first_weights, k=count)
+        return ' '.join([last, *firsts, f'{index:0{len(str(self.spec.students))}d}'])
+
+    def percentage(self, level):
+        """Pourcentage suivant une loi normale tronquée à [0, 100]"""
+        value = self.rng.gauss(self.spec.mean + level, self.spec.stddev)
+        return round(min(max(value, 0.0), 100.0), 2)
+
+    def history(self):
+        """
+        Parcours d'un élève : liste de (index d'année, classe, section, pourcentage).
+
+        L'élève entre à une année et une classe aléatoires, passe en classe
+        supérieure chaque année (ou redouble) et peut quitter l'établissement.
+        """
+        spec = self.spec
+        classes = spec.classes
+        year_index = self.rng.randrange(spec.years)
+        class_index = self.rng.randrange(len(classes))
+        section = self.rng.choice(spec.sections)
+        level = self.rng.gauss(0, spec.stddev / 2)
+
+        rows = []
+        while year_index < spec.years:
+            rows.append((year_index, classes[class_index], section, self.percentage(level)))
+            if self.rng.random() < spec.dropout_rate:
+                break
+            if self.rng.random() >= spec.repeat_rate:
+                if class_index == len(classes) - 1:
+                    break
+                class_index += 1
+            level += self.rng.gauss(0, 3)
+            year_index += 1
+        return rows
+
+    def rows(self):
+        """Lignes au format de `import_excel`, élève par élève"""
+        school_years = self.spec.school_years
+        for index in range(1, self.spec.students + 1):
+            name = self.full_name(index)
+            for year_index, classe, section, percentage in self.history():
+                yield {
+                    'nom_complet': name,
+                    'annee': school_years[year_index],
+                    'classe': classe,
+                    'section': section,
+                    'pourcentage': percentage,
+                }
+
+    def insert(self, batch_size=5000, progress=None):
+        """
+        Insère le jeu de données en base par insertions en masse.
+
+        Les élèves sont créés par lots, suivis de leurs inscriptions, pour
+        garder une mémoire constante. Retourne le nombre d'inscriptions créées.
+        """
+        spec = self.spec
+        years = _get_or_create_all(SchoolYear, 'year', spec.school_years)
+        classes = _get_or_create_all(Classe, 'name', spec.classes)
+        sections = _get_or_create_all(Section, 'name', spec.sections)
+
+        created = 0
+        remaining = spec.students
+        while remaining > 0:
+            count = min(batch_size, remaining)
+            first = spec.students - remaining + 1
+            histories = [(self.full_name(index), self.history()) for index in range(first, first + count)]
+            students = Student.objects.bulk_create(
+                [Student(full_name=name) for name, _ in histories], batch_size=batch_size
+            )
+            enrollments = [
+                Enrollment(
+                    student_id=student.pk,
+                    school_year_id=years[spec.school_years[year_index]],
+                    classe_id=classes[classe],
+                    section_id=sections[section],
+                    percentage=percentage,
+                )
+                for student, (_, history) in zip(students, histories)
+                for year_index, classe, section, percentage in history
+            ]
+            Enrollment.objects.bulk_create(enrollments, batch_size=batch_size)
+            created += len(enrollments)
+            remaining -= count
+            if progress:
+                progress(spec.students - remaining, created)
+        return created
+
+
+def _get_or_create_all(model, label_field, labels):
+    """Retourne {libellé: id}, en créant les entrées manquantes"""
+    model.objects.bulk_create(
+        [model(**{label_field: label}) for label in labels], ignore_conflicts=True
+    )
+    # bulk_create n'envoie pas de signal
+    dimensions.invalidate()
+    return dict(
+        model.objects.filter(**{f'{label_field}__in': labels}).values_list(label_field, 'id')
+    )
@@ -0,0 +1,186 @@
+"""
+Cache en mémoire des tables de dimension (années, classes, sections).
+
+Ces tables sont minuscules et ne changent presque jamais, mais chaque liste
+d'inscriptions les joignait et chaque filtre par identifiant les
+interrogeait. Chaque processus en garde une copie : lignes déjà sérialisées
+et libellés par identifiant. Filtres, serializers et analytics y résolvent
+identifiants et noms sans requête ni jointure.
+
+La copie est rechargée :
+
+- quand la version partagée de l'espace `dimensions` (voir students.cache)
+  change. Les signaux d'enregistrement et de suppression l'incrémentent à la
+  validation de la transaction, comme les écritures qui contournent les
+  signaux (upsert en masse, génération, restauration), via `invalidate()`.
+  Le processus qui écrit invalide aussitôt sa propre copie. La version est
+  comparée une fois par requête HTTP (à la première utilisation), et hors
+  requête au plus toutes les DIMENSION_CACHE_CHECK_INTERVAL secondes ;
+- avec un cache propre au processus (LocMem, par défaut), la version n'est
+  pas partagée : la copie est alors aussi rechargée quand elle a plus de
+  DIMENSION_CACHE_CHECK_INTERVAL secondes, ce qui borne le retard des autres
+  processus ;
+- quand un identifiant ou un libellé cherché est absent de la copie
+  (dimension créée par un autre processus depuis la dernière vérification),
+  au plus une fois par intervalle.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .cache import bump_version, get_version, is_process_local
+from .models import SchoolYear, Classe, Section
+
+NAMESPACE = 'dimensions'
+
+# Champ du libellé de chaque dimension
+LABEL_FIELDS = {
+    SchoolYear: 'year',
+    Classe: 'name',
+    Section: 'name',
+}
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+class Snapshot:
+    """Copie des tables de dimension à une version donnée (lecture seule)"""
+
+    def __init__(self, rows, version):
+        # {modèle: {id: ligne sérialisée}}
+        self.rows = rows
+        self.version = version
+        self.loaded_at = self.checked_at = time.monotonic()
+
+    def get(self, model, pk):
+        """Ligne sérialisée (copie) ou None"""
+        row = self.rows[model].get(pk)
+        return dict(row) if row is not None else None
+
+    def label(self, model, pk):
+        row = self.rows[model].get(pk)
+        return row[LABEL_FIELDS[model]] if row is not None else None
+
+    def labels(self, model):
+        """{id: libellé}"""
+        field = LABEL_FIELDS[model]
+        return {pk: row[field] for pk, row in self.rows[model].items()}
+
+    def ids(self, model, exact=None, contains=None, iexact=None):
+        """
+        Identifiants dont le libellé vaut `exact`, vaut `iexact` ou contient
+        `contains` (ces deux derniers sans casse)
+        """
+        field = LABEL_FIELDS[model]
+        if exact is not None:
+            return [pk for pk, row in self.rows[model].items() if row[field] == exact]
+        if iexact is not None:
+            iexact = iexact.casefold()
+            return [pk for pk, row in self.rows[model].items() if row[field].casefold() == iexact]
+        contains = contains.casefold()
+        return [pk for pk, row in self.rows[model].items() if contains in row[field].casefold()]
+
+
+def _load():
+    """Lit les trois tables sur la base principale (jamais un réplica en retard)"""
+    # Import local : serializers importe ce module
+    from .serializers import SchoolYearSerializer, ClasseSerializer, SectionSerializer
+
+    version = get_version(NAMESPACE)
+    rows = {}
+    for model, serializer_class in [
+        (SchoolYear, SchoolYearSerializer), (Classe, ClasseSerializer), (Section, SectionSerializer),
+    ]:
+        objects = model.objects.using(DEFAULT_DB_ALIAS).order_by('pk')
+        rows[model] = {row['id']: dict(row) for row in serializer_class(objects, many=True).data}
+    return Snapshot(rows, version)
+
+
+def snapshot(reload=False):
+    """Copie courante, vérifiée contre la version partagée, ou rechargée"""
+    global _snapshot
+    current = _snapshot
+    now = time.monotonic()
+    interval = settings.DIMENSION_CACHE_CHECK_INTERVAL
+    if current is not None and not reload:
+        if is_process_local() and now - current.loaded_at >= interval:
+            # Version propre au processus : écritures des autres processus invisibles
+            fresh = False
+        else:
+            fresh = now - current.checked_at < interval or get_version(NAMESPACE) == current.version
+        if fresh:
+            current.checked_at = now
+            return current
+
+    with _lock:
+        if _snapshot is current:
+            _snapshot = _load()
+        return _snapshot
+
+
+def _reload_if_old(current):
+    """Copie rechargée si elle date d'au moins un intervalle (donnée cherchée absente)"""
+    if time.monotonic() - current.loaded_at >= settings.DIMENSION_CACHE_CHECK_INTERVAL:
+        return snapshot(reload=True)
+    return current
+
+
+def _fresh_on_miss(model, *pks):
+    """Copie où chercher `pks` : rechargée si l'un manque et la copie assez ancienne"""
+    current = snapshot()
+    if all(pk in current.rows[model] for pk in pks):
+        return current
+    return _reload_if_old(current)
+
+
+def get(model, pk):
+    """Ligne sérialisée d'une dimension (comme son serializer), ou None"""
+    return _fresh_on_miss(model, pk).get(model, pk)
+
+
+def label(model, pk):
+    """Année ou nom d'une dimension, ou None"""
+    return _fresh_on_miss(model, pk).label(model, pk)
+
+
+def labels(model, pks=()):
+    """{id: libellé}, rechargé si l'un des identifiants `pks` est inconnu"""
+    return _fresh_on_miss(model, *pks).labels(model)
+
+
+def ids(model, exact=None, contains=None, iexact=None):
+    """Identifiants par libellé ; copie rechargée si aucun ne correspond (voir `labels`)"""
+    current = snapshot()
+    found = current.ids(model, exact=exact, contains=contains, iexact=iexact)
+    if not found:
+        found = _reload_if_old(current).ids(model, exact=exact, contains=contains, iexact=iexact)
+    return found
+
+
+def expire():
+    """La prochaine utilisation compare la copie à la version partagée"""
+    current = _snapshot
+    if current is not None:
+        current.checked_at = float('-inf')
+
+
+def _clear():
+    global _snapshot
+    _snapshot = None
+
+
+def invalidate(using=DEFAULT_DB_ALIAS):
+    """
+    Invalide la copie du processus, puis celle des autres processus à la
+    validation de la transaction en cours
+    """
+    _clear()
+
+    def publish():
+        bump_version(NAMESPACE)
+        _clear()
+
+    transaction.on_commit(publish, using=using)
@@ -1,5 +1,37 @@
 import django_filters
-from .models import Student, Enrollment, SchoolYear, Classe, Section
+from django import forms
+from . import dimensions
+from .models import Student, Enrollment, EnrollmentListing, SchoolYear, Classe, Section
+
+
+class DimensionChoiceField(forms.Field):
+    """
+    Identifiant d'une année, d'une classe ou d'une section, validé dans le
+    cache des dimensions (mêmes erreurs que ModelChoiceField, sans requête)
+    """
+    default_error_messages = {
+        'invalid_choice': forms.ModelChoiceField.default_error_messages['invalid_choice'],
+    }
+
+    def __init__(self, model, **kwargs):
+        self.model = model
+        super().__init__(**kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            pk = int(value)
+        except (TypeError, ValueError):
+            raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+        if dimensions.get(self.model, pk) is None:
+            raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+        return pk
+
+
+class DimensionChoiceFilter(django_filters.Filter):
+    """Filtre par identifiant de dimension (DimensionChoiceField)"""
+    field_class = DimensionChoiceField
 
 
 class StudentFilter(django_filters.FilterSet):
@@ -20,14 +52,16 @@ class StudentFilter(django_filters.FilterSet):
 
 class EnrollmentFilter(django_filters.FilterSet):
     """Filtres pour les inscriptions"""
-    school_year = django_filters.ModelChoiceFilter(queryset=SchoolYear.objects.all())
-    classe = django_filters.ModelChoiceFilter(queryset=Classe.objects.all())
-    section = django_filters.ModelChoiceFilter(queryset=Section.objects.all())
+    # Identifiants et noms résolus dans le cache des dimensions : ni requête
+    # de validation, ni jointure
+    school_year = DimensionChoiceFilter(model=SchoolYear)
+    classe = DimensionChoiceFilter(model=Classe)
+    section = DimensionChoiceFilter(model=Section)
     
     # Filtres par nom d'année/classe/section (plus pratique pour l'API)
-    year = django_filters.CharFilter(field_name='school_year__year', lookup_expr='exact')
-    classe_name = django_filters.CharFilter(field_name='classe__name', lookup_expr='icontains')
-    section_name = django_filters.CharFilter(field_name='section__name', lookup_expr='icontains')
+    year = django_filters.CharFilter(method='filter_year')
+    classe_name = django_filters.CharFilter(method='filter_classe_name')
+    section_name = django_filters.CharFilter(method='filter_section_name')
     
     # Filtres sur les pourcentages
     percentage_min = django_filters.NumberFilter(field_name='percentage', lookup_expr='gte')
@@ -50,3 +84,31 @@ class EnrollmentFilter(django_filters.FilterSet):
         if value:
             return queryset.filter(student__full_name__icontains=value)
         return queryset
+    
+    def filter_year(self, queryset, name, value):
+        return queryset.filter(school_year_id__in=dimensions.ids(SchoolYear, exact=value))
+    
+    def filter_classe_name(self, queryset, name, value):
+        return queryset.filter(classe_id__in=dimensions.ids(Classe, contains=value))
+    
+    def filter_section_name(self, queryset, name, value):
+        return queryset.filter(section_id__in=dimensions.ids(Section, contains=value))
+
+
+class EnrollmentListingFilter(EnrollmentFilter):
+    """
+    Filtres des inscriptions appliqués à la vue de lecture EnrollmentListing :
+    mêmes paramètres, sur les colonnes recopiées (sans jointure)
+    """
+    year = django_filters.CharFilter(field_name='year', lookup_expr='exact')
+    classe_name = django_filters.CharFilter(field_name='classe_name', lookup_expr='icontains')
+    section_name = django_filters.CharFilter(field_name='section_name', lookup_expr='icontains')
+    student_name = django_filters.CharFilter(field_name='student_name', lookup_expr='icontains')
+
+    class Meta(EnrollmentFilter.Meta):
+        model = EnrollmentListing
+
+    def filter_search(self, queryset, name, value):
+        if value:
+            return queryset.filter(student_name__icontains=value)
+        return queryset
@@ -0,0 +1,189 @@
+"""
+Exécution asynchrone des imports Excel déposés via l'API.
+
+Les imports sont stockés en base (ImportJob) qui sert de file d'attente :
+ils sont exécutés soit par un pool de threads local au processus web dès
+la validation de la transaction, soit par la commande `run_import_jobs`
+pour les déploiements qui préfèrent un worker séparé. La validation et
+l'import réutilisent les étapes de la commande `import_excel`.
+
+La progression est publiée dans le cache : l'import s'exécute dans une
+transaction, ses écritures sur ImportJob ne seraient pas visibles avant
+la fin. Avec un worker séparé, le cache doit donc être partagé
+(base de données, Redis...).
+
+Un import resté en cours au-delà de IMPORT_JOBS_STALE_AFTER (processus
+arrêté pendant l'import) est marqué en échec au démarrage du pool ou du
+worker : sa transaction n'a pas été validée, rien n'a été importé.
+"""
+import io
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+from .models import ImportJob
+
+logger = logging.getLogger('students')
+
+PROGRESS_CACHE_TIMEOUT = 24 * 60 * 60
+
+STALE_JOB_ERROR = 'Import interrompu (processus arrêté pendant l\'import), à relancer'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def progress_cache_key(job_id):
+    return f'import_job:{job_id}:progress'
+
+
+def get_progress(job):
+    """Progression en cours publiée par le worker (ou None)"""
+    if job.status != ImportJob.STATUS_RUNNING:
+        return None
+    return cache.get(progress_cache_key(job.pk))
+
+
+def recover_stale_jobs():
+    """
+    Marque en échec les imports en cours depuis plus de IMPORT_JOBS_STALE_AFTER
+    secondes (réservés par un processus arrêté depuis) ; retourne leur nombre
+    """
+    now = timezone.now()
+    # updated_at date de la réservation : l'import ne réécrit son ImportJob qu'à la fin
+    recovered = ImportJob.objects.filter(
+        status=ImportJob.STATUS_RUNNING,
+        updated_at__lt=now - timedelta(seconds=settings.IMPORT_JOBS_STALE_AFTER),
+    ).update(
+        status=ImportJob.STATUS_FAILED,
+        stage=ImportJob.STAGE_DONE,
+        errors=[STALE_JOB_ERROR],
+        finished_at=now,
+        updated_at=now,
+    )
+    if recovered:
+        logger.warning(f'{recovered} import(s) interrompu(s) marqué(s) en échec')
+    return recovered
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            recover_stale_jobs()
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMPORT_JOBS_WORKERS,
+                thread_name_prefix='import-job',
+            )
+        return _executor
+
+
+def enqueue_import_job(job):
+    """
+    Programme l'exécution de l'import après validation de la transaction.
+
+    Si IMPORT_JOBS_WORKERS vaut 0, l'import reste en attente et sera
+    exécuté par la commande `run_import_jobs`.
+    """
+    if settings.IMPORT_JOBS_WORKERS > 0:
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.pk))
+
+
+def _run_in_thread(job_id):
+    """Exécute un import dans un thread du pool et libère sa connexion"""
+    close_old_connections()
+    try:
+        run_import_job(job_id)
+    finally:
+        connections.close_all()
+
+
+def _claim(job_id):
+    """Réserve un import en attente ; False s'il est déjà pris par un autre worker"""
+    claimed = ImportJob.objects.filter(pk=job_id, status=ImportJob.STATUS_PENDING).update(
+        status=ImportJob.STATUS_RUNNING,
+        stage=ImportJob.STAGE_READING,
+        started_at=timezone.now(),
+        # update() ne renseigne pas auto_now (watermark des sauvegardes incrémentales)
+        updated_at=timezone.now(),
+    )
+    return claimed == 1
+
+
+def run_import_job(job_id, warm_caches=True):
+    """
+    Exécute un import en réutilisant les étapes de la commande import_excel ;
+    `warm_caches` à False désactive le préchauffage (worker séparé sans cache partagé)
+    """
+    # Import local : la commande importe pandas, inutile de le charger avant
+    from .management.commands.import_excel import Command
+
+    if not _claim(job_id):
+        return
+
+    job = ImportJob.objects.get(pk=job_id)
+    started = time.monotonic()
+    command = Command(stdout=io.StringIO(), stderr=io.StringIO())
+    command.warm_caches = warm_caches
+    state = {'stage': ImportJob.STAGE_READING, 'rows_total': 0, 'rows_processed': 0}
+
+    def publish(**changes):
+        state.update(changes)
+        elapsed = time.monotonic() - started
+        state['rate'] = round(state['rows_processed'] / elapsed, 1) if elapsed else None
+        cache.set(progress_cache_key(job_id), dict(state), PROGRESS_CACHE_TIMEOUT)
+
+    try:
+        publish()
+        df = command._read_excel_file(job.file.path)
+        publish(stage=ImportJob.STAGE_VALIDATING, rows_total=len(df))
+
+        validated_data = command._validate_data(df)
+        job.errors = list(getattr(command, 'validation_errors', []))
+        publish(stage=ImportJob.STAGE_IMPORTING, rows_total=len(validated_data))
+
+        result = command._import_data(
+            validated_data,
+            job.dry_run,
+            job.update_existing,
+            settings.IMPORT_JOBS_PROGRESS_BATCH,
+            progress=lambda processed, total: publish(rows_processed=processed),
+        )
+        job.errors += result.pop('errors')
+        job.result = result
+        job.rows_total = len(validated_data)
+        job.rows_processed = len(validated_data)
+        job.status = ImportJob.STATUS_COMPLETED
+        logger.info(f'Import #{job_id} terminé: {result}')
+
+    except Exception as e:
+        # Erreurs de validation relevées avant l'échec (« Trop d'erreurs... » compris)
+        job.errors = [*getattr(command, 'validation_errors', []), str(e)]
+        job.rows_total = state['rows_total']
+        job.rows_processed = state['rows_processed']
+        job.status = ImportJob.STATUS_FAILED
+        logger.error(f'Import #{job_id} échoué: {str(e)}', exc_info=True)
+
+    finally:
+        job.stage = ImportJob.STAGE_DONE
+        job.finished_at = timezone.now()
+        job.save()
+        cache.delete(progress_cache_key(job_id))
+
+
+def process_pending_jobs(limit=None, warm_caches=True):
+    """Exécute les imports en attente, du plus ancien au plus récent"""
+    recover_stale_jobs()
+    processed = 0
+    pending = ImportJob.objects.filter(status=ImportJob.STATUS_PENDING).order_by('created_at')
+    for job_id in pending.values_list('pk', flat=True)[:limit]:
+        run_import_job(job_id, warm_caches)
+        processed += 1
+    return processed
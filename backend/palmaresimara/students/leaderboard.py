@@ -0,0 +1,204 @@
+"""
+Classements précalculés (top-K) servis depuis le cache.
+
+Un classement est tenu pour chaque combinaison d'année, de classe et de
+section (chacune pouvant être « toutes ») : les K meilleures inscriptions
+(LEADERBOARD_SIZE), plus les ex aequo au seuil, déjà sérialisées. Il est
+construit à la première lecture puis mis à jour incrémentalement à chaque
+écriture d'une inscription (voir students.signals). Les écritures en masse
+(imports, upsert) suspendent la mise à jour incrémentale et reconstruisent
+les classements une fois terminées.
+
+Avec plusieurs processus, le cache doit être partagé ; les mises à jour
+concurrentes d'un même classement ne sont pas sérialisées, LEADERBOARD_TIMEOUT
+borne la durée d'une éventuelle incohérence. Avec un cache propre au
+processus (LocMem), un processus ne voit pas les écritures des autres : la
+durée de vie est alors ramenée à LEADERBOARD_LOCAL_TIMEOUT.
+"""
+import contextvars
+from contextlib import contextmanager
+from functools import partial
+from itertools import product
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import coalesce
+from .cache import bump_version, get_version, is_process_local, versioned_key
+from .models import SchoolYear, Enrollment
+
+NAMESPACE = 'leaderboard'
+ALL = '*'
+
+_suspended = contextvars.ContextVar('leaderboard_suspended', default=False)
+
+
+def _key(scope, version):
+    return versioned_key(NAMESPACE, *(ALL if part is None else part for part in scope), version=version)
+
+
+def scopes_for(school_year_id, classe_id, section_id):
+    """Les 8 classements (année, classe, section ou « toutes ») contenant une inscription"""
+    return list(product((school_year_id, None), (classe_id, None), (section_id, None)))
+
+
+def _sort_key(entry):
+    return (-entry['percentage'], entry['id'])
+
+
+def _trim(entries, size):
+    """Garde les `size` premiers et les ex aequo du dernier ; (liste, tronquée ?)"""
+    if len(entries) <= size:
+        return entries, False
+    cutoff = entries[size - 1]['percentage']
+    end = size
+    while end < len(entries) and entries[end]['percentage'] == cutoff:
+        end += 1
+    return entries[:end], end < len(entries)
+
+
+def _serialize(enrollments):
+    # Import local : serializers importe jobs, qui importe les modèles
+    from .serializers import EnrollmentDetailSerializer
+    return EnrollmentDetailSerializer(enrollments, many=True).data
+
+
+def build(scope, size=None):
+    """Calcule un classement depuis la base : {'entries': [...], 'complete': bool}"""
+    size = size or settings.LEADERBOARD_SIZE
+    school_year_id, classe_id, section_id = scope
+    queryset = Enrollment.objects.select_related('student')
+    if school_year_id is not None:
+        queryset = queryset.filter(school_year_id=school_year_id)
+    if classe_id is not None:
+        queryset = queryset.filter(classe_id=classe_id)
+    if section_id is not None:
+        queryset = queryset.filter(section_id=section_id)
+
+    top = list(queryset.order_by('-percentage', 'id')[:size])
+    complete = len(top) < size
+    if not complete:
+        # Ex aequo au seuil, au-delà des K premiers
+        top += queryset.filter(percentage=top[-1].percentage).exclude(
+            id__in=[enrollment.id for enrollment in top]
+        ).order_by('id')
+    return {'entries': [dict(entry) for entry in _serialize(top)], 'complete': complete}
+
+
+def _timeout():
+    """Durée de vie des classements, courte si le cache n'est pas partagé"""
+    if is_process_local():
+        return min(settings.LEADERBOARD_TIMEOUT, settings.LEADERBOARD_LOCAL_TIMEOUT)
+    return settings.LEADERBOARD_TIMEOUT
+
+
+def get_leaderboard(scope):
+    """
+    Classement d'un périmètre, depuis le cache ou calculé et mis en cache ;
+    calculé une seule fois pour des lectures simultanées (voir students.coalesce)
+    """
+    key = _key(scope, get_version(NAMESPACE))
+    return coalesce.single_flight(key, partial(build, scope), _timeout())
+
+
+def top(scope, limit):
+    """Les `limit` meilleures inscriptions du périmètre, ex aequo au seuil compris"""
+    entries = get_leaderboard(scope)['entries']
+    return _trim(entries, limit)[0]
+
+
+def apply_change(enrollment_id, previous_scope, entry):
+    """
+    Met à jour les classements en cache après l'écriture d'une inscription.
+
+    `previous_scope` est (année, classe, section) avant l'écriture (None pour
+    une création), `entry` la nouvelle inscription sérialisée (None pour une
+    suppression). Un classement qui ne peut plus être complété sans la base
+    est supprimé du cache et sera recalculé à la prochaine lecture.
+    """
+    size = settings.LEADERBOARD_SIZE
+    version = get_version(NAMESPACE)
+    new_scopes = set()
+    if entry is not None:
+        new_scopes = set(scopes_for(entry['school_year'], entry['classe'], entry['section']))
+    affected = new_scopes | set(scopes_for(*previous_scope) if previous_scope else ())
+
+    keys = {_key(scope, version): scope for scope in affected}
+    boards = cache.get_many(list(keys))
+    updated, stale = {}, []
+    for key, board in boards.items():
+        entries = [item for item in board['entries'] if item['id'] != enrollment_id]
+        complete = board['complete']
+        cutoff = entries[size - 1]['percentage'] if len(entries) >= size else None
+
+        if keys[key] in new_scopes and (complete or (cutoff is not None and entry['percentage'] >= cutoff)):
+            entries.append(entry)
+            entries.sort(key=_sort_key)
+            entries, truncated = _trim(entries, size)
+            complete = complete and not truncated
+
+        if not complete and len(entries) < size:
+            stale.append(key)
+        else:
+            updated[key] = {'entries': entries, 'complete': complete}
+
+    if updated:
+        cache.set_many(updated, _timeout())
+    if stale:
+        cache.delete_many(stale)
+
+
+def is_suspended():
+    """Vrai pendant une écriture en masse (voir `bulk_update`)"""
+    return _suspended.get()
+
+
+def on_enrollment_change(enrollment_id, previous_scope, enrollment=None):
+    """
+    Programme la mise à jour des classements à la validation de la transaction
+    (sans effet pendant une écriture en masse)
+    """
+    if is_suspended():
+        return
+
+    def apply():
+        entry = dict(_serialize([enrollment])[0]) if enrollment is not None else None
+        apply_change(enrollment_id, previous_scope, entry)
+
+    transaction.on_commit(apply)
+
+
+def on_names_change():
+    """Un élève, une année, une classe ou une section a été renommé"""
+    if not is_suspended():
+        transaction.on_commit(invalidate)
+
+
+def invalidate():
+    """Invalide tous les classements (noms modifiés, écritures en masse...)"""
+    bump_version(NAMESPACE)
+
+
+def refresh():
+    """Invalide puis recalcule les classements les plus consultés (global et par année)"""
+    invalidate()
+    get_leaderboard((None, None, None))
+    for school_year_id in SchoolYear.objects.values_list('id', flat=True):
+        get_leaderboard((school_year_id, None, None))
+
+
+@contextmanager
+def bulk_update():
+    """
+    Suspend la mise à jour incrémentale pendant une écriture en masse, puis
+    recalcule les classements après validation de la transaction ; les
+    résultats en cache (analytics) sont invalidés
+    """
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+    coalesce.invalidate()
+    transaction.on_commit(refresh)
@@ -0,0 +1,212 @@
+"""
+Vue de lecture dénormalisée des listes d'inscriptions (ENROLLMENT_READ_MODEL).
+
+La liste des inscriptions joint quatre tables et trie sur la moyenne puis le
+nom de l'élève : aucun index ne sert à la fois les filtres et ce tri. La
+table EnrollmentListing recopie, pour chaque inscription, les noms (élève,
+année, classe, section) et son rang dans la classe pour l'année. Ses index
+couvrent les filtres et tris courants d'EnrollmentFilter. La liste filtre,
+trie, compte et pagine sur cette seule table, puis ne charge que les
+inscriptions de la page.
+
+La table est tenue à jour ligne à ligne par les signaux (students.signals).
+Les écritures en masse (imports, upsert, génération, restauration)
+suspendent cette mise à jour et reconstruisent, dans leur transaction, les
+années modifiées (`bulk_update`). `rebuild_listing` reconstruit toute la
+table, par exemple à l'activation sur une base existante.
+
+Le rang suit RANK() : 1 + le nombre d'inscriptions de la même classe et de
+la même année ayant une moyenne strictement supérieure. Deux écritures
+concurrentes dans une même classe peuvent le décaler d'une unité jusqu'à la
+reconstruction suivante.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import Rank
+from django.utils import timezone
+from django_filters.utils import translate_validation
+
+from .filters import EnrollmentListingFilter
+from .models import SchoolYear, Classe, Section, Student, Enrollment, EnrollmentListing
+
+_suspended = contextvars.ContextVar('listing_suspended', default=False)
+
+# Colonnes de la table et champ d'Enrollment correspondant (hors rang)
+COLUMNS = [
+    ('enrollment_id', 'id'),
+    ('student_id', 'student_id'),
+    ('school_year_id', 'school_year_id'),
+    ('classe_id', 'classe_id'),
+    ('section_id', 'section_id'),
+    ('student_name', 'student__full_name'),
+    ('year', 'school_year__year'),
+    ('classe_name', 'classe__name'),
+    ('section_name', 'section__name'),
+    ('percentage', 'percentage'),
+    ('created_at', 'created_at'),
+]
+
+# Noms recopiés : clé étrangère de la table, champ du modèle, colonne
+NAME_COLUMNS = {
+    Student: ('student_id', 'full_name', 'student_name'),
+    SchoolYear: ('school_year_id', 'year', 'year'),
+    Classe: ('classe_id', 'name', 'classe_name'),
+    Section: ('section_id', 'name', 'section_name'),
+}
+
+# Paramètre `ordering` d'EnrollmentViewSet -> colonne de la table
+ORDERING_FIELDS = {
+    'percentage': 'percentage',
+    'created_at': 'created_at',
+    'school_year__year': 'year',
+}
+DEFAULT_ORDERING = ['-percentage']
+# Départage après le tri demandé : pages stables, servies par les index
+TIEBREAK = ['student_name', 'enrollment_id']
+
+
+def is_enabled():
+    return settings.ENROLLMENT_READ_MODEL
+
+
+def _group(school_year_id, classe_id, using):
+    return EnrollmentListing.objects.using(using).filter(
+        school_year_id=school_year_id, classe_id=classe_id
+    )
+
+
+def _insert(enrollments, using):
+    """Insère les lignes des inscriptions données, rangs calculés sur ces seules lignes"""
+    queryset = enrollments.order_by().values(*(field for _, field in COLUMNS)).annotate(
+        rank=Window(
+            Rank(),
+            partition_by=[F('school_year_id'), F('classe_id')],
+            order_by=F('percentage').desc(),
+        )
+    )
+    sql, params = queryset.query.get_compiler(using).as_sql()
+    connection = connections[using]
+    columns = ', '.join(connection.ops.quote_name(column) for column, _ in [*COLUMNS, ('rank', None)])
+    table = connection.ops.quote_name(EnrollmentListing._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {table} ({columns}) {sql}', params)
+        return cursor.rowcount
+
+
+def rebuild(school_year_ids=None, using=DEFAULT_DB_ALIAS):
+    """
+    Reconstruit la table pour les années données (toutes par défaut) en une
+    requête INSERT ... SELECT ; retourne le nombre de lignes insérées
+    """
+    listing = EnrollmentListing.objects.using(using)
+    enrollments = Enrollment.objects.using(using)
+    if school_year_ids is not None:
+        if not school_year_ids:
+            return 0
+        listing = listing.filter(school_year_id__in=school_year_ids)
+        enrollments = enrollments.filter(school_year_id__in=school_year_ids)
+    with transaction.atomic(using=using):
+        listing.delete()
+        return _insert(enrollments, using)
+
+
+def changed_years(since, using=DEFAULT_DB_ALIAS):
+    """Années des inscriptions écrites, ou dont un nom a changé, depuis `since`"""
+    return list(
+        Enrollment.objects.using(using).filter(
+            Q(updated_at__gte=since)
+            | Q(student__updated_at__gte=since)
+            | Q(school_year__updated_at__gte=since)
+            | Q(classe__updated_at__gte=since)
+            | Q(section__updated_at__gte=since)
+        ).order_by().values_list('school_year_id', flat=True).distinct()
+    )
+
+
+def _remove(enrollment_id, using):
+    """Retire la ligne d'une inscription ; les suivantes de sa classe gagnent un rang"""
+    listing = EnrollmentListing.objects.using(using)
+    row = listing.filter(pk=enrollment_id).values_list('school_year_id', 'classe_id', 'percentage').first()
+    if row is None:
+        return
+    school_year_id, classe_id, percentage = row
+    listing.filter(pk=enrollment_id).delete()
+    _group(school_year_id, classe_id, using).filter(percentage__lt=percentage).update(rank=F('rank') - 1)
+
+
+def sync_enrollment(enrollment_id, using=DEFAULT_DB_ALIAS):
+    """Recopie une inscription créée ou modifiée, rangs de sa classe ajustés"""
+    source = Enrollment.objects.using(using).filter(pk=enrollment_id).values(
+        *(field for _, field in COLUMNS)
+    ).first()
+    _remove(enrollment_id, using)
+    if source is None:
+        return
+    row = EnrollmentListing(**{column: source[field] for column, field in COLUMNS})
+    group = _group(row.school_year_id, row.classe_id, using)
+    row.rank = group.filter(percentage__gt=row.percentage).count() + 1
+    group.filter(percentage__lt=row.percentage).update(rank=F('rank') + 1)
+    row.save(using=using, force_insert=True)
+
+
+def on_enrollment_saved(enrollment_id, using=DEFAULT_DB_ALIAS):
+    if is_enabled() and not _suspended.get():
+        sync_enrollment(enrollment_id, using)
+
+
+def on_enrollment_deleted(enrollment_id, using=DEFAULT_DB_ALIAS):
+    if is_enabled() and not _suspended.get():
+        _remove(enrollment_id, using)
+
+
+def on_names_change(instance, using=DEFAULT_DB_ALIAS):
+    """Un élève, une année, une classe ou une section a été renommé"""
+    if is_enabled() and not _suspended.get():
+        foreign_key, field, column = NAME_COLUMNS[type(instance)]
+        EnrollmentListing.objects.using(using).filter(**{foreign_key: instance.pk}).update(
+            **{column: getattr(instance, field)}
+        )
+
+
+@contextmanager
+def bulk_update(full=False, using=DEFAULT_DB_ALIAS):
+    """
+    Suspend la mise à jour ligne à ligne pendant une écriture en masse, puis
+    reconstruit les années modifiées, ou toute la table avec `full` (après
+    des suppressions). À placer dans la transaction de l'écriture.
+    """
+    if not is_enabled():
+        yield
+        return
+    since = timezone.now()
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+    rebuild(None if full else changed_years(since, using), using=using)
+
+
+def filter_queryset(request, queryset):
+    """Filtres, recherche et tri d'EnrollmentViewSet appliqués à la table"""
+    filterset = EnrollmentListingFilter(request.query_params, queryset=queryset, request=request)
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+
+    ordering = []
+    for term in request.query_params.get('ordering', '').split(','):
+        term = term.strip()
+        column = ORDERING_FIELDS.get(term.lstrip('-'))
+        if column:
+            ordering.append(f'-{column}' if term.startswith('-') else column)
+    return filterset.qs.order_by(*(ordering or DEFAULT_ORDERING), *TIEBREAK)
+
+
+def in_order(queryset, ids):
+    """Objets de `queryset` dont l'identifiant est dans `ids`, dans cet ordre"""
+    objects = queryset.in_bulk(list(ids))
+    return [objects[pk] for pk in ids if pk in objects]
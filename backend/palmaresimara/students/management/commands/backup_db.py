@@ -0,0 +1,103 @@
+import datetime
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from students.backup import DEFAULT_EXCLUDE, prune_deletions, read_header, write_backup
+
+# Intervalle d'affichage de la progression (lignes)
+PROGRESS_EVERY = 100000
+
+
+class Command(BaseCommand):
+    help = (
+        'Sauvegarde la base dans un fichier NDJSON compressé (table par table, en flux), '
+        'complète ou incrémentale depuis une sauvegarde précédente'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            nargs='?',
+            type=str,
+            help='Fichier à écrire (défaut: backups/backup_AAAAMMJJ_HHMMSS[_incr].ndjson.gz)'
+        )
+        parser.add_argument(
+            '--incremental',
+            metavar='PRECEDENTE',
+            type=str,
+            help='Sauvegarde précédente (complète ou incrémentale) : '
+                 'n\'exporte que les changements depuis son watermark'
+        )
+        parser.add_argument(
+            '--overlap',
+            type=int,
+            help='Recouvrement en secondes avec la sauvegarde précédente '
+                 '(défaut: BACKUP_WATERMARK_OVERLAP)'
+        )
+        parser.add_argument(
+            '--prune-deletions',
+            action='store_true',
+            help='Purge ensuite le journal des suppressions devenu inutile '
+                 'pour les incrémentales qui suivront cette sauvegarde'
+        )
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Base à sauvegarder, un réplica par exemple (défaut: default)'
+        )
+        parser.add_argument(
+            '--exclude',
+            action='append',
+            help='Application ou modèle (app.modele) à exclure (répétable, '
+                 'défaut: sessions et le journal des suppressions)'
+        )
+
+    def handle(self, *args, **options):
+        previous = None
+        if options['incremental']:
+            try:
+                previous = read_header(options['incremental'])
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        output = options['output']
+        if not output:
+            os.makedirs('backups', exist_ok=True)
+            suffix = '_incr' if previous else ''
+            output = os.path.join(
+                'backups', f'backup_{datetime.datetime.now():%Y%m%d_%H%M%S}{suffix}.ndjson.gz'
+            )
+
+        overlap = options['overlap']
+        if overlap is None:
+            overlap = settings.BACKUP_WATERMARK_OVERLAP
+        self._printed = 0
+        start = time.perf_counter()
+        tables = write_backup(
+            output,
+            using=options['database'],
+            exclude=options['exclude'] or DEFAULT_EXCLUDE,
+            progress=self._progress,
+            previous=previous,
+            overlap=overlap,
+        )
+        elapsed = time.perf_counter() - start
+
+        rows = sum(tables.values())
+        size = os.path.getsize(output)
+        kind = 'incrémentale' if previous else 'complète'
+        self.stdout.write(self.style.SUCCESS(
+            f'Sauvegarde {kind} {output} : {len(tables)} tables, {rows} lignes, '
+            f'{size / 1024:.1f} Ko en {elapsed:.1f}s ({rows / elapsed:.0f} lignes/s)'
+        ))
+
+        if options['prune_deletions']:
+            watermark = datetime.datetime.fromisoformat(read_header(output)['watermark'])
+            pruned = prune_deletions(watermark - datetime.timedelta(seconds=overlap))
+            self.stdout.write(f'{pruned} suppressions purgées du journal')
+
+    def _progress(self, label, rows, done):
+        if done or rows - self._printed >= PROGRESS_EVERY:
+            self._printed = 0 if done else rows
+            self.stdout.write(f'  {label}: {rows} lignes{"" if done else "..."}')
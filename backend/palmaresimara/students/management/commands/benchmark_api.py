@@ -0,0 +1,121 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from palmaresimara.benchmark import run_load
+
+# Endpoints de lecture les plus sollicités par le frontend
+DEFAULT_ENDPOINTS = [
+    '/api/students/',
+    '/api/students/?search=marie',
+    '/api/enrollments/',
+    '/api/enrollments/top_students/',
+    '/api/analytics/',
+    '/api/analytics/pivot/?group_by=year,classe',
+]
+
+
+class Command(BaseCommand):
+    help = 'Banc de charge de l\'API : clients concurrents, percentiles de latence et débit'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            type=str,
+            default='http://127.0.0.1:8000',
+            help='URL du serveur à mesurer (défaut: http://127.0.0.1:8000)'
+        )
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            dest='endpoints',
+            help='Chemin à mesurer (répétable, défaut: endpoints de lecture principaux)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=10,
+            help='Nombre de clients concurrents (défaut: 10)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            help='Nombre total de requêtes (défaut: 100 par endpoint)'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            help='Durée du banc en secondes (remplace --requests)'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=1,
+            help='Passes de préchauffage par client, non mesurées (défaut: 1)'
+        )
+        parser.add_argument(
+            '--header',
+            action='append',
+            default=[],
+            help='En-tête supplémentaire "Nom: valeur" (répétable)'
+        )
+        parser.add_argument(
+            '--json',
+            type=str,
+            help='Écrit les résultats détaillés dans ce fichier JSON'
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency doit être au moins 1')
+
+        headers = {}
+        for header in options['header']:
+            name, sep, value = header.partition(':')
+            if not sep:
+                raise CommandError(f'En-tête invalide: {header}')
+            headers[name.strip()] = value.strip()
+
+        endpoints = options['endpoints'] or DEFAULT_ENDPOINTS
+        self.stdout.write(
+            f'Banc sur {options["base_url"]} : {len(endpoints)} endpoint(s), '
+            f'{options["concurrency"]} client(s)'
+        )
+        try:
+            results = run_load(
+                options['base_url'],
+                endpoints,
+                concurrency=options['concurrency'],
+                requests=options['requests'],
+                duration=options['duration'],
+                headers=headers,
+                warmup=options['warmup'],
+            )
+        except OSError as e:
+            raise CommandError(f'Serveur injoignable: {str(e)}')
+
+        self._display_results(results)
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f'Résultats écrits dans {options["json"]}')
+
+    def _display_results(self, results):
+        width = max(len(path) for path in results['paths'])
+        header = f'{"endpoint":<{width}}  {"req":>6} {"err":>5} {"req/s":>8} {"p50":>8} {"p95":>8} {"p99":>8}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        rows = [*results['paths'].items(), ('TOTAL', results['total'])]
+        for path, stats in rows:
+            self.stdout.write(
+                f'{path:<{width}}  {stats["requests"]:>6} {stats["errors"]:>5} '
+                f'{self._fmt(stats["rps"])} {self._fmt(stats["p50_ms"])} '
+                f'{self._fmt(stats["p95_ms"])} {self._fmt(stats["p99_ms"])}'
+            )
+        self.stdout.write(f'Latences en ms, durée {results["elapsed_s"]}s, statuts {results["statuses"]}')
+        style = self.style.WARNING if results['total']['errors'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f'{results["total"]["rps"]} requêtes/s, p95 {results["total"]["p95_ms"]} ms'
+        ))
+
+    @staticmethod
+    def _fmt(value):
+        return f'{value:>8.1f}' if value is not None else f'{"-":>8}'
@@ -0,0 +1,182 @@
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from palmaresimara.benchmark import free_port, run_load, running_server
+
+# Lectures mesurées : endpoint DRF synchrone et son équivalent asynchrone
+ENDPOINTS = [
+    ('/api/students/?search=marie', '/api/async/students/?search=marie'),
+    ('/api/enrollments/', '/api/async/enrollments/'),
+    ('/api/enrollments/top_students/', '/api/async/enrollments/top_students/'),
+    ('/api/analytics/', '/api/async/analytics/'),
+]
+
+# Serveur et variante des endpoints de chaque mode
+MODES = {
+    'wsgi': ('gunicorn', 'sync'),
+    'asgi-sync': ('uvicorn', 'sync'),
+    'asgi': ('uvicorn', 'async'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare le débit des lectures sous WSGI (gunicorn, vues DRF) et sous '
+        'ASGI (uvicorn, vues DRF ou vues asynchrones /api/async/)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode',
+            action='append',
+            dest='modes',
+            choices=list(MODES),
+            help='Mode à mesurer (répétable, défaut: tous)'
+        )
+        parser.add_argument(
+            '--database-url',
+            type=str,
+            help='Base existante à mesurer (défaut: base SQLite temporaire générée)'
+        )
+        parser.add_argument(
+            '--students',
+            type=int,
+            default=5000,
+            help='Élèves de la base temporaire (défaut: 5000)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processus du serveur (défaut: 1)'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help='Threads par processus gunicorn (défaut: 4)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            action='append',
+            dest='concurrency',
+            help='Nombre de clients concurrents (répétable, défaut: 4 et 32)'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Durée de chaque mesure en secondes (défaut: 10)'
+        )
+        parser.add_argument(
+            '--json',
+            type=str,
+            help='Écrit les résultats détaillés dans ce fichier JSON'
+        )
+
+    def handle(self, *args, **options):
+        modes = options['modes'] or list(MODES)
+        for server in {MODES[mode][0] for mode in modes}:
+            if importlib.util.find_spec(server) is None:
+                raise CommandError(f'Ce banc nécessite {server} (pip install {server})')
+
+        results = {}
+        with tempfile.TemporaryDirectory() as workdir:
+            env = {
+                'DB_CONN_MAX_AGE': '600',
+                'REQUEST_INSTRUMENTATION': 'False',
+                'DEBUG': 'False',
+                'ALLOWED_HOSTS': '127.0.0.1',
+            }
+            if options['database_url']:
+                env['DATABASE_URL'] = options['database_url']
+            else:
+                env['DATABASE_URL'] = f'sqlite:///{os.path.join(workdir, "benchmark.sqlite3")}'
+                self._manage('migrate', '--noinput', env=env)
+                self._manage('generate_dataset', '--students', str(options['students']), env=env)
+
+            for mode in modes:
+                self.stdout.write(f'Mode {mode}...')
+                try:
+                    results[mode] = self._measure(mode, env, options)
+                except RuntimeError as e:
+                    raise CommandError(f'Mode {mode}: {str(e)}')
+
+        self._display_results(results)
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as handle:
+                json.dump(results, handle, indent=2)
+
+    def _measure(self, mode, env, options):
+        """Débit et latences de chaque endpoint, pour chaque niveau de concurrence"""
+        server, variant = MODES[mode]
+        port = free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        workers = str(options['workers'])
+        if server == 'gunicorn':
+            command = [
+                sys.executable, '-m', 'gunicorn', 'palmaresimara.wsgi:application',
+                '--bind', f'127.0.0.1:{port}', '--workers', workers,
+                '--worker-class', 'gthread', '--threads', str(options['threads']),
+                '--log-level', 'critical',
+            ]
+        else:
+            command = [
+                sys.executable, '-m', 'uvicorn', 'palmaresimara.asgi:application',
+                '--host', '127.0.0.1', '--port', str(port), '--workers', workers,
+                '--lifespan', 'off', '--no-access-log', '--log-level', 'critical',
+            ]
+
+        results = {}
+        with running_server(command, base_url, env=env, cwd=settings.BASE_DIR):
+            for concurrency in options['concurrency'] or [4, 32]:
+                results[str(concurrency)] = {
+                    sync: run_load(
+                        base_url, [sync if variant == 'sync' else asynchronous],
+                        concurrency=concurrency,
+                        duration=options['duration'],
+                        warmup=1,
+                    )['total']
+                    for sync, asynchronous in ENDPOINTS
+                }
+        return results
+
+    def _manage(self, *args, env=None):
+        completed = subprocess.run(
+            [sys.executable, 'manage.py', *args],
+            cwd=settings.BASE_DIR, env={**os.environ, **(env or {})},
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f'{args[0]} a échoué : {completed.stderr[-2000:]}')
+
+    def _display_results(self, results):
+        header = (
+            f'{"mode":<10} {"clients":>7} {"endpoint":<32} {"req/s":>8} {"p50":>8} '
+            f'{"p95":>8} {"p99":>8} {"err":>5}'
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for mode, by_concurrency in results.items():
+            for concurrency, by_endpoint in by_concurrency.items():
+                for endpoint, total in by_endpoint.items():
+                    self.stdout.write(
+                        f'{mode:<10} {concurrency:>7} {endpoint:<32} {total["rps"] or 0:>8.1f} '
+                        f'{total["p50_ms"] or 0:>8.2f} {total["p95_ms"] or 0:>8.2f} '
+                        f'{total["p99_ms"] or 0:>8.2f} {total["errors"]:>5}'
+                    )
+        if {'wsgi', 'asgi'} <= set(results):
+            for concurrency, by_endpoint in results['asgi'].items():
+                for endpoint, total in by_endpoint.items():
+                    reference = results['wsgi'].get(concurrency, {}).get(endpoint, {}).get('rps')
+                    if reference and total['rps']:
+                        self.stdout.write(
+                            f'asgi/wsgi {concurrency} clients {endpoint}: '
+                            f'débit ×{total["rps"] / reference:.2f}'
+                        )
@@ -0,0 +1,137 @@
+import importlib.util
+import json
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from palmaresimara.benchmark import free_port, run_load, running_server
+
+# Endpoints légers : le coût de connexion y domine le temps de réponse
+DEFAULT_ENDPOINTS = [
+    '/api/enrollments/top_students/',
+    '/api/students/',
+    '/api/classes/',
+]
+
+# Variables d'environnement de chaque mode de connexion
+MODES = {
+    'none': {'DB_CONN_MAX_AGE': '0', 'DB_POOL': 'False'},
+    'persistent': {'DB_CONN_MAX_AGE': '600', 'DB_POOL': 'False'},
+    'pool': {'DB_CONN_MAX_AGE': '0', 'DB_POOL': 'True'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare la latence de l\'API avec une connexion par requête, des connexions '
+        'persistantes et le pool de connexions (gunicorn démarré pour chaque mode)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode',
+            action='append',
+            dest='modes',
+            choices=list(MODES),
+            help='Mode à mesurer (répétable, défaut: tous)'
+        )
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            dest='endpoints',
+            help='Chemin à mesurer (répétable)'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Threads du worker gunicorn et taille du pool (défaut: 8)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Nombre de clients concurrents (défaut: 8)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=1000,
+            help='Nombre de requêtes par mode (défaut: 1000)'
+        )
+        parser.add_argument(
+            '--json',
+            type=str,
+            help='Écrit les résultats détaillés dans ce fichier JSON'
+        )
+
+    def handle(self, *args, **options):
+        if importlib.util.find_spec('gunicorn') is None:
+            raise CommandError('Ce banc nécessite gunicorn (pip install gunicorn)')
+
+        modes = options['modes'] or list(MODES)
+        if 'pool' in modes and not self._pool_available():
+            self.stdout.write(self.style.WARNING(
+                'Mode pool ignoré : nécessite PostgreSQL (DATABASE_URL) et psycopg[pool]'
+            ))
+            modes.remove('pool')
+        if not modes:
+            raise CommandError('Aucun mode à mesurer')
+
+        endpoints = options['endpoints'] or DEFAULT_ENDPOINTS
+        threads = str(options['threads'])
+        results = {}
+        for mode in modes:
+            port = free_port()
+            base_url = f'http://127.0.0.1:{port}'
+            env = {
+                **MODES[mode],
+                'DB_POOL_MIN_SIZE': threads,
+                'DB_POOL_MAX_SIZE': threads,
+                'REQUEST_INSTRUMENTATION': 'False',
+                'DEBUG': 'False',
+                'ALLOWED_HOSTS': '127.0.0.1',
+            }
+            command = [
+                sys.executable, '-m', 'gunicorn', 'palmaresimara.wsgi:application',
+                '--bind', f'127.0.0.1:{port}', '--workers', '1',
+                '--worker-class', 'gthread', '--threads', threads, '--log-level', 'warning',
+            ]
+            self.stdout.write(f'Mode {mode}...')
+            try:
+                with running_server(command, base_url, env=env, cwd=settings.BASE_DIR):
+                    results[mode] = run_load(
+                        base_url, endpoints,
+                        concurrency=options['concurrency'],
+                        requests=options['requests'],
+                        warmup=1,
+                    )
+            except RuntimeError as e:
+                raise CommandError(f'Mode {mode}: {str(e)}')
+
+        self._display_results(results)
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as handle:
+                json.dump(results, handle, indent=2)
+
+    @staticmethod
+    def _pool_available():
+        engine = settings.DATABASES['default']['ENGINE']
+        return engine.endswith('postgresql') and importlib.util.find_spec('psycopg_pool') is not None
+
+    def _display_results(self, results):
+        header = f'{"mode":<12} {"req/s":>8} {"p50":>8} {"p95":>8} {"p99":>8} {"err":>5}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for mode, result in results.items():
+            total = result['total']
+            self.stdout.write(
+                f'{mode:<12} {total["rps"]:>8.1f} {total["p50_ms"]:>8.2f} '
+                f'{total["p95_ms"]:>8.2f} {total["p99_ms"]:>8.2f} {total["errors"]:>5}'
+            )
+        if 'none' in results:
+            reference = results['none']['total']['p50_ms']
+            for mode, result in results.items():
+                if mode != 'none':
+                    self.stdout.write(self.style.SUCCESS(
+                        f'{mode}: gain p50 ×{reference / result["total"]["p50_ms"]:.2f} par rapport au mode none'
+                    ))
@@ -0,0 +1,121 @@
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import Resolver404, resolve
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from palmaresimara.compression import available_encodings
+from palmaresimara.renderers import (
+    ColumnarJSONRenderer, MessagePackRenderer, ORJSONRenderer, msgpack_available, orjson
+)
+
+# Réponses volumineuses de l'API
+DEFAULT_ENDPOINTS = [
+    '/api/students/',
+    '/api/enrollments/',
+    '/api/analytics/',
+    '/api/analytics/pivot/?group_by=year,classe;classe,section',
+]
+
+
+def median_ms(function, repeat):
+    """Résultat de `function` et durée médiane d'exécution, en millisecondes"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, round(statistics.median(timings), 3)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare la taille et le temps d\'encodage des réponses de l\'API selon '
+        'le format (JSON par json ou orjson, JSON en colonnes, MessagePack) et la compression'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            dest='endpoints',
+            help='Chemin à mesurer (répétable, défaut: listes et analytics)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Encodages de chaque réponse pour la durée médiane (défaut: 20)'
+        )
+        parser.add_argument(
+            '--json',
+            type=str,
+            help='Écrit les résultats dans ce fichier JSON'
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat doit être au moins 1')
+
+        renderers = [('json (stdlib)', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('json (orjson)', ORJSONRenderer()))
+        else:
+            self.stdout.write('orjson non installé : seul le module json est mesuré')
+        renderers.append(('columnar', ColumnarJSONRenderer()))
+        if msgpack_available():
+            renderers.append(('msgpack', MessagePackRenderer()))
+        else:
+            self.stdout.write('msgpack non installé : MessagePack non mesuré')
+        encodings = available_encodings()
+
+        results = {}
+        for path in options['endpoints'] or DEFAULT_ENDPOINTS:
+            data = self._data(path)
+            results[path] = {}
+            bodies = {}
+            for label, renderer in renderers:
+                body, encode_ms = median_ms(lambda: renderer.render(data), options['repeat'])
+                bodies[label] = body
+                measure = {'bytes': len(body), 'encode_ms': encode_ms}
+                for name, compress in encodings:
+                    compressed, compress_ms = median_ms(lambda: compress(body), options['repeat'])
+                    measure[name] = {'bytes': len(compressed), 'ms': compress_ms}
+                results[path][label] = measure
+            if bodies.get('json (orjson)', bodies['json (stdlib)']) != bodies['json (stdlib)']:
+                self.stdout.write(self.style.WARNING(f'{path} : sortie orjson différente de json'))
+
+        self._display_results(results, [name for name, _ in encodings])
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f'Résultats écrits dans {options["json"]}')
+
+    def _data(self, path):
+        """Données de la réponse (avant rendu) de la vue servant `path`"""
+        try:
+            match = resolve(urlsplit(path).path)
+        except Resolver404:
+            raise CommandError(f'Chemin inconnu : {path}')
+        request = APIRequestFactory().get(path, HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        response = match.func(request, *match.args, **match.kwargs)
+        if response.status_code != 200 or not hasattr(response, 'data'):
+            raise CommandError(f'{path} : réponse {response.status_code}')
+        return response.data
+
+    def _display_results(self, results, encodings):
+        header = f'{"endpoint / format":<56} {"octets":>9} {"ms":>8}' + ''.join(
+            f' {name + " (ms)":>18}' for name in encodings
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for path, formats in results.items():
+            self.stdout.write(path)
+            for label, measure in formats.items():
+                line = f'  {label:<54} {measure["bytes"]:>9} {measure["encode_ms"]:>8.2f}'
+                for name in encodings:
+                    line += f' {measure[name]["bytes"]:>9} ({measure[name]["ms"]:>6.2f})'
+                self.stdout.write(line)
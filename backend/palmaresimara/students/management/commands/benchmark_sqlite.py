@@ -0,0 +1,198 @@
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from palmaresimara.benchmark import free_port, run_load, running_server
+
+# Lectures typiques de l'API, toutes servies depuis la base
+DEFAULT_ENDPOINTS = [
+    '/api/students/',
+    '/api/enrollments/',
+    '/api/classes/',
+]
+
+# Variables d'environnement de chaque profil SQLite
+PROFILES = {
+    'default': {'SQLITE_TUNING': 'False'},
+    'tuned': {'SQLITE_TUNING': 'True'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Mesure la latence des lectures de l\'API pendant un import sur SQLite, '
+        'avec et sans le profil de production (WAL, PRAGMA, transactions IMMEDIATE)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile',
+            action='append',
+            dest='profiles',
+            choices=list(PROFILES),
+            help='Profil à mesurer (répétable, défaut: tous)'
+        )
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            dest='endpoints',
+            help='Chemin à mesurer (répétable)'
+        )
+        parser.add_argument(
+            '--students',
+            type=int,
+            default=5000,
+            help='Élèves déjà en base avant l\'import (défaut: 5000)'
+        )
+        parser.add_argument(
+            '--import-students',
+            type=int,
+            default=3000,
+            help='Élèves du fichier importé pendant la mesure (défaut: 3000)'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help='Threads du worker gunicorn (défaut: 4)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Nombre de clients concurrents (défaut: 4)'
+        )
+        parser.add_argument(
+            '--idle-seconds',
+            type=float,
+            default=5,
+            help='Durée de la mesure de référence, sans import (défaut: 5)'
+        )
+        parser.add_argument(
+            '--json',
+            type=str,
+            help='Écrit les résultats détaillés dans ce fichier JSON'
+        )
+
+    def handle(self, *args, **options):
+        if importlib.util.find_spec('gunicorn') is None:
+            raise CommandError('Ce banc nécessite gunicorn (pip install gunicorn)')
+
+        profiles = options['profiles'] or list(PROFILES)
+        endpoints = options['endpoints'] or DEFAULT_ENDPOINTS
+        results = {}
+        with tempfile.TemporaryDirectory() as workdir:
+            import_file = os.path.join(workdir, 'import.csv')
+            # Années distinctes du jeu initial : l'import crée des inscriptions
+            self._manage(
+                'generate_dataset', '--students', str(options['import_students']),
+                '--start-year', '2040', '--seed', '7', '--output', import_file,
+            )
+            for profile in profiles:
+                self.stdout.write(f'Profil {profile}...')
+                database = os.path.join(workdir, f'{profile}.sqlite3')
+                env = {
+                    **PROFILES[profile],
+                    'DATABASE_URL': f'sqlite:///{database}',
+                    'DB_CONN_MAX_AGE': '600',
+                    'REQUEST_INSTRUMENTATION': 'False',
+                    'DEBUG': 'False',
+                    'ALLOWED_HOSTS': '127.0.0.1',
+                }
+                self._manage('migrate', '--noinput', env=env)
+                self._manage('generate_dataset', '--students', str(options['students']), env=env)
+                try:
+                    results[profile] = self._measure(env, endpoints, import_file, options)
+                except RuntimeError as e:
+                    raise CommandError(f'Profil {profile}: {str(e)}')
+
+        self._display_results(results)
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as handle:
+                json.dump(results, handle, indent=2)
+
+    def _measure(self, env, endpoints, import_file, options):
+        """Latence au repos, puis pendant l'import exécuté dans un autre processus"""
+        port = free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        threads = str(options['threads'])
+        command = [
+            sys.executable, '-m', 'gunicorn', 'palmaresimara.wsgi:application',
+            '--bind', f'127.0.0.1:{port}', '--workers', '1',
+            '--worker-class', 'gthread', '--threads', threads, '--log-level', 'critical',
+        ]
+        with running_server(command, base_url, env=env, cwd=settings.BASE_DIR):
+            idle = run_load(
+                base_url, endpoints,
+                concurrency=options['concurrency'],
+                duration=options['idle_seconds'],
+                warmup=1,
+            )
+            with tempfile.TemporaryFile() as output:
+                started = time.perf_counter()
+                importer = subprocess.Popen(
+                    [sys.executable, 'manage.py', 'import_excel', import_file],
+                    cwd=settings.BASE_DIR, env={**os.environ, **env},
+                    stdout=subprocess.DEVNULL, stderr=output,
+                )
+                during = run_load(
+                    base_url, endpoints,
+                    concurrency=options['concurrency'],
+                    until=lambda: importer.poll() is not None,
+                )
+                importer.wait()
+                import_seconds = time.perf_counter() - started
+                output.seek(0)
+                import_errors = output.read().decode(errors='replace')[-2000:]
+
+        return {
+            'idle': idle,
+            'import': during,
+            'import_s': round(import_seconds, 2),
+            'import_ok': importer.returncode == 0,
+            'import_stderr': import_errors,
+        }
+
+    def _manage(self, *args, env=None):
+        completed = subprocess.run(
+            [sys.executable, 'manage.py', *args],
+            cwd=settings.BASE_DIR, env={**os.environ, **(env or {})},
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f'{args[0]} a échoué : {completed.stderr[-2000:]}')
+
+    def _display_results(self, results):
+        header = (
+            f'{"profil":<10} {"phase":<8} {"req/s":>8} {"p50":>8} {"p95":>8} '
+            f'{"p99":>8} {"max":>9} {"err":>5}'
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for profile, result in results.items():
+            for phase in ('idle', 'import'):
+                total = result[phase]['total']
+                self.stdout.write(
+                    f'{profile:<10} {phase:<8} {total["rps"] or 0:>8.1f} {total["p50_ms"] or 0:>8.2f} '
+                    f'{total["p95_ms"] or 0:>8.2f} {total["p99_ms"] or 0:>8.2f} '
+                    f'{total["max_ms"] or 0:>9.2f} {total["errors"]:>5}'
+                )
+        for profile, result in results.items():
+            if result['import_ok']:
+                self.stdout.write(f'{profile}: import terminé en {result["import_s"]:.1f}s')
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f'{profile}: import en échec après {result["import_s"]:.1f}s\n{result["import_stderr"]}'
+                ))
+        if {'default', 'tuned'} <= set(results):
+            reference = results['default']['import']['total']['p99_ms']
+            tuned = results['tuned']['import']['total']['p99_ms']
+            if reference and tuned:
+                self.stdout.write(self.style.SUCCESS(
+                    f'tuned: p99 pendant l\'import ×{reference / tuned:.2f} plus rapide que default'
+                ))
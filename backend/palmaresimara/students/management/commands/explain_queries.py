@@ -0,0 +1,169 @@
+import json
+import re
+import statistics
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Avg
+from analytics.views import TOP_STUDENT_FIELDS, _general_aggregates, _grouped_rows
+from students.models import Student, Enrollment, EnrollmentListing, ImportJob
+
+# Index utilisés : SQLite (EXPLAIN QUERY PLAN) puis PostgreSQL
+INDEX_PATTERNS = [
+    re.compile(r'USING (?:COVERING )?INDEX (\w+)'),
+    re.compile(r'USING (INTEGER PRIMARY KEY)'),
+    re.compile(r'Index (?:Only )?Scan(?: Backward)? using (\w+)'),
+    re.compile(r'Bitmap Index Scan on (\w+)'),
+]
+# Tables lues entièrement, sans index
+SCAN_PATTERNS = [
+    re.compile(r'\bSCAN (\w+)$', re.MULTILINE),
+    re.compile(r'Seq Scan on (\w+)'),
+]
+# Tri ou regroupement hors index
+SORT_PATTERN = re.compile(r'USE TEMP B-TREE|\bSort\b|HashAggregate')
+
+
+def hot_queries(year_id, classe_id, section_id, year, term):
+    """
+    Requêtes fréquentes de l'API, construites comme dans les vues (filtres
+    d'EnrollmentFilter, tri du viewset, classements, analytics)
+    """
+    page = settings.REST_FRAMEWORK['PAGE_SIZE']
+    enrollments = Enrollment.objects.select_related('student')
+    of_year = Enrollment.objects.filter(school_year_id=year_id)
+    return {
+        'Inscriptions : tri par défaut': enrollments.order_by('-percentage')[:page],
+        'Inscriptions : année': enrollments.filter(school_year_id=year_id).order_by('-percentage')[:page],
+        'Inscriptions : classe': enrollments.filter(classe_id=classe_id).order_by('-percentage')[:page],
+        'Inscriptions : classe et année': enrollments.filter(
+            classe_id=classe_id, school_year_id=year_id
+        ).order_by('-percentage')[:page],
+        'Classement : année, classe, section': Enrollment.objects.filter(
+            school_year_id=year_id, classe_id=classe_id, section_id=section_id
+        ).order_by('-percentage', 'id')[:settings.LEADERBOARD_SIZE],
+        'Classement : année': of_year.order_by('-percentage', 'id')[:settings.LEADERBOARD_SIZE],
+        'Analytics : statistiques d\'une année': of_year.order_by().values('school_year_id').annotate(
+            **_general_aggregates()
+        ),
+        'Analytics : top 10 d\'une année': of_year.order_by('-percentage')[:10].values(*TOP_STUDENT_FIELDS),
+        'Analytics : par classe d\'une année': _grouped_rows(of_year, 'classe_id'),
+        'Analytics : évolution d\'une classe': Enrollment.objects.filter(classe_id=classe_id).values(
+            'school_year__year'
+        ).annotate(average_percentage=Avg('percentage')).order_by('school_year__year'),
+        'Élèves : recherche': Student.objects.filter(full_name__icontains=term)[:page],
+        'Vue de lecture : année': EnrollmentListing.objects.filter(year=year)[:page],
+        'Vue de lecture : classe': EnrollmentListing.objects.filter(classe_id=classe_id)[:page],
+        'Imports en attente': ImportJob.objects.filter(
+            status=ImportJob.STATUS_PENDING
+        ).order_by('created_at').values_list('pk', flat=True),
+    }
+
+
+def summarize_plan(plan):
+    """Index utilisés, tables parcourues sans index et tri hors index d'un plan"""
+    indexes = []
+    for pattern in INDEX_PATTERNS:
+        for name in pattern.findall(plan):
+            if name not in indexes:
+                indexes.append(name)
+    scans = sorted({table for pattern in SCAN_PATTERNS for table in pattern.findall(plan)})
+    return {'indexes': indexes, 'full_scans': scans, 'sort': bool(SORT_PATTERN.search(plan))}
+
+
+class Command(BaseCommand):
+    help = (
+        'Affiche le plan (EXPLAIN) des requêtes fréquentes de l\'API : index '
+        'utilisés, tables parcourues sans index, tri hors index et durée'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Base à interroger (défaut: default)'
+        )
+        parser.add_argument(
+            '--search',
+            default='a',
+            help='Terme de la recherche d\'élèves (défaut: a)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Exécutions de chaque requête pour la durée médiane (0: plan seul, défaut: 3)'
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='EXPLAIN ANALYZE (PostgreSQL)'
+        )
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Échoue si une requête parcourt la table des inscriptions sans index'
+        )
+        parser.add_argument(
+            '--json',
+            type=str,
+            help='Écrit les plans et résumés dans ce fichier JSON'
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        vendor = connections[using].vendor
+        if options['analyze'] and vendor != 'postgresql':
+            raise CommandError('--analyze nécessite PostgreSQL')
+
+        # Périmètre de l'inscription la mieux notée : filtres sélectifs réalistes
+        sample = Enrollment.objects.using(using).order_by('-percentage').values_list(
+            'school_year_id', 'classe_id', 'section_id', 'school_year__year'
+        ).first()
+        if sample is None:
+            raise CommandError('Aucune inscription : générer des données (generate_dataset)')
+
+        results = {}
+        for name, queryset in hot_queries(*sample, options['search']).items():
+            queryset = queryset.using(using)
+            plan = queryset.explain(analyze=True) if options['analyze'] else queryset.explain()
+            results[name] = {**summarize_plan(plan), 'ms': self._time(queryset, options['repeat']), 'plan': plan}
+
+        self._display_results(vendor, results, options['verbosity'])
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as handle:
+                json.dump({'vendor': vendor, 'queries': results}, handle, indent=2, ensure_ascii=False)
+
+        if options['strict']:
+            failing = [
+                name for name, result in results.items()
+                if {Enrollment._meta.db_table, EnrollmentListing._meta.db_table} & set(result['full_scans'])
+            ]
+            if failing:
+                raise CommandError(f'Requêtes sans index : {", ".join(failing)}')
+
+    def _time(self, queryset, repeat):
+        """Durée médiane d'exécution, en millisecondes"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - start) * 1000)
+        return round(statistics.median(timings), 2) if timings else None
+
+    def _display_results(self, vendor, results, verbosity):
+        self.stdout.write(f'Base : {vendor}')
+        header = f'{"requête":<40} {"ms":>8}  {"tri":<3}  index / parcours sans index'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, result in results.items():
+            details = ', '.join(result['indexes']) or '-'
+            if result['full_scans']:
+                details += f' / {", ".join(result["full_scans"])}'
+            ms = f'{result["ms"]:>8.2f}' if result['ms'] is not None else f'{"-":>8}'
+            line = f'{name:<40} {ms}  {"oui" if result["sort"] else "non":<3}  {details}'
+            self.stdout.write(self.style.WARNING(line) if result['full_scans'] else line)
+            if verbosity > 1:
+                for plan_line in result['plan'].splitlines():
+                    self.stdout.write(f'    {plan_line}')
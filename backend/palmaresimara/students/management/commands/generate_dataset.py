@@ -0,0 +1,148 @@
+import csv
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from students import leaderboard, listing
+from students.datasets import DatasetGenerator, DatasetSpec, FILE_COLUMNS
+
+# Limite de lignes d'une feuille Excel (en-tête compris)
+EXCEL_MAX_ROWS = 1048576
+
+
+class Command(BaseCommand):
+    help = 'Génère un jeu de données synthétique déterministe (en base ou en fichier pour import_excel)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--students',
+            type=int,
+            default=1000,
+            help='Nombre d\'élèves (défaut: 1000)'
+        )
+        parser.add_argument(
+            '--years',
+            type=int,
+            default=3,
+            help='Nombre d\'années scolaires (défaut: 3)'
+        )
+        parser.add_argument(
+            '--start-year',
+            type=int,
+            default=2021,
+            help='Première année scolaire (défaut: 2021, soit 2021-2022)'
+        )
+        parser.add_argument(
+            '--classes',
+            type=str,
+            help='Classes dans l\'ordre de progression, séparées par des virgules'
+        )
+        parser.add_argument(
+            '--sections',
+            type=str,
+            help='Sections, séparées par des virgules'
+        )
+        parser.add_argument(
+            '--mean',
+            type=float,
+            default=62.0,
+            help='Moyenne des pourcentages (défaut: 62)'
+        )
+        parser.add_argument(
+            '--stddev',
+            type=float,
+            default=14.0,
+            help='Écart type des pourcentages (défaut: 14)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Graine du générateur (défaut: 42)'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Fichier à écrire (.xlsx, .csv ou .parquet) au lieu d\'insérer en base'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Nombre d\'élèves par lot d\'insertion (défaut: 5000)'
+        )
+
+    def handle(self, *args, **options):
+        spec = DatasetSpec(
+            students=options['students'],
+            years=options['years'],
+            start_year=options['start_year'],
+            mean=options['mean'],
+            stddev=options['stddev'],
+            seed=options['seed'],
+        )
+        if options['classes']:
+            spec.classes = self._split(options['classes'])
+        if options['sections']:
+            spec.sections = self._split(options['sections'])
+        if spec.students < 1 or spec.years < 1 or not spec.classes or not spec.sections:
+            raise CommandError('Il faut au moins un élève, une année, une classe et une section')
+
+        generator = DatasetGenerator(spec)
+        start = time.perf_counter()
+
+        if options['output']:
+            rows = self._write_file(generator, options['output'])
+            destination = options['output']
+        else:
+            with leaderboard.bulk_update(), transaction.atomic(), listing.bulk_update():
+                rows = generator.insert(
+                    batch_size=options['batch_size'],
+                    progress=lambda students, enrollments: self.stdout.write(
+                        f'  {students}/{spec.students} élèves, {enrollments} inscriptions'
+                    ),
+                )
+            destination = 'la base de données'
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'{spec.students} élèves et {rows} inscriptions générés dans {destination} '
+            f'en {elapsed:.1f}s ({rows / elapsed:.0f} lignes/s)'
+        ))
+
+    @staticmethod
+    def _split(value):
+        return [item.strip() for item in value.split(',') if item.strip()]
+
+    def _write_file(self, generator, path):
+        """Écrit les lignes au format attendu par import_excel"""
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.csv':
+            return self._write_csv(generator, path)
+        if extension in ('.xlsx', '.parquet'):
+            import pandas as pd
+            df = pd.DataFrame(list(generator.rows()), columns=FILE_COLUMNS)
+            if extension == '.xlsx':
+                if len(df) >= EXCEL_MAX_ROWS:
+                    raise CommandError(
+                        f'{len(df)} lignes : trop pour une feuille Excel, utilisez .csv ou .parquet'
+                    )
+                df.to_excel(path, index=False, engine='openpyxl')
+            else:
+                try:
+                    df.to_parquet(path, index=False)
+                except ImportError:
+                    raise CommandError('L\'écriture Parquet nécessite pyarrow (pip install pyarrow)')
+            return len(df)
+        raise CommandError(f'Format non supporté ({extension}), formats acceptés: .xlsx, .csv, .parquet')
+
+    def _write_csv(self, generator, path):
+        """Écriture en continu : la mémoire ne dépend pas de la taille du jeu"""
+        count = 0
+        with open(path, 'w', newline='', encoding='utf-8') as handle:
+            writer = csv.DictWriter(handle, fieldnames=FILE_COLUMNS)
+            writer.writeheader()
+            for row in generator.rows():
+                writer.writerow(row)
+                count += 1
+        return count
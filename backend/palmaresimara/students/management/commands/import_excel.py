@@ -1,10 +1,13 @@
 import os
 import logging
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from django.utils import timezone
 import pandas as pd
 import openpyxl
+from analytics.warming import command_skip_reason, warm_after_import
+from students import leaderboard, listing
 from students.models import Student, SchoolYear, Classe, Section, Enrollment
 
 # Configuration du logging
@@ -14,6 +17,9 @@ logger = logging.getLogger('students')
 class Command(BaseCommand):
     help = 'Import des données Excel vers la base de données'
 
+    # Préchauffage des caches une fois l'import validé (voir analytics.warming)
+    warm_caches = True
+
     def add_arguments(self, parser):
         parser.add_argument(
             'excel_file',
@@ -36,12 +42,23 @@ class Command(BaseCommand):
             default=100,
             help='Taille des lots pour l\'import (défaut: 100)'
         )
+        parser.add_argument(
+            '--no-warm-caches',
+            action='store_true',
+            help='Ne préchauffe pas analytics et classements après l\'import'
+        )
 
     def handle(self, *args, **options):
         excel_file = options['excel_file']
         dry_run = options['dry_run']
         update_existing = options['update']
         batch_size = options['batch_size']
+        self.warm_caches = not options['no_warm_caches'] and settings.CACHE_WARMING_AFTER_IMPORT
+        # Commande : préchauffage perdu avec un cache propre au processus
+        skip_reason = command_skip_reason() if self.warm_caches and not dry_run else None
+        if skip_reason:
+            self.stdout.write(self.style.WARNING(skip_reason))
+            self.warm_caches = False
 
         # Vérifier l'existence du fichier
         if not os.path.exists(excel_file):
@@ -74,11 +91,18 @@ class Command(BaseCommand):
         self.stdout.write('Lecture du fichier Excel...')
         
         try:
-            # Essayer de lire avec différents moteurs
-            try:
-                df = pd.read_excel(excel_file, engine='openpyxl')
-            except:
-                df = pd.read_excel(excel_file, engine='xlrd')
+            # Fichiers CSV et Parquet (jeux de données générés par generate_dataset)
+            extension = os.path.splitext(excel_file)[1].lower()
+            if extension == '.csv':
+                df = pd.read_csv(excel_file, encoding='utf-8')
+            elif extension == '.parquet':
+                df = pd.read_parquet(excel_file)
+            else:
+                # Essayer de lire avec différents moteurs
+                try:
+                    df = pd.read_excel(excel_file, engine='openpyxl')
+                except:
+                    df = pd.read_excel(excel_file, engine='xlrd')
             
             self.stdout.write(f'Fichier lu avec succès: {len(df)} lignes trouvées')
             return df
@@ -158,6 +182,9 @@ class Command(BaseCommand):
             except Exception as e:
                 errors.append(f'Ligne {index + 2}: {str(e)}')
         
+        # Conservées pour les imports asynchrones (voir students.jobs)
+        self.validation_errors = errors
+        
         if errors:
             self.stdout.write(self.style.ERROR(f'{len(errors)} erreurs de validation trouvées:'))
             for error in errors[:10]:  # Afficher seulement les 10 premières erreurs
@@ -171,8 +198,12 @@ class Command(BaseCommand):
         self.stdout.write(f'Validation terminée: {len(validated_rows)} lignes valides, {len(errors)} erreurs')
         return validated_rows
 
-    def _import_data(self, validated_data, dry_run, update_existing, batch_size):
-        """Importe les données validées en base"""
+    def _import_data(self, validated_data, dry_run, update_existing, batch_size, progress=None):
+        """
+        Importe les données validées en base.
+        
+        `progress(processed, total)` est appelé après chaque lot s'il est fourni.
+        """
         self.stdout.write('Import des données...')
         
         result = {
@@ -193,8 +224,11 @@ class Command(BaseCommand):
                 self._simulate_import_row(data, result)
             return result
         
-        # Import réel avec transaction
-        with transaction.atomic():
+        # Import réel avec transaction ; les classements sont recalculés
+        # une fois l'import validé plutôt qu'à chaque ligne, comme la vue de
+        # lecture des inscriptions
+        since = timezone.now()
+        with leaderboard.bulk_update(), transaction.atomic(), listing.bulk_update():
             processed = 0
             for data in validated_data:
                 try:
@@ -203,6 +237,8 @@ class Command(BaseCommand):
                     
                     if processed % batch_size == 0:
                         self.stdout.write(f'Traité: {processed}/{len(validated_data)} lignes')
+                        if progress:
+                            progress(processed, len(validated_data))
                         
                 except Exception as e:
                     error_msg = f'Ligne {data["ligne"]}: {str(e)}'
@@ -211,8 +247,29 @@ class Command(BaseCommand):
             
             self.stdout.write(f'Import terminé: {processed} lignes traitées')
         
+        if self.warm_caches and settings.CACHE_WARMING_AFTER_IMPORT:
+            transaction.on_commit(lambda: self._warm_caches(since))
+        
+        if progress:
+            progress(len(validated_data), len(validated_data))
+        
         return result
 
+    def _warm_caches(self, since):
+        """Préchauffe les caches des années importées ; un échec n'interrompt pas l'import"""
+        self.stdout.write('Préchauffage des caches...')
+        try:
+            counts = warm_after_import(since)
+        except Exception as e:
+            logger.warning(f'Préchauffage des caches échoué: {str(e)}', exc_info=True)
+            return
+        if counts:
+            self.stdout.write(
+                f'Caches préchauffés: {counts["analytics"]} analytics, '
+                f'{counts["class_analytics"]} statistiques de classe, '
+                f'{counts["leaderboards"]} classements ({counts["errors"]} erreurs)'
+            )
+
     def _simulate_import_row(self, data, result):
         """Simule l'import d'une ligne (mode dry-run)"""
         # Vérifier si l'étudiant existe
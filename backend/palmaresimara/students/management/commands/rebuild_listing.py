@@ -0,0 +1,47 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from students import listing
+from students.models import SchoolYear
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruit la vue de lecture des inscriptions (EnrollmentListing), '
+        'par exemple après activation d\'ENROLLMENT_READ_MODEL'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--year',
+            action='append',
+            dest='years',
+            help='Année scolaire à reconstruire, ex: 2023-2024 (répétable, défaut: toutes)'
+        )
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Base à mettre à jour (défaut: default)'
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        school_year_ids = None
+        if options['years']:
+            found = dict(
+                SchoolYear.objects.using(using).filter(year__in=options['years']).values_list('year', 'id')
+            )
+            missing = sorted(set(options['years']) - set(found))
+            if missing:
+                raise CommandError(f'Année(s) inconnue(s) : {", ".join(missing)}')
+            school_year_ids = list(found.values())
+
+        start = time.perf_counter()
+        rows = listing.rebuild(school_year_ids, using=using)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'{rows} inscriptions recopiées en {elapsed:.1f}s'
+        ))
+        if not listing.is_enabled():
+            self.stdout.write(
+                'ENROLLMENT_READ_MODEL est désactivé : la table ne sera pas tenue à jour.'
+            )
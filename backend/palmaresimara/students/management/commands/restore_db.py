@@ -0,0 +1,77 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from students.backup import read_header, restore_backup
+
+# Intervalle d'affichage de la progression (lignes)
+PROGRESS_EVERY = 100000
+
+
+class Command(BaseCommand):
+    help = (
+        'Restaure une sauvegarde complète de backup_db puis ses incrémentales '
+        '(remplace le contenu des tables sauvegardées)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'backup',
+            type=str,
+            help='Sauvegarde complète (.ndjson.gz)'
+        )
+        parser.add_argument(
+            'incrementals',
+            nargs='*',
+            type=str,
+            help='Sauvegardes incrémentales à rejouer ensuite, dans l\'ordre'
+        )
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Base à restaurer (défaut: default)'
+        )
+        parser.add_argument(
+            '--noinput', '--no-input',
+            action='store_false',
+            dest='interactive',
+            help='Ne demande pas de confirmation'
+        )
+
+    def handle(self, *args, **options):
+        path = options['backup']
+        try:
+            header = read_header(path)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f'Sauvegarde du {header["created_at"]} ({header["vendor"]}, {len(header["models"])} tables)'
+            f', suivie de {len(options["incrementals"])} incrémentale(s)'
+        )
+        if options['interactive']:
+            answer = input(
+                'ATTENTION : les données actuelles de ces tables seront remplacées. Continuer ? (y/N) '
+            )
+            if answer.strip().lower() != 'y':
+                self.stdout.write('Restauration annulée.')
+                return
+
+        self._printed = 0
+        start = time.perf_counter()
+        try:
+            tables = restore_backup(
+                path, options['incrementals'], using=options['database'], progress=self._progress
+            )
+        except ValueError as e:
+            raise CommandError(f'Restauration annulée, base inchangée : {str(e)}')
+        elapsed = time.perf_counter() - start
+
+        rows = sum(tables.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(tables)} tables et {rows} lignes restaurées en {elapsed:.1f}s '
+            f'({rows / elapsed:.0f} lignes/s)'
+        ))
+
+    def _progress(self, label, rows, done):
+        if done or rows - self._printed >= PROGRESS_EVERY:
+            self._printed = 0 if done else rows
+            self.stdout.write(f'  {label}: {rows} lignes{"" if done else "..."}')
@@ -0,0 +1,37 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from analytics.warming import command_skip_reason
+from students.jobs import process_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Exécute les imports déposés via l\'API (worker sans broker externe)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Continue à interroger la file d\'attente au lieu de s\'arrêter'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Intervalle d\'interrogation en secondes avec --loop (défaut: 5)'
+        )
+
+    def handle(self, *args, **options):
+        # Worker séparé : préchauffage inutile si le cache n'est pas partagé
+        skip_reason = command_skip_reason() if settings.CACHE_WARMING_AFTER_IMPORT else None
+        if skip_reason:
+            self.stdout.write(self.style.WARNING(skip_reason))
+        while True:
+            processed = process_pending_jobs(warm_caches=skip_reason is None)
+            if processed:
+                self.stdout.write(self.style.SUCCESS(f'{processed} import(s) exécuté(s)'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+            close_old_connections()
@@ -0,0 +1,43 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from analytics.warming import command_skip_reason, warm_caches
+from students.models import SchoolYear
+
+
+class Command(BaseCommand):
+    help = (
+        'Précalcule et met en cache analytics, statistiques des classes et '
+        'classements (fait automatiquement à la fin des imports)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--year',
+            action='append',
+            dest='years',
+            help='Année scolaire à préchauffer, ex: 2023-2024 (répétable, défaut: toutes)'
+        )
+
+    def handle(self, *args, **options):
+        skip_reason = command_skip_reason()
+        if skip_reason:
+            self.stdout.write(self.style.WARNING(skip_reason))
+            return
+
+        school_year_ids = None
+        if options['years']:
+            found = dict(SchoolYear.objects.filter(year__in=options['years']).values_list('year', 'id'))
+            missing = sorted(set(options['years']) - set(found))
+            if missing:
+                raise CommandError(f'Année(s) inconnue(s) : {", ".join(missing)}')
+            school_year_ids = list(found.values())
+
+        start = time.perf_counter()
+        counts = warm_caches(school_year_ids)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'{counts["analytics"]} analytics, {counts["class_analytics"]} statistiques de classe '
+            f'et {counts["leaderboards"]} classements mis en cache en {elapsed:.1f}s'
+        ))
+        if counts['errors']:
+            self.stdout.write(self.style.WARNING(f'{counts["errors"]} calculs en erreur (voir les logs)'))
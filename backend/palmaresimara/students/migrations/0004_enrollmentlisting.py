@@ -0,0 +1,103 @@
+# Generated by Django 5.2.5 on 2026-10-19 07:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("students", "0003_deletionlog"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EnrollmentListing",
+            fields=[
+                (
+                    "enrollment",
+                    models.OneToOneField(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="students.enrollment",
+                    ),
+                ),
+                ("student_name", models.CharField(max_length=255)),
+                ("year", models.CharField(max_length=9)),
+                ("classe_name", models.CharField(max_length=100)),
+                ("section_name", models.CharField(max_length=100)),
+                ("percentage", models.FloatField()),
+                (
+                    "rank",
+                    models.PositiveIntegerField(
+                        help_text="Rang dans la classe pour l'année (ex aequo au même rang)"
+                    ),
+                ),
+                ("created_at", models.DateTimeField()),
+                (
+                    "classe",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        db_index=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="students.classe",
+                    ),
+                ),
+                (
+                    "school_year",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        db_index=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="students.schoolyear",
+                    ),
+                ),
+                (
+                    "section",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="students.section",
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="students.student",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Inscription (liste)",
+                "verbose_name_plural": "Inscriptions (liste)",
+                "ordering": ["-percentage", "student_name", "enrollment_id"],
+                "indexes": [
+                    models.Index(
+                        fields=["-percentage", "student_name", "enrollment"],
+                        name="listing_percentage_idx",
+                    ),
+                    models.Index(
+                        fields=["year", "-percentage", "student_name", "enrollment"],
+                        name="listing_year_idx",
+                    ),
+                    models.Index(
+                        fields=["school_year", "classe", "-percentage"],
+                        name="listing_year_classe_idx",
+                    ),
+                    models.Index(
+                        fields=["classe", "-percentage", "student_name", "enrollment"],
+                        name="listing_classe_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
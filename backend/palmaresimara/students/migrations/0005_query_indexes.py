@@ -0,0 +1,115 @@
+# Generated by Django 5.2.5 on 2026-10-19 07:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Recherches par nom (icontains, soit UPPER(col::text) LIKE '%...%') : index
+# trigrammes, propres à PostgreSQL ; les autres bases gardent le parcours
+TRIGRAM_INDEXES = [
+    ('student_full_name_trgm_idx', 'students_student', 'full_name'),
+    ('listing_student_name_trgm_idx', 'students_enrollmentlisting', 'student_name'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("students", "0004_enrollmentlisting"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="enrollment",
+            name="students_en_school__f5b350_idx",
+        ),
+        migrations.AlterField(
+            model_name="enrollment",
+            name="classe",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="enrollments",
+                to="students.classe",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="enrollment",
+            name="school_year",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="enrollments",
+                to="students.schoolyear",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="enrollment",
+            name="student",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="enrollments",
+                to="students.student",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="enrollment",
+            index=models.Index(
+                fields=["school_year", "-percentage"], name="enrollment_year_pct_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="enrollment",
+            index=models.Index(
+                fields=["classe", "-percentage", "school_year"],
+                name="enrollment_classe_pct_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="enrollment",
+            index=models.Index(
+                fields=["school_year", "classe", "section", "-percentage"],
+                name="enrollment_scope_pct_idx",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="importjob",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "En attente"),
+                    ("running", "En cours"),
+                    ("completed", "Terminé"),
+                    ("failed", "Échoué"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="importjob",
+            index=models.Index(
+                fields=["status", "created_at"], name="importjob_status_created_idx"
+            ),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
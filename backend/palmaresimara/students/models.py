@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class SchoolYear(models.Model):
@@ -63,9 +65,17 @@ class Student(models.Model):
 
 class Enrollment(models.Model):
     """Inscription d'un élève dans une classe pour une année donnée"""
-    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='enrollments')
-    school_year = models.ForeignKey(SchoolYear, on_delete=models.PROTECT, related_name='enrollments')
-    classe = models.ForeignKey(Classe, on_delete=models.PROTECT, related_name='enrollments')
+    # Pas d'index propre pour ces clés étrangères : les index composés
+    # ci-dessous (unique_together pour student) commencent par leur colonne
+    student = models.ForeignKey(
+        Student, on_delete=models.CASCADE, db_index=False, related_name='enrollments'
+    )
+    school_year = models.ForeignKey(
+        SchoolYear, on_delete=models.PROTECT, db_index=False, related_name='enrollments'
+    )
+    classe = models.ForeignKey(
+        Classe, on_delete=models.PROTECT, db_index=False, related_name='enrollments'
+    )
     section = models.ForeignKey(Section, on_delete=models.PROTECT, related_name='enrollments')
     percentage = models.FloatField(help_text="Pourcentage/moyenne de l'élève")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -76,9 +86,21 @@ class Enrollment(models.Model):
         ordering = ['-percentage', 'student__full_name']
         verbose_name = "Inscription"
         verbose_name_plural = "Inscriptions"
+        # Un index par forme de requête fréquente : filtre d'égalité puis tri
+        # par moyenne décroissante (listes, classements, top 10), la moyenne
+        # couvrant aussi les agrégats des analytics (voir explain_queries)
         indexes = [
-            models.Index(fields=['school_year', 'classe', 'section']),
+            # Tri par défaut et classement général
             models.Index(fields=['percentage']),
+            # Année : listes, classements et statistiques par année
+            models.Index(fields=['school_year', '-percentage'], name='enrollment_year_pct_idx'),
+            # Classe : listes, classements et analytics d'une classe (l'année en
+            # fin de clé couvre l'évolution par année)
+            models.Index(fields=['classe', '-percentage', 'school_year'], name='enrollment_classe_pct_idx'),
+            # Périmètre complet des classements, statistiques par classe d'une année
+            models.Index(
+                fields=['school_year', 'classe', 'section', '-percentage'], name='enrollment_scope_pct_idx'
+            ),
         ]
     
     def __str__(self):
@@ -88,3 +110,150 @@ class Enrollment(models.Model):
     def class_section(self):
         """Retourne la classe et section formatées"""
         return f"{self.classe.name} {self.section.name}"
+
+    # Périmètre des classements (voir students.leaderboard)
+    SCOPE_FIELDS = ('school_year_id', 'classe_id', 'section_id')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_scope()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.remember_scope()
+
+    def remember_scope(self):
+        """
+        Mémorise le périmètre tel qu'il est en base (lecture ou écriture) :
+        l'écriture suivante retrouve l'ancien périmètre sans requête
+        """
+        if all(field in self.__dict__ for field in self.SCOPE_FIELDS):
+            self._stored_scope = tuple(self.__dict__[field] for field in self.SCOPE_FIELDS)
+        else:
+            # Champ différé (only/defer) : périmètre inconnu
+            self._stored_scope = None
+
+
+class ImportJob(models.Model):
+    """Import Excel asynchrone déposé via l'API et exécuté par un worker local"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'En attente'),
+        (STATUS_RUNNING, 'En cours'),
+        (STATUS_COMPLETED, 'Terminé'),
+        (STATUS_FAILED, 'Échoué'),
+    ]
+    
+    STAGE_QUEUED = 'queued'
+    STAGE_READING = 'reading'
+    STAGE_VALIDATING = 'validating'
+    STAGE_IMPORTING = 'importing'
+    STAGE_DONE = 'done'
+    STAGE_CHOICES = [
+        (STAGE_QUEUED, 'En file d\'attente'),
+        (STAGE_READING, 'Lecture du fichier'),
+        (STAGE_VALIDATING, 'Validation'),
+        (STAGE_IMPORTING, 'Import'),
+        (STAGE_DONE, 'Terminé'),
+    ]
+    
+    file = models.FileField(upload_to='imports/%Y/%m/', help_text="Fichier Excel à importer")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES, default=STAGE_QUEUED)
+    update_existing = models.BooleanField(default=False, help_text="Met à jour les inscriptions existantes")
+    dry_run = models.BooleanField(default=False, help_text="Simulation sans sauvegarde")
+    rows_total = models.PositiveIntegerField(default=0)
+    rows_processed = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='import_jobs'
+    )
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Import"
+        indexes = [
+            # File d'attente du worker, interrogée en boucle (imports en attente,
+            # du plus ancien au plus récent) ; sert aussi les filtres par statut
+            models.Index(fields=['status', 'created_at'], name='importjob_status_created_idx'),
+        ]
+        verbose_name_plural = "Imports"
+    
+    def __str__(self):
+        return f"Import #{self.pk} ({self.get_status_display()})"
+
+
+class DeletionLog(models.Model):
+    """
+    Suppression d'une ligne suivie par les sauvegardes incrémentales
+    (les lignes modifiées sont retrouvées par updated_at)
+    """
+    model = models.CharField(max_length=100, help_text="Modèle, au format app.modele")
+    object_id = models.CharField(max_length=64)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    class Meta:
+        ordering = ['deleted_at']
+        verbose_name = "Suppression"
+        verbose_name_plural = "Suppressions"
+    
+    def __str__(self):
+        return f"{self.model} #{self.object_id} ({self.deleted_at:%Y-%m-%d %H:%M})"
+
+
+class EnrollmentListing(models.Model):
+    """
+    Vue de lecture dénormalisée des inscriptions (ENROLLMENT_READ_MODEL) :
+    noms et rang dans la classe de l'année recopiés, pour filtrer, trier et
+    compter les listes sans jointure (voir students.listing)
+    """
+    enrollment = models.OneToOneField(
+        Enrollment, on_delete=models.DO_NOTHING, primary_key=True,
+        db_constraint=False, related_name='+'
+    )
+    student = models.ForeignKey(
+        Student, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    school_year = models.ForeignKey(
+        SchoolYear, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+'
+    )
+    classe = models.ForeignKey(
+        Classe, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+'
+    )
+    section = models.ForeignKey(
+        Section, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    student_name = models.CharField(max_length=255)
+    year = models.CharField(max_length=9)
+    classe_name = models.CharField(max_length=100)
+    section_name = models.CharField(max_length=100)
+    percentage = models.FloatField()
+    rank = models.PositiveIntegerField(help_text="Rang dans la classe pour l'année (ex aequo au même rang)")
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-percentage', 'student_name', 'enrollment_id']
+        verbose_name = "Inscription (liste)"
+        verbose_name_plural = "Inscriptions (liste)"
+        # Tri par défaut, seul ou après un filtre d'année ou de classe ; la clé
+        # se termine par l'identifiant : départage stable, et index couvrant
+        # pour la page d'identifiants
+        indexes = [
+            models.Index(fields=['-percentage', 'student_name', 'enrollment'], name='listing_percentage_idx'),
+            models.Index(fields=['year', '-percentage', 'student_name', 'enrollment'], name='listing_year_idx'),
+            models.Index(fields=['school_year', 'classe', '-percentage'], name='listing_year_classe_idx'),
+            models.Index(fields=['classe', '-percentage', 'student_name', 'enrollment'], name='listing_classe_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.student_name} - {self.year} ({self.classe_name} {self.section_name}, rang {self.rank})"
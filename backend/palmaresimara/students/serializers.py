@@ -1,5 +1,44 @@
+import os
 from rest_framework import serializers
-from .models import SchoolYear, Classe, Section, Student, Enrollment
+from . import dimensions
+from .models import SchoolYear, Classe, Section, Student, Enrollment, ImportJob
+from .jobs import get_progress
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer restreint aux champs demandés (`fields=[...]`), et colonnes à
+    charger pour ces champs (`only_fields`)
+    """
+    # Champ -> colonnes lues, quand ce n'est pas la seule source du champ
+    field_columns = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def only_fields(cls, queryset, fields):
+        """
+        Queryset limité aux colonnes des champs donnés : only(), et jointures
+        gardées seulement pour les champs imbriqués demandés
+        """
+        serializer = cls()
+        model = cls.Meta.model
+        columns = {model._meta.pk.attname}
+        for name in fields:
+            if name in cls.field_columns:
+                columns.update(cls.field_columns[name])
+            else:
+                columns.add(model._meta.get_field(serializer.fields[name].source).attname)
+        queryset = queryset.select_related(None)
+        related = {column.split('__')[0] for column in columns if '__' in column}
+        if related:
+            # select_related() sans argument suivrait toutes les relations
+            queryset = queryset.select_related(*related)
+        return queryset.only(*columns)
 
 
 class SchoolYearSerializer(serializers.ModelSerializer):
@@ -29,7 +68,7 @@ class SectionSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer pour les élèves"""
     
     class Meta:
@@ -46,14 +85,34 @@ class StudentSummarySerializer(serializers.ModelSerializer):
         fields = ['id', 'full_name']
 
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class DimensionField(serializers.Field):
+    """
+    Année, classe ou section sérialisée, lue dans le cache des dimensions
+    depuis la clé étrangère (sans jointure ni requête)
+    """
+
+    def __init__(self, model, **kwargs):
+        self.model = model
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, pk):
+        return dimensions.get(self.model, pk)
+
+
+class EnrollmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer pour les inscriptions"""
-    # Champs imbriqués pour la lecture
+    # Champs imbriqués pour la lecture (dimensions : voir students.dimensions)
     student_detail = StudentSummarySerializer(source='student', read_only=True)
-    school_year_detail = SchoolYearSerializer(source='school_year', read_only=True)
-    classe_detail = ClasseSerializer(source='classe', read_only=True)
-    section_detail = SectionSerializer(source='section', read_only=True)
-    class_section = serializers.ReadOnlyField()
+    school_year_detail = DimensionField(SchoolYear, source='school_year_id')
+    classe_detail = DimensionField(Classe, source='classe_id')
+    section_detail = DimensionField(Section, source='section_id')
+    class_section = serializers.SerializerMethodField()
+
+    field_columns = {
+        'student_detail': ['student_id', 'student__full_name'],
+        'class_section': ['classe_id', 'section_id'],
+    }
     
     class Meta:
         model = Enrollment
@@ -85,6 +144,10 @@ class EnrollmentSerializer(serializers.ModelSerializer):
         
         return data
     
+    def get_class_section(self, obj):
+        """Classe et section (comme Enrollment.class_section), depuis le cache"""
+        return f"{dimensions.label(Classe, obj.classe_id)} {dimensions.label(Section, obj.section_id)}"
+    
     def validate_percentage(self, value):
         """Validation du pourcentage"""
         if value < 0 or value > 100:
@@ -124,3 +187,54 @@ class StudentWithEnrollmentsSerializer(serializers.ModelSerializer):
         if enrollments:
             return round(sum(e.percentage for e in enrollments) / len(enrollments), 2)
         return None
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """Serializer pour les imports asynchrones (dépôt du fichier et suivi)"""
+    ALLOWED_EXTENSIONS = ('.xlsx', '.xls', '.csv', '.parquet')
+    
+    rate = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'file', 'update_existing', 'dry_run', 'status', 'stage',
+            'rows_total', 'rows_processed', 'rate', 'errors', 'result',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = [
+            'status', 'stage', 'rows_total', 'rows_processed', 'errors', 'result',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        extra_kwargs = {'file': {'write_only': True}}
+    
+    def validate_file(self, value):
+        """Validation de l'extension du fichier"""
+        extension = os.path.splitext(value.name)[1].lower()
+        if extension not in self.ALLOWED_EXTENSIONS:
+            raise serializers.ValidationError(
+                f"Format non supporté ({extension}), formats acceptés: {', '.join(self.ALLOWED_EXTENSIONS)}"
+            )
+        return value
+    
+    def to_representation(self, instance):
+        """Remplace les compteurs par la progression publiée pendant l'import"""
+        data = super().to_representation(instance)
+        progress = get_progress(instance)
+        if progress:
+            data.update(
+                stage=progress['stage'],
+                rows_total=progress['rows_total'],
+                rows_processed=progress['rows_processed'],
+            )
+        return data
+    
+    def get_rate(self, obj):
+        """Lignes traitées par seconde"""
+        progress = get_progress(obj)
+        if progress:
+            return progress['rate']
+        if obj.started_at and obj.finished_at:
+            elapsed = (obj.finished_at - obj.started_at).total_seconds()
+            return round(obj.rows_processed / elapsed, 1) if elapsed else None
+        return None
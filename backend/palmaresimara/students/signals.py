@@ -0,0 +1,127 @@
+"""
+Signaux de l'application students : mise à jour des classements précalculés,
+de la vue de lecture des inscriptions, du cache des dimensions et des
+résultats, et journal des suppressions des sauvegardes incrémentales
+"""
+from django.core.signals import request_started
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import coalesce, dimensions, leaderboard, listing
+from .backup import incremental_models, log_deletion
+from .models import SchoolYear, Classe, Section, Student, Enrollment
+
+# Noms acceptés dans update_fields pour les champs du périmètre
+SCOPE_UPDATE_FIELDS = {
+    name for field in Enrollment.SCOPE_FIELDS for name in (field, field.removesuffix('_id'))
+}
+
+
+@receiver(pre_save, sender=Enrollment)
+def remember_enrollment_scope(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Mémorise le périmètre (année, classe, section) avant modification : celui
+    lu en base avec l'instance (Enrollment.from_db), sans requête, sinon relu
+    """
+    instance._leaderboard_previous_scope = None
+    if raw or instance.pk is None or leaderboard.is_suspended():
+        return
+    stored = getattr(instance, '_stored_scope', None)
+    if stored is None and update_fields is not None and not SCOPE_UPDATE_FIELDS & set(update_fields):
+        # Périmètre non modifié par cette écriture
+        stored = tuple(getattr(instance, field) for field in Enrollment.SCOPE_FIELDS)
+    if stored is None:
+        # Instance construite sans lecture (identifiant donné) ou champs différés
+        stored = (
+            Enrollment.objects.filter(pk=instance.pk)
+            .values_list(*Enrollment.SCOPE_FIELDS).first()
+        )
+    instance._leaderboard_previous_scope = stored
+
+
+@receiver(post_save, sender=Enrollment)
+def update_leaderboards_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    leaderboard.on_enrollment_change(
+        instance.pk, getattr(instance, '_leaderboard_previous_scope', None), instance
+    )
+    instance.remember_scope()
+
+
+@receiver(post_delete, sender=Enrollment)
+def update_leaderboards_on_delete(sender, instance, **kwargs):
+    leaderboard.on_enrollment_change(
+        instance.pk, (instance.school_year_id, instance.classe_id, instance.section_id)
+    )
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=SchoolYear)
+@receiver(post_save, sender=Classe)
+@receiver(post_save, sender=Section)
+def invalidate_leaderboards_on_rename(sender, instance, created=False, raw=False, **kwargs):
+    """Les classements contiennent les noms : une modification les invalide"""
+    if not created and not raw:
+        leaderboard.on_names_change()
+
+
+@receiver(post_save, sender=Enrollment)
+def update_listing_on_save(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        listing.on_enrollment_saved(instance.pk, using)
+
+
+@receiver(post_delete, sender=Enrollment)
+def update_listing_on_delete(sender, instance, using=None, **kwargs):
+    listing.on_enrollment_deleted(instance.pk, using)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=SchoolYear)
+@receiver(post_save, sender=Classe)
+@receiver(post_save, sender=Section)
+def update_listing_on_rename(sender, instance, created=False, raw=False, using=None, **kwargs):
+    """La vue de lecture recopie les noms"""
+    if not created and not raw:
+        listing.on_names_change(instance, using)
+
+
+@receiver(post_save, sender=SchoolYear)
+@receiver(post_save, sender=Classe)
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=SchoolYear)
+@receiver(post_delete, sender=Classe)
+@receiver(post_delete, sender=Section)
+def invalidate_dimensions(sender, raw=False, using=None, **kwargs):
+    if not raw:
+        dimensions.invalidate(using)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=SchoolYear)
+@receiver(post_save, sender=Classe)
+@receiver(post_save, sender=Section)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=SchoolYear)
+@receiver(post_delete, sender=Classe)
+@receiver(post_delete, sender=Section)
+@receiver(post_delete, sender=Enrollment)
+def invalidate_results(sender, raw=False, using=None, **kwargs):
+    """Analytics en cache (students.coalesce) ; une fois en fin d'écriture en masse"""
+    if not raw and not leaderboard.is_suspended():
+        coalesce.invalidate(using)
+
+
+@receiver(request_started)
+def expire_dimensions(sender, **kwargs):
+    """Copie des dimensions comparée à la version partagée une fois par requête"""
+    dimensions.expire()
+
+
+# Suppressions des modèles sauvegardés en incrémental (via updated_at)
+for model in incremental_models():
+    post_delete.connect(
+        log_deletion, sender=model, dispatch_uid=f'backup_deletion_{model._meta.label_lower}'
+    )
@@ -0,0 +1,71 @@
+"""
+Réponses JSON en flux pour les listes volumineuses.
+
+Le queryset est parcouru avec `.iterator()` (curseur côté serveur sur
+PostgreSQL) et le JSON est émis par morceaux : la mémoire utilisée ne dépend
+pas du nombre d'inscriptions renvoyées.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+ITERATOR_CHUNK_SIZE = 2000
+# Nombre d'objets sérialisés regroupés dans un même morceau de la réponse
+ITEMS_PER_CHUNK = 200
+
+
+def _dumps(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def iter_grouped_json(queryset, group_by, group_label, serializer):
+    """
+    Produit `[{...description du groupe, "enrollments": [...], "count": n}, ...]`.
+
+    Le queryset doit être trié par groupe. `group_by(obj)` retourne la clé du
+    groupe d'un objet et `group_label(obj)` le dictionnaire (non vide) qui le
+    décrit. `serializer` est une instance de serializer dont seul
+    `to_representation` est utilisé. Le nombre d'éléments d'un groupe n'est
+    connu qu'à sa fin, d'où sa position après la liste.
+    """
+    current = object()
+    count = 0
+    buffer = ['[']
+    first_group = True
+
+    def close_group():
+        return f'], "count": {count}}}'
+
+    for obj in queryset.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        key = group_by(obj)
+        if key != current:
+            if not first_group:
+                buffer.append(close_group() + ',')
+            buffer.append(_dumps(group_label(obj))[:-1] + ', "enrollments": [')
+            first_group = False
+            current = key
+            count = 0
+        elif count:
+            buffer.append(',')
+        buffer.append(_dumps(serializer.to_representation(obj)))
+        count += 1
+
+        if len(buffer) >= ITEMS_PER_CHUNK:
+            yield ''.join(buffer)
+            buffer = []
+
+    if not first_group:
+        buffer.append(close_group())
+    buffer.append(']')
+    yield ''.join(buffer)
+
+
+def grouped_json_response(queryset, group_by, group_label, serializer):
+    """StreamingHttpResponse JSON (transfert chunked) groupé par clé"""
+    response = StreamingHttpResponse(
+        iter_grouped_json(queryset, group_by, group_label, serializer),
+        content_type='application/json; charset=utf-8',
+    )
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,352 @@
+import re
+import threading
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from students import coalesce, dimensions
+from students.models import Student, SchoolYear, Classe, Section, Enrollment
+from students.tests.test_api import APITestCase
+from analytics.concurrency import run_concurrently
+from analytics.filters import resolve_dimension_filters
+
+
+class ProgressionAPITest(APITestCase):
+    """Tests pour l'API de progression des élèves"""
+
+    def setUp(self):
+        super().setUp()
+        # self.student : Première 2022-2023 (70) -> Terminale 2023-2024 (85.5)
+        self.previous_year = SchoolYear.objects.create(year="2022-2023")
+        self.premiere = Classe.objects.create(name="Première")
+        Enrollment.objects.create(
+            student=self.student, school_year=self.previous_year,
+            classe=self.premiere, section=self.section, percentage=70.0
+        )
+        # Un second élève en régression sur le même parcours
+        self.student2 = Student.objects.create(full_name="BAMBA Marie")
+        Enrollment.objects.create(
+            student=self.student2, school_year=self.previous_year,
+            classe=self.premiere, section=self.section, percentage=80.0
+        )
+        Enrollment.objects.create(
+            student=self.student2, school_year=self.school_year,
+            classe=self.classe, section=self.section, percentage=75.0
+        )
+        # Un élève sans historique ne doit apparaître nulle part
+        student3 = Student.objects.create(full_name="TRAORE Salimata")
+        Enrollment.objects.create(
+            student=student3, school_year=self.school_year,
+            classe=self.classe, section=self.section, percentage=99.0
+        )
+
+    def test_cohort_averages(self):
+        """Test des moyennes par cohorte Première -> Terminale"""
+        url = reverse('progression-analytics')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(len(response.data['cohorts']), 1)
+        cohort = response.data['cohorts'][0]
+        self.assertEqual(cohort['from_year'], "2022-2023")
+        self.assertEqual(cohort['to_year'], "2023-2024")
+        self.assertEqual(cohort['from_classe'], "Première")
+        self.assertEqual(cohort['to_classe'], "Terminale")
+        self.assertEqual(cohort['students_count'], 2)
+        self.assertAlmostEqual(cohort['average_delta'], 5.25)  # (15.5 - 5) / 2
+
+    def test_most_improved_and_declined(self):
+        """Test des listes de progression et de régression"""
+        url = reverse('progression-analytics')
+        response = self.client.get(url, {'year': '2023-2024', 'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        improved = response.data['most_improved']
+        self.assertEqual(len(improved), 1)
+        self.assertEqual(improved[0]['student__full_name'], "KOUAME Jean Marie")
+        self.assertAlmostEqual(improved[0]['delta'], 15.5)
+
+        declined = response.data['most_declined']
+        self.assertEqual(declined[0]['student__full_name'], "BAMBA Marie")
+        self.assertAlmostEqual(declined[0]['delta'], -5.0)
+
+    def test_year_filter_keeps_previous_year_for_lag(self):
+        """Test que le filtre d'année n'empêche pas le calcul de l'écart"""
+        url = reverse('progression-analytics')
+        response = self.client.get(url, {'year': '2022-2023'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Aucune année précédente pour 2022-2023
+        self.assertEqual(response.data['cohorts'], [])
+        self.assertEqual(response.data['most_improved'], [])
+
+    def test_single_window_scan(self):
+        """Test que cohortes, progressions et régressions partagent un seul calcul de LAG"""
+        url = reverse('progression-analytics')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'year': '2023-2024'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lag_queries = [q['sql'] for q in queries if 'LAG(' in q['sql']]
+        self.assertEqual(len(lag_queries), 1)
+        self.assertEqual(lag_queries[0].count('LAG('), 3)  # année, classe, pourcentage
+        self.assertNotIn('students_schoolyear"."year" <=', lag_queries[0])
+        self.assertEqual(len(response.data['cohorts']), 1)
+        self.assertEqual(len(response.data['most_improved']), 2)
+
+    def test_unknown_year(self):
+        """Test d'une année inconnue (ou partielle) : aucun résultat, aucune fenêtre calculée"""
+        url = reverse('progression-analytics')
+        for year in ['2023', '1999-2000']:
+            with self.subTest(year=year), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, {'year': year})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.data['cohorts'], [])
+                self.assertEqual(response.data['most_declined'], [])
+                self.assertFalse([q for q in queries if 'LAG(' in q['sql']])
+
+    def test_student_history(self):
+        """Test de l'historique d'un élève avec ses écarts"""
+        url = reverse('progression-analytics')
+        response = self.client.get(url, {'student': self.student.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        history = response.data['student_history']
+        self.assertEqual([row['year'] for row in history], ["2022-2023", "2023-2024"])
+        self.assertIsNone(history[0]['delta'])
+        self.assertAlmostEqual(history[1]['delta'], 15.5)
+
+    def test_invalid_limit(self):
+        """Test de validation du paramètre limit"""
+        url = reverse('progression-analytics')
+        response = self.client.get(url, {'limit': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'limit': 1000})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PivotAnalyticsAPITest(APITestCase):
+    """Tests pour l'API de tableau croisé"""
+
+    def setUp(self):
+        super().setUp()
+        self.section2 = Section.objects.create(name="ES")
+        self.year2 = SchoolYear.objects.create(year="2022-2023")
+        for name, year, section, percentage in [
+            ("BAMBA Marie", self.school_year, self.section2, 92.0),
+            ("TRAORE Salimata", self.year2, self.section, 70.0),
+        ]:
+            Enrollment.objects.create(
+                student=Student.objects.create(full_name=name), school_year=year,
+                classe=self.classe, section=section, percentage=percentage
+            )
+
+    def test_default_groupings(self):
+        """Test des regroupements par défaut (année, classe, section)"""
+        url = reverse('pivot-analytics')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        groupings = response.data['groupings']
+        self.assertEqual(set(groupings), {'year', 'classe', 'section'})
+        self.assertEqual([row['year'] for row in groupings['year']], ["2023-2024", "2022-2023"])
+        self.assertEqual(groupings['classe'][0]['total_enrollments'], 3)
+        self.assertEqual(response.data['total']['total_enrollments'], 3)
+        self.assertEqual(response.data['total']['max_percentage'], 92.0)
+
+    def test_combined_groupings_in_one_request(self):
+        """Test de plusieurs regroupements combinés en une requête"""
+        url = reverse('pivot-analytics')
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'group_by': ['year,classe', 'section;classe,section']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        groupings = response.data['groupings']
+        self.assertEqual(set(groupings), {'year,classe', 'section', 'classe,section'})
+        current = groupings['year,classe'][0]
+        self.assertEqual(current['year'], "2023-2024")
+        self.assertEqual(current['classe'], "Terminale")
+        self.assertEqual(current['total_enrollments'], 2)
+        self.assertAlmostEqual(current['average_percentage'], 88.75)
+
+    def test_filters_applied(self):
+        """Test du filtrage par année"""
+        url = reverse('pivot-analytics')
+        response = self.client.get(url, {'year': '2022-2023', 'group_by': 'section'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total']['total_enrollments'], 1)
+        self.assertEqual(response.data['groupings']['section'][0]['section'], "S")
+
+    def test_missing_label_sorted_last(self):
+        """Test qu'un groupe sans libellé (None) est trié en dernier"""
+        labels = dimensions.labels
+
+        def labels_without_es(model, ids):
+            return {
+                pk: label for pk, label in labels(model, ids).items()
+                if (model, pk) != (Section, self.section2.pk)
+            }
+
+        with mock.patch('analytics.pivot.dimensions.labels', side_effect=labels_without_es):
+            response = self.client.get(reverse('pivot-analytics'), {'group_by': ['section', 'year,section']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        groupings = response.data['groupings']
+        self.assertEqual([row['section'] for row in groupings['section']], ["S", None])
+        self.assertEqual(
+            [(row['year'], row['section']) for row in groupings['year,section']],
+            [("2023-2024", "S"), ("2023-2024", None), ("2022-2023", "S")]
+        )
+
+    def test_unknown_dimension(self):
+        """Test d'une dimension inconnue"""
+        url = reverse('pivot-analytics')
+        response = self.client.get(url, {'group_by': 'year,student'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AnalyticsFastPathTest(APITestCase):
+    """Tests du chemin rapide des agrégats d'analytics (filtres par identifiants)"""
+
+    def setUp(self):
+        super().setUp()
+        other_year = SchoolYear.objects.create(year="2022-2023")
+        other_classe = Classe.objects.create(name="Première")
+        for i in range(20):
+            Enrollment.objects.create(
+                student=Student.objects.create(full_name=f"Student {i:02d}"),
+                school_year=other_year if i % 2 else self.school_year,
+                classe=other_classe if i % 3 else self.classe,
+                section=self.section,
+                percentage=50 + i
+            )
+
+    def test_filtered_aggregates_do_not_join(self):
+        """Test que seuls le top 10 et les libellés nécessitent des jointures"""
+        url = reverse('analytics')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {'year': '2023-2024', 'classe': 'Termin'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        joined = [query['sql'] for query in context.captured_queries if 'JOIN' in query['sql']]
+        self.assertEqual(len(joined), 1)
+        self.assertIn('LIMIT 10', joined[0])
+
+        # 1 (enrollment de setUp) + 4 élèves de 2023-2024 en Terminale (i = 0, 6, 12, 18)
+        self.assertEqual(response.data['general_stats']['total_enrollments'], 5)
+        self.assertEqual(sum(response.data['grade_distribution'].values()), 5)
+        self.assertEqual(response.data['stats_by_class'][0]['classe__name'], "Terminale")
+
+    def test_unknown_filter_returns_empty_stats(self):
+        """Test d'un filtre ne correspondant à aucune dimension"""
+        url = reverse('analytics')
+        response = self.client.get(url, {'classe': 'Inexistante'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['general_stats']['total_enrollments'], 0)
+        self.assertEqual(response.data['stats_by_class'], [])
+
+    def test_missing_year_label_sorted_last(self):
+        """Test qu'une année sans libellé (None) est triée en dernier"""
+        labels = dimensions.labels
+
+        def labels_without_current_year(model, ids):
+            return {
+                pk: label for pk, label in labels(model, ids).items()
+                if (model, pk) != (SchoolYear, self.school_year.pk)
+            }
+
+        with mock.patch('analytics.views.dimensions.labels', side_effect=labels_without_current_year):
+            response = self.client.get(reverse('analytics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [row['school_year__year'] for row in response.data['stats_by_year']], ["2022-2023", None]
+        )
+
+    def test_filtered_queryset_uses_composite_index(self):
+        """Test que le plan de requête utilise l'index (school_year, classe, section, -percentage)"""
+        lookups = resolve_dimension_filters('2023-2024', 'Terminale', 'S')
+        queryset = Enrollment.objects.filter(**lookups).order_by().values('percentage')
+
+        if connection.vendor == 'postgresql':
+            # Sur des tables minuscules PostgreSQL préférerait un parcours séquentiel
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+        plan = queryset.explain()
+        self.assertIn('enrollment_scope_pct_idx', plan)
+        self.assertNotIn('JOIN', str(queryset.query))
+
+
+@override_settings(ANALYTICS_QUERY_WORKERS=4)
+class ConcurrentAnalyticsTest(TransactionTestCase):
+    """Tests de l'exécution en parallèle des groupes de requêtes d'analytics"""
+
+    def setUp(self):
+        cache.clear()
+        year = SchoolYear.objects.create(year="2023-2024")
+        classes = [Classe.objects.create(name=name) for name in ("Première", "Terminale")]
+        section = Section.objects.create(name="A")
+        for i in range(12):
+            Enrollment.objects.create(
+                student=Student.objects.create(full_name=f"Student {i:02d}"),
+                school_year=year, classe=classes[i % 2], section=section, percentage=40 + 5 * i
+            )
+
+    @staticmethod
+    def thread_name():
+        return threading.current_thread().name
+
+    def test_same_response_as_sequential(self):
+        """Test que la réponse parallèle est celle de l'exécution en série"""
+        url = reverse('analytics')
+        with override_settings(ANALYTICS_QUERY_WORKERS=1):
+            expected = self.client.get(url, {'classe': 'Term'}).json()
+        response = self.client.get(url, {'classe': 'Term'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), expected)
+        self.assertEqual(expected['general_stats']['total_enrollments'], 6)
+
+    def test_groups_run_on_pool_threads(self):
+        """Test que les groupes sont exécutés par le pool, chacun avec sa connexion"""
+        def count():
+            return self.thread_name(), Enrollment.objects.count()
+
+        results = run_concurrently({name: count for name in 'abcd'})
+        for name, total in results.values():
+            self.assertTrue(name.startswith('analytics-query'))
+            self.assertEqual(total, 12)
+
+    def test_sequential_in_transaction_or_when_disabled(self):
+        """Test de l'exécution en série pendant une transaction ou avec un seul thread"""
+        current = self.thread_name()
+        with transaction.atomic():
+            Student.objects.create(full_name="Non validé")
+            results = run_concurrently({
+                'thread': self.thread_name,
+                'students': Student.objects.count,
+            })
+        self.assertEqual(results, {'thread': current, 'students': 13})
+
+        with override_settings(ANALYTICS_QUERY_WORKERS=1):
+            self.assertEqual(run_concurrently({'thread': self.thread_name}), {'thread': current})
+
+    @override_settings(REQUEST_INSTRUMENTATION=True)
+    def test_instrumentation_counts_pool_queries(self):
+        """Test que les requêtes SQL des threads du pool sont comptées pour la requête"""
+        url = reverse('analytics')
+        with override_settings(ANALYTICS_QUERY_WORKERS=1), self.assertLogs('analytics', 'INFO') as logs:
+            self.client.get(url)
+        expected = re.search(r'queries=\d+', logs.records[0].getMessage()).group()
+        # Réponse mise en cache par la première requête
+        coalesce.invalidate()
+        with self.assertLogs('analytics', 'INFO') as logs:
+            self.client.get(url)
+        self.assertIn(expected, logs.records[0].getMessage())
+
+    def test_error_propagates(self):
+        """Test qu'une erreur d'un groupe est propagée à l'appelant"""
+        def fail():
+            raise ValueError('groupe en échec')
+
+        with self.assertRaisesMessage(ValueError, 'groupe en échec'):
+            run_concurrently({'ok': Student.objects.count, 'fail': fail})
@@ -1,4 +1,8 @@
+import json
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework.test import APIClient
@@ -11,6 +15,8 @@ class APITestCase(TestCase):
     """Classe de base pour les tests d'API"""
 
     def setUp(self):
+        # Classements et autres données en cache d'un test précédent
+        cache.clear()
         self.client = APIClient()
         
         # Créer un utilisateur admin
@@ -237,6 +243,185 @@ class EnrollmentAPITest(APITestCase):
         self.assertEqual(response.data[1]['percentage'], 88.0)
 
 
+class EnrollmentByClassAPITest(APITestCase):
+    """Tests de pagination et du flux groupé des inscriptions par classe"""
+
+    def setUp(self):
+        super().setUp()
+        self.premiere = Classe.objects.create(name="Première")
+        for i in range(30):
+            Enrollment.objects.create(
+                student=Student.objects.create(full_name=f"Student {i:02d}"),
+                school_year=self.school_year,
+                classe=self.premiere if i % 2 else self.classe,
+                section=self.section,
+                percentage=50 + i
+            )
+
+    def test_by_class_is_paginated(self):
+        """Test que by_class respecte la pagination configurée"""
+        url = reverse('enrollment-by-class')
+        response = self.client.get(url, {'year': '2023-2024'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 31)
+        self.assertEqual(len(response.data['results']), 25)
+        # Triées par classe puis par pourcentage décroissant
+        first = response.data['results'][0]
+        self.assertEqual(first['classe'], self.premiere.id)
+        self.assertEqual(first['percentage'], 79.0)
+
+        response = self.client.get(url, {'year': '2023-2024', 'page': 2})
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_by_class_stream_grouped(self):
+        """Test du flux JSON groupé par classe"""
+        url = reverse('enrollment-by-class')
+        response = self.client.get(url, {'year': '2023-2024', 'stream': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+
+        groups = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([group['classe']['name'] for group in groups], ["Première", "Terminale"])
+        self.assertEqual([group['count'] for group in groups], [15, 16])
+        self.assertEqual(len(groups[1]['enrollments']), 16)
+        self.assertEqual(groups[1]['enrollments'][0]['percentage'], 85.5)
+        self.assertEqual(groups[1]['enrollments'][0]['student_detail']['full_name'], "KOUAME Jean Marie")
+
+    def test_by_class_stream_empty(self):
+        """Test du flux sans résultat"""
+        response = self.client.get(reverse('enrollment-by-class'), {'classe': 'Inconnue', 'stream': '1'})
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), [])
+
+    def test_student_enrollments_paginated(self):
+        """Test de la pagination des inscriptions d'un élève"""
+        url = reverse('student-enrollments', args=[self.student.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['id'], self.enrollment.id)
+
+
+class BulkEnrollmentAPITest(APITestCase):
+    """Tests pour l'API d'inscriptions en masse"""
+
+    def test_bulk_requires_admin(self):
+        """Test que l'écriture en masse est réservée aux admins"""
+        self.authenticate_user()
+        url = reverse('enrollment-bulk')
+        response = self.client.post(url, [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_by_ids_and_names(self):
+        """Test création et mise à jour par identifiants ou par noms"""
+        self.authenticate_admin()
+        url = reverse('enrollment-bulk')
+        rows = [
+            # Mise à jour de l'inscription existante par identifiants
+            {'student': self.student.pk, 'school_year': self.school_year.pk,
+             'classe': self.classe.pk, 'section': self.section.pk, 'percentage': 91.0},
+            # Création par noms, avec nouvelles année et section
+            {'student_name': 'BAMBA Marie', 'year': '2024-2025',
+             'classe_name': 'Terminale', 'section_name': 'ES', 'percentage': 77.5},
+        ]
+        response = self.client.post(url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([r['status'] for r in response.data['results']], ['updated', 'created'])
+
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.percentage, 91.0)
+        created = Enrollment.objects.get(student__full_name='BAMBA Marie')
+        self.assertEqual(created.school_year.year, '2024-2025')
+        self.assertEqual(created.section.name, 'ES')
+        self.assertEqual(Classe.objects.count(), 1)
+
+    def test_bulk_row_errors(self):
+        """Test des statuts d'erreur par ligne"""
+        self.authenticate_admin()
+        url = reverse('enrollment-bulk')
+        rows = [
+            {'student_name': 'A', 'year': '2023-2024', 'classe_name': 'Terminale',
+             'section_name': 'S', 'percentage': 150},
+            {'student': 9999, 'school_year': self.school_year.pk,
+             'classe': self.classe.pk, 'section': self.section.pk, 'percentage': 50},
+            {'student_name': 'B', 'year': '2023-2024', 'classe_name': 'Terminale', 'percentage': 50},
+            {'student_name': 'C', 'year': '2023-2024', 'classe_name': 'Terminale',
+             'section_name': 'S', 'percentage': 60},
+            {'student_name': 'C', 'year': '2023-2024', 'classe_name': 'Terminale',
+             'section_name': 'S', 'percentage': 61},
+        ]
+        response = self.client.post(url, {'rows': rows}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertIn('percentage', results[0]['errors'])
+        self.assertIn('student', results[1]['errors'])
+        self.assertIn('section', results[2]['errors'])
+        self.assertEqual(results[3]['status'], 'created')
+        self.assertIn('non_field_errors', results[4]['errors'])
+        self.assertEqual(response.data['error'], 4)
+        # Les lignes invalides ne créent pas d'élèves
+        self.assertFalse(Student.objects.filter(full_name__in=['A', 'B']).exists())
+
+    def test_bulk_without_update_reports_duplicates(self):
+        """Test du mode sans mise à jour (comme import_excel sans --update)"""
+        self.authenticate_admin()
+        url = reverse('enrollment-bulk')
+        rows = [{'student': self.student.pk, 'school_year': self.school_year.pk,
+                 'classe': self.classe.pk, 'section': self.section.pk, 'percentage': 10}]
+        for update in [False, 'false', '0']:
+            with self.subTest(update=update):
+                response = self.client.post(url, {'rows': rows, 'update': update}, format='json')
+                self.assertEqual(response.data['results'][0]['status'], 'duplicate')
+                self.enrollment.refresh_from_db()
+                self.assertEqual(self.enrollment.percentage, 85.5)
+
+    def test_bulk_rejects_invalid_update_flag(self):
+        """Test du refus d'un paramètre update qui n'est pas un booléen"""
+        self.authenticate_admin()
+        url = reverse('enrollment-bulk')
+        rows = [{'student': self.student.pk, 'school_year': self.school_year.pk,
+                 'classe': self.classe.pk, 'section': self.section.pk, 'percentage': 10}]
+        for update in ['peut-être', None, [1]]:
+            with self.subTest(update=update):
+                response = self.client.post(url, {'rows': rows, 'update': update}, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.percentage, 85.5)
+
+    def test_bulk_query_count_does_not_grow_with_rows(self):
+        """Test que le nombre de requêtes est indépendant du nombre de lignes"""
+        self.authenticate_admin()
+        url = reverse('enrollment-bulk')
+
+        def rows(count, offset):
+            return [
+                {'student_name': f'Student {offset + i}', 'year': '2023-2024',
+                 'classe_name': 'Terminale', 'section_name': 'S', 'percentage': 50 + i % 50}
+                for i in range(count)
+            ]
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(url, rows(5, 0), format='json')
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(url, rows(500, 1000), format='json')
+        self.assertEqual(response.data['created'], 500)
+
+        # Seuls les INSERT sont découpés en lots (limite de paramètres du SGBD)
+        def lookups(context):
+            return [q for q in context.captured_queries if not q['sql'].startswith('INSERT')]
+        self.assertEqual(len(lookups(large)), len(lookups(small)))
+        self.assertLess(len(large.captured_queries), 20)
+
+    def test_bulk_rejects_too_many_rows(self):
+        """Test de la limite du nombre de lignes"""
+        self.authenticate_admin()
+        url = reverse('enrollment-bulk')
+        with self.settings(BULK_ENROLLMENT_MAX_ROWS=2):
+            response = self.client.post(url, [{}, {}, {}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class AnalyticsAPITest(APITestCase):
     """Tests pour l'API d'analytics"""
 
@@ -357,3 +542,50 @@ class PaginationTest(APITestCase):
         response = self.client.get(url, {'page': 2})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 6)  # Reste 6 sur la page 2
+
+
+class SparseFieldsTest(APITestCase):
+    """Tests des champs partiels (?fields= / ?omit=) des listes"""
+
+    def get(self, url, params):
+        """Réponse et requête de lecture de la page"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        table = 'students_enrollment' if 'enrollments' in url else 'students_student'
+        return response, [q['sql'] for q in queries if f'FROM "{table}"' in q['sql']][-1]
+
+    def test_enrollment_fields(self):
+        """Test des champs demandés : réponse et colonnes chargées, sans jointure"""
+        response, sql = self.get(reverse('enrollment-list'), {'fields': 'id,percentage,classe_detail'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = response.data['results'][0]
+        self.assertEqual(list(result), ['id', 'percentage', 'classe_detail'])
+        self.assertEqual(result['classe_detail']['name'], "Terminale")
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('created_at', sql)
+        self.assertNotIn('student_id', sql)
+
+    def test_enrollment_omit(self):
+        """Test des champs exclus : l'élève imbriqué garde sa jointure"""
+        response, sql = self.get(reverse('enrollment-list'), {'omit': 'created_at,updated_at'})
+        result = response.data['results'][0]
+        self.assertNotIn('created_at', result)
+        self.assertEqual(result['student_detail']['full_name'], "KOUAME Jean Marie")
+        self.assertEqual(result['class_section'], "Terminale S")
+        self.assertIn('JOIN "students_student"', sql)
+        self.assertNotIn('"students_enrollment"."created_at"', sql)
+        self.assertNotIn('"students_student"."created_at"', sql)
+
+    def test_student_fields_and_unknown_field(self):
+        """Test sur les élèves, et erreur 400 pour un champ inconnu"""
+        response, sql = self.get(reverse('student-list'), {'fields': 'full_name'})
+        self.assertEqual(response.data['results'], [{'full_name': "KOUAME Jean Marie"}])
+        self.assertNotIn('created_at', sql)
+
+        response = self.client.get(reverse('enrollment-list'), {'fields': 'id,nom', 'omit': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {'fields', 'omit'})
+
+        # Le détail n'est pas concerné
+        response = self.client.get(reverse('student-detail', args=[self.student.pk]), {'fields': 'id'})
+        self.assertIn('enrollments', response.data)
@@ -0,0 +1,80 @@
+import json
+from django.urls import reverse
+from rest_framework import status
+from students.models import Student, Classe, Enrollment
+from students.tests.test_api import APITestCase
+
+
+class AsyncViewsTest(APITestCase):
+    """Tests des vues asynchrones /api/async/ (mêmes réponses que les viewsets)"""
+
+    def setUp(self):
+        super().setUp()
+        premiere = Classe.objects.create(name="Première")
+        for i in range(30):
+            Enrollment.objects.create(
+                student=Student.objects.create(full_name=f"Élève {i:02d}"),
+                school_year=self.school_year, section=self.section,
+                classe=self.classe if i % 2 else premiere, percentage=40 + i
+            )
+
+    def assertSameResponse(self, sync_name, async_name, params=None):
+        """Compare les deux réponses, liens de pagination mis à part"""
+        expected = self.client.get(reverse(sync_name), params)
+        response = self.client.get(reverse(async_name), params)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data, expected_data = json.loads(response.content), json.loads(expected.content)
+        if isinstance(data, dict):
+            for link in ('next', 'previous'):
+                if data.get(link):
+                    data[link] = data[link].replace('/api/async/', '/api/')
+        self.assertEqual(data, expected_data)
+        return data
+
+    def test_student_search(self):
+        """Test de la recherche et de la pagination des élèves"""
+        data = self.assertSameResponse('student-list', 'async-student-list', {'search': 'Élève', 'page': 2})
+        self.assertEqual(data['count'], 30)
+        self.assertIsNotNone(data['previous'])
+
+    def test_enrollment_list_filters_and_ordering(self):
+        """Test des filtres, du tri et des erreurs de la liste des inscriptions"""
+        self.assertSameResponse('enrollment-list', 'async-enrollment-list')
+        self.assertSameResponse(
+            'enrollment-list', 'async-enrollment-list',
+            {'classe': self.classe.pk, 'percentage_min': 50, 'ordering': 'percentage'}
+        )
+        self.assertSameResponse('enrollment-list', 'async-enrollment-list', {'classe': 9999})
+        self.assertSameResponse('enrollment-list', 'async-enrollment-list', {'page': 99})
+        self.assertSameResponse('enrollment-list', 'async-enrollment-list', {'fields': 'id,class_section'})
+        self.assertSameResponse('enrollment-list', 'async-enrollment-list', {'omit': 'inconnu'})
+
+    def test_top_students(self):
+        """Test du classement, de ses filtres et de la validation de limit"""
+        self.assertSameResponse('enrollment-top-students', 'async-top-students', {'limit': 5})
+        self.assertSameResponse(
+            'enrollment-top-students', 'async-top-students', {'classe': 'terminale', 'year': '2023-2024'}
+        )
+        self.assertSameResponse('enrollment-top-students', 'async-top-students', {'classe': 'Inconnue'})
+        self.assertSameResponse('enrollment-top-students', 'async-top-students', {'limit': 'abc'})
+
+    def test_analytics(self):
+        """Test des statistiques globales, avec et sans filtre"""
+        data = self.assertSameResponse('analytics', 'async-analytics')
+        self.assertEqual(data['general_stats']['total_enrollments'], 31)
+        self.assertSameResponse('analytics', 'async-analytics', {'classe': 'prem', 'year': '2023-2024'})
+        self.assertSameResponse('analytics', 'async-analytics', {'section': 'Inconnue'})
+
+    def test_read_only(self):
+        """Test que les vues asynchrones refusent les écritures"""
+        self.authenticate_admin()
+        response = self.client.post(reverse('async-student-list'), {'full_name': 'Nouveau'})
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertFalse(Student.objects.filter(full_name='Nouveau').exists())
+
+    async def test_async_client(self):
+        """Test d'une requête servie par le gestionnaire ASGI"""
+        response = await self.async_client.get(reverse('async-enrollment-list'), {'ordering': '-percentage'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'][0]['percentage'], 85.5)
@@ -0,0 +1,226 @@
+import gzip
+import io
+import os
+import tempfile
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from students.backup import backup_models, read_header, restore_backup, write_backup
+from students.models import (
+    Student, SchoolYear, Classe, Section, Enrollment, ImportJob, DeletionLog
+)
+
+
+class BackupTestCase(TestCase):
+    """Base : quelques inscriptions, un compte et un import, fichier temporaire"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'backup.ndjson.gz')
+
+        year = SchoolYear.objects.create(year="2023-2024")
+        classe = Classe.objects.create(name="Terminale")
+        section = Section.objects.create(name="A")
+        for i, percentage in enumerate([91.5, 74.25, 60.0]):
+            Enrollment.objects.create(
+                student=Student.objects.create(full_name=f"Élève {i}"),
+                school_year=year, classe=classe, section=section, percentage=percentage
+            )
+        self.admin = User.objects.create_superuser('admin', 'admin@test.com', 'pass')
+        Token.objects.create(user=self.admin)
+        ImportJob.objects.create(
+            file='imports/notes.xlsx', created_by=self.admin,
+            errors=[{'row': 3, 'errors': {'pourcentage': ['invalide']}}]
+        )
+
+    def snapshot(self):
+        """État comparable des tables sauvegardées"""
+        return {
+            model._meta.label_lower: list(model._base_manager.order_by('pk').values())
+            for model in backup_models()
+        }
+
+
+class BackupRestoreTest(BackupTestCase):
+    """Tests de la sauvegarde et de la restauration"""
+
+    def test_dependency_order(self):
+        """Test que chaque table suit celles qu'elle référence"""
+        labels = [model._meta.label_lower for model in backup_models()]
+        self.assertLess(labels.index('students.student'), labels.index('students.enrollment'))
+        self.assertLess(labels.index('auth.user'), labels.index('authtoken.token'))
+        self.assertNotIn('sessions.session', labels)
+        self.assertNotIn('students.importjob', [m._meta.label_lower for m in backup_models(['students.importjob'])])
+
+    def test_round_trip_restores_exact_state(self):
+        """Test que la restauration rétablit lignes, identifiants et horodatages"""
+        before = self.snapshot()
+        tables = write_backup(self.path)
+        self.assertEqual(tables['students.enrollment'], 3)
+        self.assertEqual(read_header(self.path)['kind'], 'full')
+
+        Enrollment.objects.filter(percentage__lt=70).delete()
+        Student.objects.create(full_name="Ajouté après la sauvegarde")
+        Enrollment.objects.update(percentage=0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            restored = restore_backup(self.path)
+
+        self.assertEqual(restored, tables)
+        self.assertEqual(self.snapshot(), before)
+        # Les séquences sont recalées : une création ne réutilise pas d'identifiant
+        created = Student.objects.create(full_name="Nouveau")
+        self.assertGreater(created.pk, max(row['id'] for row in before['students.student']))
+
+    def test_truncated_backup_leaves_database_unchanged(self):
+        """Test qu'une sauvegarde tronquée est refusée sans rien modifier"""
+        write_backup(self.path)
+        with gzip.open(self.path, 'rt', encoding='utf-8') as handle:
+            lines = handle.readlines()
+        with gzip.open(self.path, 'wt', encoding='utf-8') as handle:
+            handle.writelines(lines[:-3])
+
+        before = self.snapshot()
+        with self.assertRaisesMessage(ValueError, 'incomplet'):
+            restore_backup(self.path)
+        self.assertEqual(self.snapshot(), before)
+
+    def test_rows_before_table_header(self):
+        """Test du refus de lignes sans en-tête de table"""
+        write_backup(self.path)
+        with gzip.open(self.path, 'rt', encoding='utf-8') as handle:
+            lines = handle.readlines()
+        with gzip.open(self.path, 'wt', encoding='utf-8') as handle:
+            handle.writelines(line for line in lines if not line.startswith('{"model"'))
+
+        before = self.snapshot()
+        with self.assertRaisesMessage(ValueError, 'ligne avant l\'en-tête de table'):
+            restore_backup(self.path)
+        self.assertEqual(self.snapshot(), before)
+
+    def test_not_a_backup(self):
+        """Test du refus d'un fichier qui n'est pas une sauvegarde"""
+        with open(self.path, 'w') as handle:
+            handle.write('[{"model": "students.student"}]')
+        with self.assertRaises(ValueError):
+            read_header(self.path)
+
+
+class IncrementalBackupTest(BackupTestCase):
+    """Tests des sauvegardes incrémentales (updated_at et journal des suppressions)"""
+
+    def setUp(self):
+        super().setUp()
+        self.full = self.path
+        self.incremental = self.path.replace('.ndjson.gz', '_incr.ndjson.gz')
+        write_backup(self.full)
+
+    def change_data(self):
+        """Modification, suppression en cascade et création après la sauvegarde complète"""
+        enrollment = Enrollment.objects.get(percentage=91.5)
+        enrollment.percentage = 95.0
+        enrollment.save()
+        Student.objects.get(full_name="Élève 2").delete()
+        Enrollment.objects.create(
+            student=Student.objects.create(full_name="Nouvel élève"),
+            school_year=SchoolYear.objects.get(), classe=Classe.objects.get(),
+            section=Section.objects.get(), percentage=55.0
+        )
+
+    def test_deletions_are_logged(self):
+        """Test du journal des suppressions, cascades comprises"""
+        self.change_data()
+        self.assertEqual(
+            sorted(DeletionLog.objects.values_list('model', flat=True)),
+            ['students.enrollment', 'students.student']
+        )
+
+    def test_incremental_exports_only_changes(self):
+        """Test que l'incrémentale ne contient que les lignes modifiées"""
+        self.change_data()
+        tables = write_backup(self.incremental, previous=read_header(self.full), overlap=0)
+
+        self.assertEqual(tables['students.enrollment'], 2)
+        self.assertEqual(tables['students.student'], 1)
+        self.assertEqual(tables['students.classe'], 0)
+        # Tables sans updated_at : copiées entières
+        self.assertEqual(tables['auth.user'], 1)
+        header = read_header(self.incremental)
+        self.assertEqual(header['kind'], 'incremental')
+        self.assertEqual(header['previous_watermark'], read_header(self.full)['watermark'])
+
+    def test_restore_full_then_incremental(self):
+        """Test que la complète suivie de l'incrémentale rétablit l'état final"""
+        self.change_data()
+        write_backup(self.incremental, previous=read_header(self.full), overlap=0)
+        expected = self.snapshot()
+
+        Enrollment.objects.all().delete()
+        Student.objects.create(full_name="Ajouté après les sauvegardes")
+        with self.captureOnCommitCallbacks(execute=True):
+            restore_backup(self.full, [self.incremental])
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_overlap_replays_recent_rows(self):
+        """Test que le recouvrement réexporte des lignes sans créer de doublon"""
+        tables = write_backup(self.incremental, previous=read_header(self.full), overlap=3600)
+        self.assertEqual(tables['students.enrollment'], 3)
+
+        expected = self.snapshot()
+        restore_backup(self.full, [self.incremental])
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_chain_is_checked(self):
+        """Test du refus d'une incrémentale seule ou hors séquence"""
+        write_backup(self.incremental, previous=read_header(self.full), overlap=0)
+        with self.assertRaisesMessage(ValueError, 'complète'):
+            restore_backup(self.incremental)
+        with self.assertRaisesMessage(ValueError, 'ne fait pas suite'):
+            restore_backup(self.full, [self.incremental, self.incremental])
+
+
+class BackupCommandsTest(BackupTestCase):
+    """Tests des commandes backup_db et restore_db"""
+
+    def test_backup_and_restore_commands(self):
+        """Test d'un aller-retour avec les commandes"""
+        out = io.StringIO()
+        call_command('backup_db', self.path, stdout=out)
+        self.assertIn('students.enrollment: 3 lignes', out.getvalue())
+
+        Student.objects.all().delete()
+        out = io.StringIO()
+        call_command('restore_db', self.path, '--noinput', stdout=out)
+        self.assertIn('lignes restaurées', out.getvalue())
+        self.assertEqual(Enrollment.objects.count(), 3)
+
+    def test_incremental_commands(self):
+        """Test d'une incrémentale avec purge du journal, puis restauration de la chaîne"""
+        incremental = self.path.replace('.ndjson.gz', '_incr.ndjson.gz')
+        call_command('backup_db', self.path, stdout=io.StringIO())
+        Student.objects.get(full_name="Élève 0").delete()
+
+        out = io.StringIO()
+        call_command(
+            'backup_db', incremental, '--incremental', self.path, '--overlap', '0',
+            '--prune-deletions', stdout=out
+        )
+        self.assertIn('Sauvegarde incrémentale', out.getvalue())
+        # Élève et inscription supprimés avant le watermark : inutiles ensuite
+        self.assertIn('2 suppressions purgées', out.getvalue())
+        self.assertFalse(DeletionLog.objects.exists())
+
+        Student.objects.create(full_name="Élève 0")
+        call_command('restore_db', self.path, incremental, '--noinput', stdout=io.StringIO())
+        self.assertFalse(Student.objects.filter(full_name="Élève 0").exists())
+        self.assertEqual(Enrollment.objects.count(), 2)
+
+    def test_restore_invalid_file(self):
+        """Test de l'erreur de commande sur un fichier invalide"""
+        with open(self.path, 'wb') as handle:
+            handle.write(b'not a backup')
+        with self.assertRaises(CommandError):
+            call_command('restore_db', self.path, '--noinput', stdout=io.StringIO())
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from students import coalesce
+from students.models import Student, Enrollment
+from .test_api import APITestCase
+
+
+class SingleFlightTest(SimpleTestCase):
+    """Tests du calcul unique des requêtes identiques simultanées"""
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        time.sleep(0.1)
+        return {'calls': self.calls}
+
+    def test_concurrent_callers_compute_once(self):
+        """Test que des appels simultanés attendent un seul calcul"""
+        key = coalesce.result_key('test', 'concurrent')
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(coalesce.single_flight(key, self.compute, 60)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'calls': 1}] * 8)
+
+        # Puis servi depuis le cache, jusqu'à invalidation
+        self.assertEqual(coalesce.single_flight(key, self.compute, 60), {'calls': 1})
+        coalesce.invalidate()
+        key = coalesce.result_key('test', 'concurrent')
+        self.assertEqual(coalesce.single_flight(key, self.compute, 60), {'calls': 2})
+
+    def test_error_releases_lock(self):
+        """Test qu'un calcul en erreur laisse l'appel suivant calculer"""
+        key = coalesce.result_key('test', 'error')
+
+        def fail():
+            raise ValueError('calcul en échec')
+
+        with self.assertRaises(ValueError):
+            coalesce.single_flight(key, fail, 60)
+        self.assertEqual(coalesce.single_flight(key, self.compute, 60), {'calls': 1})
+
+    @override_settings(SINGLE_FLIGHT_TIMEOUT=0.05)
+    def test_waiter_computes_after_timeout(self):
+        """Test qu'un verrou jamais libéré n'immobilise pas les appels suivants"""
+        key = coalesce.result_key('test', 'stuck')
+        cache.add(f'{key}:lock', 1, 60)
+        self.assertEqual(coalesce.single_flight(key, self.compute, 60), {'calls': 1})
+
+    def test_async_callers_compute_once(self):
+        """Test du calcul unique pour les vues asynchrones"""
+        key = coalesce.result_key('test', 'async')
+
+        async def compute():
+            self.calls += 1
+            await asyncio.sleep(0.1)
+            return self.calls
+
+        async def main():
+            return await asyncio.gather(*[coalesce.asingle_flight(key, compute, 60) for _ in range(5)])
+
+        self.assertEqual(asyncio.run(main()), [1] * 5)
+        self.assertEqual(self.calls, 1)
+
+
+def throttle_rate(rate):
+    return override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'anon_expensive': rate},
+    })
+
+
+class ExpensiveEndpointsTest(APITestCase):
+    """Tests du cache des analytics et de la limite de débit des clients anonymes"""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('analytics')
+
+    def test_analytics_cached_until_write(self):
+        """Test que les analytics sont servies depuis le cache jusqu'à la prochaine écriture"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['general_stats']['total_enrollments'], 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).data, response.data)
+        # Résultat partagé avec la vue asynchrone
+        self.assertEqual(self.client.get(reverse('async-analytics')).json(), response.json())
+
+        Enrollment.objects.create(
+            student=Student.objects.create(full_name="Nouvel Élève"), school_year=self.school_year,
+            classe=self.classe, section=self.section, percentage=50
+        )
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['general_stats']['total_enrollments'], 2)
+        self.assertEqual(response.data['entity_counts']['total_students'], 2)
+
+    @throttle_rate('2/min')
+    def test_anonymous_clients_throttled(self):
+        """Test de la limite des clients anonymes, sans effet pour les utilisateurs authentifiés"""
+        for name in ['analytics', 'enrollment-top-students', 'async-analytics', 'async-top-students']:
+            with self.subTest(name=name):
+                cache.clear()
+                url = reverse(name)
+                for _ in range(2):
+                    self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+                self.assertTrue(0 < int(response['Retry-After']) <= 60)
+
+                # Adresse distincte : autre client
+                self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.2').status_code, status.HTTP_200_OK)
+                self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user_token.key}')
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+                self.client.credentials()
+
+        # Autres lectures non limitées
+        self.assertEqual(self.client.get(reverse('enrollment-list')).status_code, status.HTTP_200_OK)
+
+    def test_throttling_disabled_by_default(self):
+        """Test qu'aucune limite n'est appliquée sans ANON_EXPENSIVE_THROTTLE_RATE"""
+        self.assertIsNone(settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['anon_expensive'])
+        for _ in range(5):
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
@@ -0,0 +1,144 @@
+import io
+import os
+import tempfile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, LiveServerTestCase
+from django.urls import reverse
+import pandas as pd
+from palmaresimara.benchmark import free_port, percentile, run_load
+from students.datasets import DatasetGenerator, DatasetSpec
+from students.models import Student, SchoolYear, Classe, Enrollment
+
+
+class DatasetGeneratorTest(TestCase):
+    """Tests pour le générateur de jeux de données synthétiques"""
+
+    def test_generation_is_deterministic(self):
+        """Test qu'une même graine produit les mêmes lignes"""
+        spec = DatasetSpec(students=50, years=3, seed=7)
+        first = list(DatasetGenerator(spec).rows())
+        second = list(DatasetGenerator(DatasetSpec(students=50, years=3, seed=7)).rows())
+        other = list(DatasetGenerator(DatasetSpec(students=50, years=3, seed=8)).rows())
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    def test_rows_respect_spec(self):
+        """Test des années, classes, pourcentages et de la progression"""
+        spec = DatasetSpec(students=200, years=4, start_year=2020, classes=['A1', 'A2', 'A3'])
+        rows = list(DatasetGenerator(spec).rows())
+
+        self.assertLessEqual({row['annee'] for row in rows}, set(spec.school_years))
+        self.assertLessEqual({row['classe'] for row in rows}, {'A1', 'A2', 'A3'})
+        self.assertTrue(all(0 <= row['pourcentage'] <= 100 for row in rows))
+        self.assertTrue(any(any(c in row['nom_complet'] for c in 'ÉÈéèëï') for row in rows))
+
+    def test_insert_matches_rows(self):
+        """Test que l'insertion en base produit le même jeu que les fichiers"""
+        spec = DatasetSpec(students=120, years=3)
+        rows = list(DatasetGenerator(spec).rows())
+        created = DatasetGenerator(DatasetSpec(students=120, years=3)).insert(batch_size=50)
+
+        self.assertEqual(created, len(rows))
+        self.assertEqual(Student.objects.count(), 120)
+        self.assertEqual(Enrollment.objects.count(), len(rows))
+        self.assertEqual(SchoolYear.objects.count(), 3)
+        self.assertEqual(Classe.objects.count(), len(spec.classes))
+
+
+class GenerateDatasetCommandTest(TestCase):
+    """Tests pour la commande generate_dataset"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_generate_into_database(self):
+        """Test de l'insertion directe en base"""
+        call_command('generate_dataset', '--students', '30', '--years', '2', stdout=io.StringIO())
+
+        self.assertEqual(Student.objects.count(), 30)
+        self.assertEqual(SchoolYear.objects.count(), 2)
+
+    def test_generated_csv_is_importable(self):
+        """Test qu'un fichier CSV généré, une fois importé, donne les effectifs demandés"""
+        path = os.path.join(self.tmpdir.name, 'dataset.csv')
+        call_command(
+            'generate_dataset', '--students', '300', '--years', '3', '--output', path, stdout=io.StringIO()
+        )
+        df = pd.read_csv(path)
+
+        call_command('import_excel', path, stdout=io.StringIO())
+
+        self.assertEqual(df['nom_complet'].nunique(), 300)
+        self.assertEqual(Student.objects.count(), 300)
+        self.assertEqual(Enrollment.objects.count(), len(df))
+
+    def test_generate_excel(self):
+        """Test de l'écriture Excel au format de import_excel"""
+        path = os.path.join(self.tmpdir.name, 'dataset.xlsx')
+        call_command('generate_dataset', '--students', '10', '--output', path, stdout=io.StringIO())
+
+        df = pd.read_excel(path, engine='openpyxl')
+        self.assertEqual(list(df.columns), ['nom_complet', 'annee', 'classe', 'section', 'pourcentage'])
+
+    def test_unsupported_format(self):
+        """Test du rejet d'un format de sortie inconnu"""
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', '--output', os.path.join(self.tmpdir.name, 'x.txt'))
+
+
+class BenchmarkTest(LiveServerTestCase):
+    """Tests pour le banc de charge de l'API"""
+
+    def test_percentile(self):
+        """Test du calcul des percentiles"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50.5)
+        self.assertAlmostEqual(percentile(values, 99), 99.01)
+        self.assertIsNone(percentile([], 95))
+
+    def test_run_load_against_live_server(self):
+        """Test d'un banc avec clients concurrents sur le serveur de test"""
+        DatasetGenerator(DatasetSpec(students=20, years=2)).insert()
+        paths = [reverse('student-list'), reverse('analytics'), '/api/unknown/']
+
+        with self.assertLogs('django.request', 'WARNING'):
+            results = run_load(self.live_server_url, paths, concurrency=3, requests=30)
+
+        self.assertEqual(results['total']['requests'], 30)
+        self.assertEqual(results['paths'][reverse('student-list')]['errors'], 0)
+        self.assertEqual(results['paths']['/api/unknown/']['errors'], 10)
+        self.assertEqual(results['statuses'], {'200': 20, '404': 10})
+        self.assertIsNotNone(results['total']['p99_ms'])
+        self.assertGreater(results['total']['rps'], 0)
+
+    def test_run_load_until(self):
+        """Test de l'arrêt du banc sur condition (fin d'un import, par exemple)"""
+        sent = []
+        results = run_load(
+            self.live_server_url, [reverse('classe-list')], concurrency=1,
+            until=lambda: sent.append(1) or len(sent) > 5,
+        )
+        self.assertEqual(results['total']['requests'], 5)
+
+    def test_unreachable_server(self):
+        """Test qu'un serveur injoignable est signalé au lieu de n'être compté qu'en erreurs"""
+        base_url = f'http://127.0.0.1:{free_port()}'
+        with self.assertRaises(OSError):
+            run_load(base_url, ['/api/'], concurrency=2, requests=4, timeout=1)
+        with self.assertRaisesMessage(CommandError, 'Serveur injoignable'):
+            call_command('benchmark_api', '--base-url', base_url, '--requests', '4', stdout=io.StringIO())
+
+    def test_benchmark_command(self):
+        """Test de la commande benchmark_api"""
+        out = io.StringIO()
+        call_command(
+            'benchmark_api', '--base-url', self.live_server_url,
+            '--endpoint', reverse('student-list'), '--concurrency', '2', '--requests', '6',
+            stdout=out
+        )
+        self.assertIn('requêtes/s', out.getvalue())
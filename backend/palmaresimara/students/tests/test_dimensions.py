@@ -0,0 +1,111 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from students import dimensions
+from students.bulk import upsert_enrollments
+from students.cache import bump_version
+from students.models import Classe
+from .test_api import APITestCase
+
+
+class DimensionCacheTest(APITestCase):
+    """Tests du cache en mémoire des années, classes et sections"""
+
+    def setUp(self):
+        # Données de test publiées comme après validation : la copie partagée est lue
+        with self.captureOnCommitCallbacks(execute=True):
+            super().setUp()
+        self.url = reverse('enrollment-list')
+        # Chargé avant les mesures de requêtes
+        dimensions.snapshot(reload=True)
+
+    def get(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        return response, [q['sql'] for q in queries]
+
+    def test_list_without_dimension_joins(self):
+        """Test de la liste : détails des dimensions sans jointure ni requête de validation"""
+        response, queries = self.get({'classe': self.classe.pk, 'section': self.section.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = response.data['results'][0]
+        self.assertEqual(result['classe_detail'], {
+            'id': self.classe.pk, 'name': "Terminale",
+            'created_at': result['classe_detail']['created_at'],
+            'updated_at': result['classe_detail']['updated_at'],
+        })
+        self.assertEqual(result['class_section'], "Terminale S")
+        self.assertEqual(len(queries), 2)
+        for table in ['students_schoolyear', 'students_classe', 'students_section']:
+            self.assertFalse([sql for sql in queries if table in sql], table)
+
+        response, _ = self.get({'year': '2023-2024', 'classe_name': 'TERM'})
+        self.assertEqual(response.data['count'], 1)
+        response, _ = self.get({'classe': 9999})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('classe', response.data)
+
+    def test_writes_invalidate(self):
+        """Test que création et renommage sont visibles aussitôt"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.classe.name = "Tle"
+            self.classe.save()
+            premiere = Classe.objects.create(name="Première")
+        response, _ = self.get({'classe': premiere.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response, _ = self.get()
+        self.assertEqual(response.data['results'][0]['classe_detail']['name'], "Tle")
+
+    def test_other_process_write(self):
+        """Test d'une écriture d'un autre processus : version partagée incrémentée"""
+        # Sans signal dans ce processus : la copie reste valide jusqu'à la version suivante
+        Classe.objects.filter(pk=self.classe.pk).update(name="Tle")
+        self.assertEqual(dimensions.label(Classe, self.classe.pk), "Terminale")
+        bump_version(dimensions.NAMESPACE)
+        response, queries = self.get()
+        self.assertEqual(response.data['results'][0]['class_section'], "Tle S")
+        self.assertTrue([sql for sql in queries if 'students_classe' in sql])
+
+    @override_settings(DIMENSION_CACHE_CHECK_INTERVAL=0)
+    def test_process_local_cache_expires(self):
+        """Test d'un renommage sans version partagée (cache propre à un autre processus)"""
+        dimensions.snapshot()
+        Classe.objects.filter(pk=self.classe.pk).update(name="Tle")
+        self.assertEqual(dimensions.label(Classe, self.classe.pk), "Tle")
+
+    @override_settings(DIMENSION_CACHE_CHECK_INTERVAL=0)
+    def test_unknown_label_reloads(self):
+        """Test d'un filtre par nom sur une dimension créée ailleurs"""
+        Classe.objects.bulk_create([Classe(name="Seconde")])
+        self.assertEqual(dimensions.ids(Classe, exact="Seconde"), [Classe.objects.get(name="Seconde").pk])
+
+    def test_top_students_scope_from_cache(self):
+        """Test que top_students résout année, classe et section sans requête sur les dimensions"""
+        url = reverse('enrollment-top-students')
+        for path in [url, reverse('async-top-students')]:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(path, {'year': '2023-2024', 'classe': 'terminale', 'section': 's'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([entry['id'] for entry in response.json()], [self.enrollment.pk])
+            for table in ['students_schoolyear', 'students_classe', 'students_section']:
+                self.assertFalse([q['sql'] for q in queries if table in q['sql']], table)
+        response = self.client.get(url, {'classe': 'Inconnue'})
+        self.assertEqual(response.json(), [])
+
+    @override_settings(DIMENSION_CACHE_CHECK_INTERVAL=0)
+    def test_unknown_id_reloads(self):
+        """Test d'un identifiant inconnu de la copie (créé ailleurs, sans version)"""
+        Classe.objects.bulk_create([Classe(name="Seconde")])
+        seconde = Classe.objects.get(name="Seconde")
+        self.assertEqual(dimensions.label(Classe, seconde.pk), "Seconde")
+
+    def test_bulk_upsert_creates_dimensions(self):
+        """Test que les dimensions créées par l'upsert en masse sont connues"""
+        with self.captureOnCommitCallbacks(execute=True):
+            upsert_enrollments([{'student_name': "BULK Élève", 'year': '2024-2025',
+                                 'classe_name': 'Première', 'section_name': 'S', 'percentage': 80}])
+        response, _ = self.get({'year': '2024-2025', 'classe_name': 'prem'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['school_year_detail']['year'], '2024-2025')
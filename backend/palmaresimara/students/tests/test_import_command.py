@@ -1,10 +1,21 @@
+import io
 import os
+import shutil
 import tempfile
-from django.test import TestCase
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
 from django.core.management import call_command
 from django.core.management.base import CommandError
+from django.urls import reverse
+from django.utils import timezone
 import pandas as pd
-from students.models import Student, SchoolYear, Classe, Section, Enrollment
+from rest_framework import status
+from rest_framework.test import APIClient
+from students.jobs import STALE_JOB_ERROR, process_pending_jobs, progress_cache_key
+from students.models import Student, SchoolYear, Classe, Section, Enrollment, ImportJob
 
 
 class ImportExcelCommandTest(TestCase):
@@ -154,3 +165,117 @@ class ImportExcelCommandTest(TestCase):
                 
         finally:
             os.unlink(temp_file_incomplete.name)
+
+
+@override_settings(IMPORT_JOBS_WORKERS=0)
+class ImportJobAPITest(TestCase):
+    """Tests pour les imports asynchrones via l'API"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+        self.client = APIClient()
+        admin = User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+        self.client.force_authenticate(admin)
+
+        self.test_data = [
+            {"nom_complet": "KOUAME Jean Marie", "annee": "2023-2024", "classe": "Terminale", "section": "S", "pourcentage": 85.5},
+            {"nom_complet": "BAMBA Marie Claire", "annee": "2023-2024", "classe": "Terminale", "section": "ES", "pourcentage": 92.0},
+        ]
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _upload(self, rows, **options):
+        buffer = io.BytesIO()
+        pd.DataFrame(rows).to_excel(buffer, index=False, engine='openpyxl')
+        upload = SimpleUploadedFile('palmares.xlsx', buffer.getvalue())
+        return self.client.post(reverse('importjob-list'), {'file': upload, **options}, format='multipart')
+
+    def test_upload_and_run_job(self):
+        """Test dépôt d'un fichier puis exécution par le worker"""
+        response = self._upload(self.test_data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], ImportJob.STATUS_PENDING)
+        self.assertEqual(Enrollment.objects.count(), 0)
+
+        self.assertEqual(process_pending_jobs(), 1)
+
+        response = self.client.get(reverse('importjob-detail', kwargs={'pk': response.data['id']}))
+        self.assertEqual(response.data['status'], ImportJob.STATUS_COMPLETED)
+        self.assertEqual(response.data['stage'], ImportJob.STAGE_DONE)
+        self.assertEqual(response.data['rows_processed'], 2)
+        self.assertEqual(response.data['result']['enrollments_created'], 2)
+        self.assertEqual(response.data['errors'], [])
+        self.assertEqual(Enrollment.objects.count(), 2)
+
+    def test_failed_job_reports_errors(self):
+        """Test d'un import en échec (colonnes manquantes)"""
+        response = self._upload([{"nom_complet": "KOUAME Jean Marie"}])
+        process_pending_jobs()
+
+        job = ImportJob.objects.get(pk=response.data['id'])
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertTrue(any('Colonnes manquantes' in error for error in job.errors))
+
+    def test_too_many_errors_keeps_validation_errors(self):
+        """Test que les erreurs de validation sont conservées quand l'import est annulé"""
+        response = self._upload([{**row, 'pourcentage': 150} for row in self.test_data])
+        process_pending_jobs()
+
+        job = ImportJob.objects.get(pk=response.data['id'])
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertEqual(job.errors, [
+            'Ligne 2: Pourcentage invalide: 150',
+            'Ligne 3: Pourcentage invalide: 150',
+            "Trop d'erreurs de validation, import annulé",
+        ])
+
+    @override_settings(IMPORT_JOBS_STALE_AFTER=3600)
+    def test_stale_running_job_is_failed(self):
+        """Test qu'un import resté en cours (processus arrêté) est marqué en échec"""
+        stale, recent = [ImportJob.objects.get(pk=self._upload(self.test_data).data['id']) for _ in range(2)]
+        ImportJob.objects.filter(pk=stale.pk).update(
+            status=ImportJob.STATUS_RUNNING, updated_at=timezone.now() - timedelta(hours=2)
+        )
+        ImportJob.objects.filter(pk=recent.pk).update(status=ImportJob.STATUS_RUNNING, updated_at=timezone.now())
+
+        self.assertEqual(process_pending_jobs(), 0)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, ImportJob.STATUS_FAILED)
+        self.assertEqual(stale.stage, ImportJob.STAGE_DONE)
+        self.assertEqual(stale.errors, [STALE_JOB_ERROR])
+        recent.refresh_from_db()
+        self.assertEqual(recent.status, ImportJob.STATUS_RUNNING)
+
+    def test_running_job_reports_cached_progress(self):
+        """Test que la progression publiée par le worker est exposée"""
+        response = self._upload(self.test_data)
+        job = ImportJob.objects.get(pk=response.data['id'])
+        job.status = ImportJob.STATUS_RUNNING
+        job.save()
+        cache.set(progress_cache_key(job.pk), {
+            'stage': ImportJob.STAGE_IMPORTING, 'rows_total': 2, 'rows_processed': 1, 'rate': 10.0
+        })
+
+        response = self.client.get(reverse('importjob-detail', kwargs={'pk': job.pk}))
+        self.assertEqual(response.data['stage'], ImportJob.STAGE_IMPORTING)
+        self.assertEqual(response.data['rows_processed'], 1)
+        self.assertEqual(response.data['rate'], 10.0)
+        cache.delete(progress_cache_key(job.pk))
+
+    def test_rejects_unsupported_file(self):
+        """Test du refus d'un format de fichier non supporté"""
+        upload = SimpleUploadedFile('palmares.txt', b'hello')
+        response = self.client.post(reverse('importjob-list'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_non_admin_forbidden(self):
+        """Test que les imports sont réservés aux admins"""
+        user = User.objects.create_user(username='user', password='testpass123')
+        self.client.force_authenticate(user)
+        response = self.client.get(reverse('importjob-list'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,87 @@
+from unittest import mock
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from students.models import Student
+
+
+def perf_counter_steps(step=0.01):
+    """Horloge factice avançant de `step` secondes à chaque lecture"""
+    now = 0.0
+    while True:
+        now += step
+        yield now
+
+
+@override_settings(REQUEST_INSTRUMENTATION=True)
+class RequestInstrumentationTest(TestCase):
+    """Tests du middleware d'instrumentation des requêtes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        for i in range(3):
+            Student.objects.create(full_name=f"Student {i}")
+
+    def test_server_timing_header(self):
+        """Test de l'en-tête Server-Timing"""
+        with self.assertLogs('students', 'INFO') as logs:
+            response = self.client.get(reverse('student-list'))
+
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="2 queries"', timing)  # COUNT + page
+        self.assertIn('ser;dur=', timing)
+        self.assertIn('render;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+        self.assertEqual(len(logs.records), 1)
+        line = logs.records[0].getMessage()
+        self.assertIn('path=/api/students/', line)
+        self.assertIn('queries=2', line)
+        self.assertIn('ser_ms=', line)
+        self.assertIn(f'size={len(response.content)}', line)
+        # Connexion déjà ouverte : réutilisée, aucune nouvelle connexion
+        self.assertIn('connections=0', line)
+        self.assertNotIn('pool_size=', line)
+
+    def test_serializer_time(self):
+        """Test que le temps des serializers est mesuré à part"""
+        with mock.patch('palmaresimara.middleware.time.perf_counter', side_effect=perf_counter_steps()):
+            with self.assertLogs('students', 'INFO') as logs:
+                response = self.client.get(reverse('student-list'))
+        ser_ms = float(response['Server-Timing'].split('ser;dur=')[1].split(',')[0])
+        self.assertGreater(ser_ms, 0)
+        self.assertIn(f'ser_ms={ser_ms:.1f}', logs.records[0].getMessage())
+
+    def test_analytics_logger(self):
+        """Test que les requêtes analytics sont journalisées sur le logger analytics"""
+        with self.assertLogs('analytics', 'INFO'):
+            self.client.get(reverse('analytics'))
+
+    @override_settings(INSTRUMENTATION_MAX_QUERIES=1)
+    def test_threshold_flags_request(self):
+        """Test du signalement des requêtes dépassant les seuils"""
+        with self.assertLogs('students', 'WARNING') as logs:
+            self.client.get(reverse('student-list'))
+        self.assertIn('flags=too_many_queries', logs.records[0].getMessage())
+
+    def test_pool_metrics(self):
+        """Test de l'état du pool de connexions dans les logs"""
+        pool = mock.Mock()
+        pool.get_stats.return_value = {
+            'pool_min': 2, 'pool_max': 4, 'pool_size': 4, 'pool_available': 0, 'requests_waiting': 3
+        }
+        with mock.patch.object(connections['default'], 'pool', pool, create=True):
+            with self.assertLogs('students', 'WARNING') as logs:
+                self.client.get(reverse('student-list'))
+
+        line = logs.records[0].getMessage()
+        self.assertIn('pool_size=4 pool_available=0 pool_waiting=3', line)
+        self.assertIn('flags=pool_exhausted', line)
+
+    @override_settings(REQUEST_INSTRUMENTATION=False)
+    def test_disabled(self):
+        """Test que le middleware est inactif par défaut"""
+        response = self.client.get(reverse('student-list'))
+        self.assertNotIn('Server-Timing', response)
@@ -0,0 +1,225 @@
+import random
+from unittest import mock
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from students import leaderboard
+from students.bulk import upsert_enrollments
+from students.models import Student, SchoolYear, Classe, Section, Enrollment
+from .test_api import APITestCase
+
+
+class LeaderboardTestCase(APITestCase):
+    """Base : cache vidé, quelques inscriptions sur l'année 2023-2024"""
+
+    def setUp(self):
+        super().setUp()
+        self.premiere = Classe.objects.create(name="Première")
+        self.section_c = Section.objects.create(name="C")
+        for i, percentage in enumerate([95.0, 88.0, 88.0, 76.0, 60.0], 1):
+            Enrollment.objects.create(
+                student=Student.objects.create(full_name=f"Student {i}"),
+                school_year=self.school_year,
+                classe=self.premiere if i % 2 else self.classe,
+                section=self.section_c if i > 3 else self.section,
+                percentage=percentage
+            )
+        self.url = reverse('enrollment-top-students')
+
+    def percentages(self, response):
+        return [entry['percentage'] for entry in response.data]
+
+
+class TopStudentsAPITest(LeaderboardTestCase):
+    """Tests de l'endpoint top_students servi par les classements"""
+
+    def test_ties_at_cutoff_are_included(self):
+        """Test que les ex aequo au seuil sont renvoyés"""
+        response = self.client.get(self.url, {'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.percentages(response), [95.0, 88.0, 88.0])
+
+        response = self.client.get(self.url, {'limit': 4})
+        self.assertEqual(self.percentages(response), [95.0, 88.0, 88.0, 85.5])
+
+    def test_filters_by_year_classe_and_section(self):
+        """Test des périmètres année, classe et section"""
+        response = self.client.get(self.url, {'year': '2023-2024', 'classe': 'première'})
+        self.assertEqual(self.percentages(response), [95.0, 88.0, 60.0])
+
+        response = self.client.get(self.url, {'section': 'C'})
+        self.assertEqual(self.percentages(response), [76.0, 60.0])
+
+        response = self.client.get(self.url, {'year': '1999-2000'})
+        self.assertEqual(response.data, [])
+
+    @override_settings(LEADERBOARD_SIZE=3)
+    def test_limit_is_capped_and_validated(self):
+        """Test du plafond et de la validation de limit"""
+        response = self.client.get(self.url, {'limit': 1000})
+        self.assertEqual(self.percentages(response), [95.0, 88.0, 88.0])
+
+        for limit in ['abc', '0', '-5']:
+            with self.subTest(limit=limit):
+                response = self.client.get(self.url, {'limit': limit})
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_served_from_cache(self):
+        """Test qu'un classement en cache ne coûte aucune requête (filtres résolus en mémoire)"""
+        self.client.get(self.url, {'year': '2023-2024'})
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'year': '2023-2024'})
+        self.assertEqual(len(response.data), 6)
+
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+
+class LeaderboardRefreshTest(LeaderboardTestCase):
+    """Tests de la mise à jour incrémentale des classements"""
+
+    def test_create_update_delete_patch_cache(self):
+        """Test des écritures via l'API sans recalcul depuis la base"""
+        self.authenticate_admin()
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('enrollment-list'), {
+                'student': Student.objects.create(full_name="NEW Student").pk,
+                'school_year': self.school_year.pk,
+                'classe': self.classe.pk,
+                'section': self.section.pk,
+                'percentage': 99.0
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        created = response.data['id']
+
+        self.unauthenticated()
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'limit': 1})
+        self.assertEqual(response.data[0]['id'], created)
+        self.assertEqual(response.data[0]['student_detail']['full_name'], "NEW Student")
+
+        self.authenticate_admin()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('enrollment-detail', args=[created]), {'percentage': 10.0}, format='json')
+        response = self.client.get(self.url)
+        self.assertEqual(self.percentages(response)[0], 95.0)
+        self.assertEqual(self.percentages(response)[-1], 10.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('enrollment-detail', args=[created]))
+        response = self.client.get(self.url)
+        self.assertNotIn(created, [entry['id'] for entry in response.data])
+
+    def test_rename_invalidates(self):
+        """Test qu'un renommage invalide les classements (noms dénormalisés)"""
+        self.client.get(self.url)
+        self.student.full_name = "RENAMED"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.save()
+
+        response = self.client.get(self.url)
+        names = [entry['student_detail']['full_name'] for entry in response.data]
+        self.assertIn("RENAMED", names)
+
+    def test_bulk_writes_refresh_after_commit(self):
+        """Test que les écritures en masse recalculent les classements"""
+        self.client.get(self.url, {'limit': 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            upsert_enrollments([{
+                'student_name': "BULK Student", 'year': '2023-2024',
+                'classe_name': 'Terminale', 'section_name': 'S', 'percentage': 100
+            }])
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'limit': 1})
+        self.assertEqual(response.data[0]['student_detail']['full_name'], "BULK Student")
+
+    def test_save_uses_loaded_scope(self):
+        """Test qu'une écriture retrouve l'ancien périmètre sans relire l'inscription"""
+        self.client.get(self.url, {'classe': 'Terminale'})
+        enrollment = Enrollment.objects.get(pk=self.enrollment.pk)
+        enrollment.classe = self.premiere
+
+        def scope_reads(queries):
+            return [
+                query['sql'] for query in queries
+                if query['sql'].startswith('SELECT') and '"students_enrollment"."classe_id"' in query['sql']
+            ]
+
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            enrollment.save()
+        self.assertEqual(scope_reads(queries), [])
+        response = self.client.get(self.url, {'classe': 'Terminale'})
+        self.assertNotIn(enrollment.pk, [entry['id'] for entry in response.data])
+
+        # Périmètre hors de update_fields : pas de relecture non plus
+        detached = Enrollment(
+            pk=enrollment.pk, student_id=enrollment.student_id, school_year_id=enrollment.school_year_id,
+            classe_id=enrollment.classe_id, section_id=enrollment.section_id, percentage=12.0
+        )
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            detached.save(update_fields=['percentage'])
+        self.assertEqual(scope_reads(queries), [])
+        response = self.client.get(self.url, {'classe': 'Première'})
+        self.assertEqual(self.percentages(response)[-1], 12.0)
+
+    @override_settings(LEADERBOARD_TIMEOUT=3600, LEADERBOARD_LOCAL_TIMEOUT=30)
+    def test_local_cache_short_timeout(self):
+        """Test de la durée de vie courte des classements avec un cache non partagé"""
+        self.assertEqual(leaderboard._timeout(), 30)
+        with mock.patch('students.leaderboard.is_process_local', return_value=False):
+            self.assertEqual(leaderboard._timeout(), 3600)
+
+    @override_settings(LEADERBOARD_SIZE=3)
+    def test_incremental_matches_rebuild(self):
+        """Test que les classements mis à jour restent identiques à un recalcul"""
+        rng = random.Random(1)
+        year2 = SchoolYear.objects.create(year="2024-2025")
+        years = [self.school_year, year2]
+        classes = [self.classe, self.premiere]
+        sections = [self.section, self.section_c]
+        students = list(Student.objects.all())
+
+        def all_scopes():
+            return {
+                scope
+                for year in years for classe in classes for section in sections
+                for scope in leaderboard.scopes_for(year.pk, classe.pk, section.pk)
+            }
+
+        for step in range(30):
+            for scope in all_scopes():
+                leaderboard.get_leaderboard(scope)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                enrollments = list(Enrollment.objects.all())
+                action = rng.random()
+                if action < 0.2 and enrollments:
+                    rng.choice(enrollments).delete()
+                elif action < 0.6 and enrollments:
+                    enrollment = rng.choice(enrollments)
+                    enrollment.percentage = rng.choice([50.0, 70.0, 88.0, 95.0, 99.0])
+                    enrollment.classe = rng.choice(classes)
+                    enrollment.section = rng.choice(sections)
+                    enrollment.save()
+                else:
+                    year = rng.choice(years)
+                    free = [s for s in students if not Enrollment.objects.filter(student=s, school_year=year).exists()]
+                    if free:
+                        Enrollment.objects.create(
+                            student=rng.choice(free), school_year=year,
+                            classe=rng.choice(classes), section=rng.choice(sections),
+                            percentage=rng.choice([50.0, 70.0, 88.0, 95.0, 99.0])
+                        )
+
+            for scope in all_scopes():
+                with self.subTest(step=step, scope=scope):
+                    self.assertEqual(
+                        [e['id'] for e in leaderboard.get_leaderboard(scope)['entries']],
+                        [e['id'] for e in leaderboard.build(scope)['entries']]
+                    )
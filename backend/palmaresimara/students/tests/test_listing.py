@@ -0,0 +1,174 @@
+import io
+import os
+import tempfile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from students import listing
+from students.backup import restore_backup, write_backup
+from students.bulk import upsert_enrollments
+from students.models import Student, SchoolYear, Classe, Enrollment, EnrollmentListing
+from .test_api import APITestCase
+
+
+@override_settings(ENROLLMENT_READ_MODEL=True)
+class ListingTestCase(APITestCase):
+    """Base : vue de lecture activée, deux classes sur deux années"""
+
+    def setUp(self):
+        super().setUp()
+        self.premiere = Classe.objects.create(name="Première")
+        self.other_year = SchoolYear.objects.create(year="2024-2025")
+        for i, percentage in enumerate([95.0, 88.0, 88.0, 76.0, 60.0, 72.5]):
+            Enrollment.objects.create(
+                student=Student.objects.create(full_name=f"Élève {i}"),
+                school_year=self.other_year if i == 5 else self.school_year,
+                classe=self.premiere if i % 2 else self.classe,
+                section=self.section, percentage=percentage
+            )
+
+    def rows(self):
+        return list(EnrollmentListing.objects.order_by('enrollment_id').values())
+
+    def assertInSync(self):
+        """La table tenue à jour ligne à ligne égale sa reconstruction"""
+        rows = self.rows()
+        listing.rebuild()
+        self.assertEqual(rows, self.rows())
+
+
+class ListingSyncTest(ListingTestCase):
+    """Tests de la mise à jour de la vue de lecture"""
+
+    def test_rows_and_ranks(self):
+        """Test des noms recopiés et des rangs (ex aequo compris)"""
+        self.assertEqual(EnrollmentListing.objects.count(), Enrollment.objects.count())
+        row = EnrollmentListing.objects.get(pk=self.enrollment.pk)
+        self.assertEqual(
+            (row.student_name, row.year, row.classe_name, row.section_name, row.percentage),
+            ("KOUAME Jean Marie", "2023-2024", "Terminale", "S", 85.5)
+        )
+        terminale = EnrollmentListing.objects.filter(school_year=self.school_year, classe=self.classe)
+        self.assertEqual(
+            list(terminale.values_list('percentage', 'rank')),
+            [(95.0, 1), (88.0, 2), (85.5, 3), (60.0, 4)]
+        )
+        self.assertInSync()
+
+    def test_update_move_and_delete(self):
+        """Test des rangs après modification, changement de classe et suppression"""
+        enrollment = Enrollment.objects.get(percentage=60.0)
+        enrollment.percentage = 99
+        enrollment.save()
+        self.assertEqual(EnrollmentListing.objects.get(pk=enrollment.pk).rank, 1)
+        self.assertInSync()
+
+        enrollment.classe = self.premiere
+        enrollment.save()
+        self.assertInSync()
+
+        Enrollment.objects.filter(percentage=88.0).first().delete()
+        self.assertInSync()
+        self.assertEqual(EnrollmentListing.objects.count(), Enrollment.objects.count())
+
+    def test_renames(self):
+        """Test que les renommages sont recopiés"""
+        self.student.full_name = "KOUAME Jean"
+        self.student.save()
+        self.classe.name = "Tle"
+        self.classe.save()
+        row = EnrollmentListing.objects.get(pk=self.enrollment.pk)
+        self.assertEqual((row.student_name, row.classe_name), ("KOUAME Jean", "Tle"))
+        self.assertInSync()
+
+    def test_bulk_writes_rebuild_changed_years(self):
+        """Test des écritures en masse : reconstruction des années modifiées"""
+        upsert_enrollments([
+            {'student_name': "BULK Élève", 'year': '2024-2025', 'classe_name': 'Première',
+             'section_name': 'S', 'percentage': 80},
+            {'student_name': "Élève 5", 'year': '2024-2025', 'classe_name': 'Première',
+             'section_name': 'S', 'percentage': 90},
+        ])
+        self.assertEqual(
+            list(EnrollmentListing.objects.filter(year='2024-2025').values_list('student_name', 'rank')),
+            [("Élève 5", 1), ("BULK Élève", 2)]
+        )
+        self.assertInSync()
+
+    def test_restore_rebuilds_listing(self):
+        """Test que la restauration, hors table de lecture, la reconstruit"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'backup.ndjson.gz')
+            tables = write_backup(path)
+            self.assertNotIn('students.enrollmentlisting', tables)
+            before = self.rows()
+            Enrollment.objects.update(percentage=0)
+            restore_backup(path)
+        self.assertEqual(self.rows(), before)
+
+    @override_settings(ENROLLMENT_READ_MODEL=False)
+    def test_disabled(self):
+        """Test que la table n'est pas tenue à jour si la vue est désactivée"""
+        EnrollmentListing.objects.all().delete()
+        Enrollment.objects.create(
+            student=self.student, school_year=self.other_year,
+            classe=self.classe, section=self.section, percentage=50
+        )
+        self.assertFalse(EnrollmentListing.objects.exists())
+
+        out = io.StringIO()
+        call_command('rebuild_listing', '--year', '2024-2025', stdout=out)
+        self.assertIn('2 inscriptions recopiées', out.getvalue())
+        self.assertEqual(EnrollmentListing.objects.count(), 2)
+
+
+class ListingAPITest(ListingTestCase):
+    """Tests de la liste des inscriptions servie par la vue de lecture"""
+
+    def assertSameList(self, params=None):
+        """
+        Même réponse que sans vue de lecture, à l'ordre des ex aequo près
+        (indéterminé sans vue de lecture)
+        """
+        url = reverse('enrollment-list')
+        response = self.client.get(url, params)
+        with override_settings(ENROLLMENT_READ_MODEL=False):
+            expected = self.client.get(url, params)
+        self.assertEqual(response.status_code, expected.status_code)
+        if 'results' not in expected.data:
+            self.assertEqual(response.data, expected.data)
+            return response
+
+        results, expected_results = response.data['results'], expected.data['results']
+        self.assertEqual(response.data['count'], expected.data['count'])
+        self.assertEqual(
+            [(r['school_year'], r['percentage']) for r in results],
+            [(r['school_year'], r['percentage']) for r in expected_results]
+        )
+        self.assertEqual(sorted(results, key=lambda r: r['id']), sorted(expected_results, key=lambda r: r['id']))
+        return response
+
+    def test_same_results(self):
+        """Test des filtres, de la recherche et du tri"""
+        response = self.assertSameList()
+        self.assertEqual(response.data['count'], 7)
+        self.assertSameList({'year': '2023-2024', 'classe_name': 'prem'})
+        self.assertSameList({'classe': self.classe.pk, 'percentage_min': 80, 'ordering': 'percentage'})
+        self.assertSameList({'search': 'KOUAME', 'section': self.section.pk})
+        self.assertSameList({'percentage_range_min': 70, 'percentage_range_max': 90})
+        self.assertSameList({'ordering': 'school_year__year,-percentage'})
+        self.assertSameList({'classe': 9999})
+        self.assertSameList({'page': 99})
+        self.assertSameList({'omit': 'student_detail,created_at'})
+
+    def test_page_reads_listing_only(self):
+        """Test que filtres, tri et comptage ne joignent pas les autres tables"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('enrollment-list'), {'classe_name': 'term'})
+        self.assertEqual(response.data['count'], 4)
+        listing_queries = [q['sql'] for q in queries if 'students_enrollmentlisting' in q['sql']]
+        self.assertEqual(len(listing_queries), 2)
+        for sql in listing_queries:
+            self.assertNotIn('JOIN', sql)
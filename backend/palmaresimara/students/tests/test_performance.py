@@ -0,0 +1,231 @@
+"""
+Tests de performance : budgets de requêtes SQL par endpoint et temps de
+réponse comparés à une référence enregistrée.
+
+Les budgets de requêtes sont exécutés avec la suite. Les temps de réponse,
+qui dépendent de la machine, ne le sont qu'à la demande (PERF_TESTS=1,
+tâche séparée de l'intégration continue, `make test-perf`) :
+
+    PERF_TESTS=1 python manage.py test students.tests.test_performance --tag performance_timing
+
+Les budgets ne dépendent pas du volume : ils sont vérifiés sur un petit jeu
+de données (BUDGET_STUDENTS élèves sur 3 années). Celui des temps de réponse
+est paramétrable par variables d'environnement : PERF_STUDENTS (défaut
+10000) élèves inscrits sur PERF_YEARS (défaut 3) années. Chaque mesure part
+d'un cache vide. Les temps de référence sont dans performance_baseline.json ;
+pour les régénérer :
+
+    PERF_RECORD_BASELINE=1 python manage.py test students.tests.test_performance
+
+Le débit de /api/enrollments/bulk/ (au moins 50 fois celui des POST
+unitaires) est mesuré de la même façon, à la demande.
+
+Ces tests portent le tag `performance` (exclusion possible avec
+--exclude-tag performance), les temps de réponse aussi `performance_timing`.
+"""
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, tag
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from students import dimensions
+from students.datasets import DatasetGenerator, DatasetSpec
+from students.models import Student, SchoolYear, Classe, Section, Enrollment
+
+
+# Assez pour remplir les pages et les classements, sans ralentir la suite
+BUDGET_STUDENTS = 300
+PERF_STUDENTS = int(os.getenv('PERF_STUDENTS', '10000'))
+PERF_YEARS = int(os.getenv('PERF_YEARS', '3'))
+PERF_TOLERANCE = float(os.getenv('PERF_TOLERANCE', '3.0'))
+PERF_SLACK_MS = float(os.getenv('PERF_SLACK_MS', '50'))
+RECORD_BASELINE = os.getenv('PERF_RECORD_BASELINE') == '1'
+# Temps de réponse mesurés seulement à la demande (ou pour enregistrer la référence)
+RUN_TIMING = os.getenv('PERF_TESTS') == '1' or RECORD_BASELINE
+BASELINE_FILE = Path(__file__).with_name('performance_baseline.json')
+
+
+def seed_dataset(students, years, seed=42):
+    """Crée un jeu de données réaliste par insertions en masse"""
+    DatasetGenerator(DatasetSpec(students=students, years=years, seed=seed)).insert()
+
+
+@tag('performance')
+class PerformanceTestCase(TestCase):
+    """Jeu de données partagé par les tests de performance"""
+
+    students = BUDGET_STUDENTS
+    years = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(cls.students, cls.years)
+        cls.admin_user = User.objects.create_superuser('perfadmin', password='testpass123')
+        cls.year = SchoolYear.objects.order_by('-year').first()
+        cls.classe = Classe.objects.get(name='Terminale')
+        cls.student = Student.objects.first()
+        cls.enrollment = Enrollment.objects.first()
+
+    def setUp(self):
+        cache.clear()
+        # Cache des dimensions chargé : les budgets ne comptent pas son chargement
+        dimensions.snapshot(reload=True)
+        self.client = APIClient()
+
+    def endpoints(self):
+        """(nom, url, paramètres, budget de requêtes) pour chaque endpoint surveillé"""
+        year = self.year.year
+        return [
+            ('students-list', reverse('student-list'), {}, 2),
+            ('students-search', reverse('student-list'), {'search': 'marie'}, 2),
+            ('students-retrieve', reverse('student-detail', args=[self.student.pk]), {}, 2),
+            ('students-enrollments', reverse('student-enrollments', args=[self.student.pk]), {}, 3),
+            ('enrollments-list', reverse('enrollment-list'), {}, 2),
+            ('enrollments-filtered', reverse('enrollment-list'), {'year': year, 'classe_name': 'Term'}, 2),
+            ('enrollments-retrieve', reverse('enrollment-detail', args=[self.enrollment.pk]), {}, 1),
+            ('enrollments-top-students', reverse('enrollment-top-students'), {'year': year}, 2),
+            ('enrollments-by-class', reverse('enrollment-by-class'), {'year': year, 'classe': 'Terminale'}, 2),
+            ('analytics', reverse('analytics'), {}, 9),
+            ('analytics-filtered', reverse('analytics'), {'year': year, 'classe': 'Term'}, 9),
+            ('class-analytics', reverse('class-analytics', args=[self.classe.pk]), {}, 3),
+            ('pivot-analytics', reverse('pivot-analytics'), {'group_by': ['year,classe', 'classe,section']}, 1),
+            ('progression-analytics', reverse('progression-analytics'), {'year': year}, 2),
+        ]
+
+    def admin_changelists(self):
+        """(nom, url, budget de requêtes) pour les listes de l'administration"""
+        return [
+            (f'admin-{model._meta.model_name}',
+             reverse(f'admin:students_{model._meta.model_name}_changelist'),
+             budget)
+            for model, budget in [
+                (SchoolYear, 5), (Classe, 5), (Section, 5), (Student, 9), (Enrollment, 8),
+            ]
+        ]
+
+
+class QueryBudgetTest(PerformanceTestCase):
+    """Budgets de requêtes SQL : détecte les régressions N+1"""
+
+    def test_api_query_budgets(self):
+        """Test du nombre de requêtes de chaque endpoint de l'API"""
+        for name, url, params, budget in self.endpoints():
+            with self.subTest(endpoint=name):
+                with self.assertNumQueries(budget):
+                    response = self.client.get(url, params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_admin_changelist_query_budgets(self):
+        """Test du nombre de requêtes des listes de l'administration"""
+        self.client.force_login(self.admin_user)
+        for name, url, budget in self.admin_changelists():
+            with self.subTest(changelist=name):
+                with self.assertNumQueries(budget):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@tag('performance_timing')
+@skipUnless(RUN_TIMING, 'Temps de réponse mesurés à la demande (PERF_TESTS=1)')
+class ResponseTimeTest(PerformanceTestCase):
+    """Temps de réponse comparés à la référence enregistrée"""
+
+    students = PERF_STUDENTS
+    years = PERF_YEARS
+    repeat = 3
+
+    def measure(self, url, params=None):
+        """Médiane du temps de réponse à froid (cache vidé) en millisecondes"""
+        timings = []
+        for _ in range(self.repeat):
+            # Sans cela, seule la première mesure calcule la réponse
+            cache.clear()
+            dimensions.snapshot(reload=True)
+            start = time.perf_counter()
+            response = self.client.get(url, params or {})
+            timings.append((time.perf_counter() - start) * 1000)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return statistics.median(timings)
+
+    def test_response_times_against_baseline(self):
+        """Test des temps de réponse (référence × PERF_TOLERANCE + PERF_SLACK_MS)"""
+        self.client.force_login(self.admin_user)
+        timings = {name: self.measure(url, params) for name, url, params, _ in self.endpoints()}
+        timings.update({name: self.measure(url) for name, url, _ in self.admin_changelists()})
+
+        dataset = {'students': self.students, 'years': self.years}
+        if RECORD_BASELINE:
+            BASELINE_FILE.write_text(json.dumps(
+                {'dataset': dataset, 'timings_ms': {k: round(v, 1) for k, v in timings.items()}},
+                indent=2
+            ) + '\n')
+            return
+
+        if not BASELINE_FILE.exists():
+            self.skipTest('Aucune référence enregistrée (PERF_RECORD_BASELINE=1)')
+        baseline = json.loads(BASELINE_FILE.read_text())
+        if baseline['dataset'] != dataset:
+            self.skipTest('Référence enregistrée pour un autre jeu de données')
+
+        for name, elapsed in timings.items():
+            if name not in baseline['timings_ms']:
+                continue
+            allowed = baseline['timings_ms'][name] * PERF_TOLERANCE + PERF_SLACK_MS
+            with self.subTest(endpoint=name):
+                self.assertLessEqual(
+                    elapsed, allowed,
+                    f'{name}: {elapsed:.1f} ms (référence {baseline["timings_ms"][name]} ms)'
+                )
+
+
+@tag('performance', 'performance_timing')
+@skipUnless(RUN_TIMING, 'Débits mesurés à la demande (PERF_TESTS=1)')
+class BulkThroughputTest(TestCase):
+    """Débit de /api/enrollments/bulk/ comparé aux POST unitaires"""
+
+    single_rows = 100
+    bulk_rows = 5000
+    min_speedup = 50
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_login(User.objects.create_superuser('bulkadmin', password='testpass123'))
+        self.year = SchoolYear.objects.create(year='2023-2024')
+        self.classe = Classe.objects.create(name='Terminale')
+        self.section = Section.objects.create(name='S')
+        self.students = Student.objects.bulk_create(
+            Student(full_name=f'Élève {i:05d}') for i in range(self.single_rows + self.bulk_rows)
+        )
+
+    def row(self, student, percentage):
+        return {
+            'student': student.pk, 'school_year': self.year.pk,
+            'classe': self.classe.pk, 'section': self.section.pk, 'percentage': percentage,
+        }
+
+    def test_bulk_at_least_50x_single_rows(self):
+        """Test du débit en lignes/s : bulk ≥ 50 × POST unitaires"""
+        start = time.perf_counter()
+        for i, student in enumerate(self.students[:self.single_rows]):
+            response = self.client.post(reverse('enrollment-list'), self.row(student, i % 100), format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        single_rate = self.single_rows / (time.perf_counter() - start)
+
+        rows = [self.row(student, i % 100) for i, student in enumerate(self.students[self.single_rows:])]
+        start = time.perf_counter()
+        response = self.client.post(reverse('enrollment-bulk'), rows, format='json')
+        bulk_rate = self.bulk_rows / (time.perf_counter() - start)
+        self.assertEqual(response.data['created'], self.bulk_rows)
+
+        self.assertGreaterEqual(
+            bulk_rate / single_rate, self.min_speedup,
+            f'bulk {bulk_rate:.0f} lignes/s, unitaire {single_rate:.0f} lignes/s'
+        )
@@ -0,0 +1,49 @@
+import io
+from django.core.management import call_command
+from django.test import TestCase
+from students.management.commands.explain_queries import summarize_plan
+from students.models import Student, SchoolYear, Classe, Section, Enrollment
+
+
+class QueryPlansTest(TestCase):
+    """Tests des index des requêtes fréquentes et de la commande explain_queries"""
+
+    def setUp(self):
+        year = SchoolYear.objects.create(year="2023-2024")
+        classe = Classe.objects.create(name="Terminale")
+        section = Section.objects.create(name="A")
+        for i in range(20):
+            Enrollment.objects.create(
+                student=Student.objects.create(full_name=f"Élève {i}"),
+                school_year=year, classe=classe, section=section, percentage=40 + i
+            )
+
+    def test_summarize_sqlite_and_postgresql_plans(self):
+        """Test de la lecture des plans SQLite et PostgreSQL"""
+        self.assertEqual(summarize_plan(
+            '13 0 0 SEARCH students_enrollment USING INDEX enrollment_year_pct_idx (school_year_id=?)\n'
+            '20 0 0 SEARCH students_student USING INTEGER PRIMARY KEY (rowid=?)'
+        ), {'indexes': ['enrollment_year_pct_idx', 'INTEGER PRIMARY KEY'], 'full_scans': [], 'sort': False})
+        self.assertEqual(summarize_plan(
+            '4 0 0 SCAN students_enrollment\n9 0 0 USE TEMP B-TREE FOR ORDER BY'
+        ), {'indexes': [], 'full_scans': ['students_enrollment'], 'sort': True})
+        self.assertEqual(summarize_plan(
+            'Limit  (cost=0.29..2.51 rows=25 width=8)\n'
+            '  ->  Index Only Scan using enrollment_year_pct_idx on students_enrollment\n'
+            '  ->  Sort  (cost=1.1..1.2 rows=3 width=8)\n'
+            '        ->  Seq Scan on students_classe'
+        ), {'indexes': ['enrollment_year_pct_idx'], 'full_scans': ['students_classe'], 'sort': True})
+
+    def test_hot_queries_use_indexes(self):
+        """Test que les listes et classements filtrés sont servis par un index, sans tri"""
+        out = io.StringIO()
+        call_command('explain_queries', '--strict', '--repeat', '0', stdout=out)
+        lines = {line[:40].strip(): line for line in out.getvalue().splitlines()}
+        for name, index in [
+            ('Inscriptions : année', 'enrollment_year_pct_idx'),
+            ('Inscriptions : classe', 'enrollment_classe_pct_idx'),
+            ('Classement : année, classe, section', 'enrollment_scope_pct_idx'),
+            ('Imports en attente', 'importjob_status_created_idx'),
+        ]:
+            self.assertIn(index, lines[name])
+            self.assertIn(' non ', lines[name])
@@ -0,0 +1,151 @@
+import datetime
+import decimal
+import gzip
+import json
+import uuid
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from palmaresimara.compression import accepted_encodings
+from palmaresimara.renderers import ORJSONRenderer, to_columns
+from students.models import Student, Enrollment
+from .test_api import APITestCase
+
+COLUMNAR = 'application/vnd.palmaresimara.columnar+json'
+
+
+class ORJSONRendererTest(SimpleTestCase):
+    """Tests du rendu orjson : mêmes octets que JSONRenderer"""
+
+    def test_same_bytes(self):
+        """Test des types rendus par l'encodeur de DRF"""
+        data = {
+            'floats': [85.5, 0.1 + 0.2, 100.0, None, True],
+            'text': "Élève\u2028KOUAME",
+            1: 'clé entière',
+            'aware': timezone.now(),
+            'naive': datetime.datetime(2024, 1, 2, 3, 4, 5, 123456),
+            'date': datetime.date(2024, 9, 1),
+            'time': datetime.time(8, 30),
+            'decimal': decimal.Decimal('12.50'),
+            'uuid': uuid.uuid4(),
+            'lazy': gettext_lazy("Classe non trouvée"),
+            'tuple': (1, 2),
+            'big': 2 ** 70,
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            ORJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2')
+        )
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class ResponseFormatTestCase(APITestCase):
+    """Base : une page d'inscriptions de plus d'un kilo-octet"""
+
+    def setUp(self):
+        super().setUp()
+        for i in range(20):
+            Enrollment.objects.create(
+                student=Student.objects.create(full_name=f"Élève {i:02d}"),
+                school_year=self.school_year, classe=self.classe,
+                section=self.section, percentage=50 + i
+            )
+
+
+class ORJSONAPITest(ResponseFormatTestCase):
+    """Tests du renderer et du parser orjson sur l'API"""
+
+    def test_list_and_analytics_bytes(self):
+        """Test des réponses : mêmes octets qu'avec JSONRenderer"""
+        for name in ['enrollment-list', 'analytics']:
+            response = self.client.get(reverse(name))
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_parser(self):
+        """Test du corps JSON lu par orjson, et des erreurs de syntaxe"""
+        self.authenticate_admin()
+        url = reverse('student-list')
+        response = self.client.post(url, '{"full_name": "N\'GUESSAN Aïcha"}', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['full_name'], "N'GUESSAN Aïcha")
+        for body in ['{"full_name": ', '{"full_name": NaN}']:
+            response = self.client.post(url, body, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('JSON parse error', response.data['detail'])
+
+
+@override_settings(RESPONSE_COMPRESSION_MIN_SIZE=1024)
+class CompressionTest(ResponseFormatTestCase):
+    """Tests de la compression des réponses"""
+
+    def test_gzip_above_threshold(self):
+        """Test d'une page compressée, identique une fois décompressée"""
+        plain = self.client.get(reverse('enrollment-list'))
+        response = self.client.get(reverse('enrollment-list'), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content) / 3)
+
+    def test_small_or_refused(self):
+        """Test des réponses sous le seuil et des encodages refusés"""
+        response = self.client.get(reverse('classe-list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+        response = self.client.get(reverse('enrollment-list'), HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(accepted_encodings('br;q=1.0, gzip;q=0.5, *;q=0'), {'br', 'gzip'})
+
+    def test_html_not_compressed(self):
+        """Test que les pages HTML (jeton CSRF) ne sont pas compressées (BREACH)"""
+        response = self.client.get(reverse('admin:login'), HTTP_ACCEPT_ENCODING='gzip, br, zstd')
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
+        self.assertGreaterEqual(len(response.content), 1024)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertIn(b'csrfmiddlewaretoken', response.content)
+
+    def test_stream_compressed(self):
+        """Test du flux groupé, compressé au fil de l'eau"""
+        url = reverse('enrollment-by-class')
+        response = self.client.get(url, {'stream': 'true'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(data[0]['count'], 21)
+
+
+class ColumnarRendererTest(ResponseFormatTestCase):
+    """Tests du JSON en colonnes"""
+
+    def test_to_columns(self):
+        """Test de la transposition des listes d'objets"""
+        self.assertEqual(
+            to_columns({'count': 2, 'results': [{'a': 1, 'b': {'c': 2}}, {'a': 3, 'b': None}]}),
+            {'count': 2, 'results': {'a': [1, 3], 'b': [{'c': 2}, None]}}
+        )
+        # Clés différentes ou liste vide : inchangées
+        self.assertEqual(to_columns([{'a': 1}, {'b': 2}]), [{'a': 1}, {'b': 2}])
+        self.assertEqual(to_columns({'results': []}), {'results': []})
+
+    def test_list_and_analytics(self):
+        """Test du format choisi par Accept ou ?format=, sur les listes et les analytics"""
+        expected = self.client.get(reverse('enrollment-list')).json()
+        response = self.client.get(reverse('enrollment-list'), HTTP_ACCEPT=COLUMNAR)
+        self.assertEqual(response['Content-Type'], COLUMNAR)
+        data = json.loads(response.content)
+        self.assertEqual(data['count'], expected['count'])
+        self.assertEqual(data['results']['percentage'], [row['percentage'] for row in expected['results']])
+
+        for name in ['analytics', 'async-analytics']:
+            response = self.client.get(reverse(name), {'format': 'columnar'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = json.loads(response.content)
+            self.assertEqual(data['stats_by_class']['classe__name'], ["Terminale"])
+
+        response = self.client.get(reverse('async-enrollment-list'), HTTP_ACCEPT='application/xml')
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
@@ -0,0 +1,108 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from palmaresimara.routers import ReplicaRouter, use_replica
+from students import coalesce
+from students.models import Student, SchoolYear, Classe, Section
+
+
+@override_settings(REPLICA_DATABASES=['replica_1', 'replica_2'])
+class ReplicaRouterTest(SimpleTestCase):
+    """Tests du routeur de réplicas"""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_on_replica_only_inside_block(self):
+        """Test que seules les lectures du bloc use_replica() partent sur un réplica"""
+        self.assertEqual(self.router.db_for_read(Student), 'default')
+        with use_replica():
+            self.assertIn(self.router.db_for_read(Student), ['replica_1', 'replica_2'])
+            # Comptes et jetons : toujours la base principale
+            self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertEqual(self.router.db_for_read(Student), 'default')
+
+    def test_one_replica_per_block(self):
+        """Test que toutes les lectures d'un bloc vont au même réplica"""
+        for _ in range(5):
+            with use_replica():
+                replicas = {self.router.db_for_read(model) for model in [Student, Classe, Student]}
+            self.assertEqual(len(replicas), 1)
+
+        with mock.patch('palmaresimara.routers.random.choice', return_value='replica_2') as choice, use_replica():
+            for _ in range(3):
+                self.router.db_for_read(Student)
+        choice.assert_called_once()
+
+    def test_read_after_write_stays_on_primary(self):
+        """Test que les lectures qui suivent une écriture restent sur la principale"""
+        with use_replica():
+            self.assertEqual(self.router.db_for_write(Student), 'default')
+            self.assertEqual(self.router.db_for_read(Classe), 'default')
+        with use_replica():
+            self.assertNotEqual(self.router.db_for_read(Classe), 'default')
+
+    def test_transaction_stays_on_primary(self):
+        """Test des lectures pendant une transaction ouverte sur la principale"""
+        with use_replica(), mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.router.db_for_read(Student), 'default')
+
+    def test_no_migration_on_replicas(self):
+        """Test que les réplicas ne reçoivent pas de migrations"""
+        self.assertTrue(self.router.allow_migrate('default', 'students'))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'students'))
+
+
+@override_settings(
+    DATABASE_ROUTERS=['palmaresimara.routers.ReplicaRouter'],
+    REPLICA_DATABASES=['replica_1'],
+)
+class ReplicaRoutingViewTest(TransactionTestCase):
+    """Tests des vues servies par les réplicas (hors transaction de test)"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@test.com', 'pass'))
+        self.student = Student.objects.create(full_name="Student 1")
+        self.year = SchoolYear.objects.create(year="2023-2024")
+        self.classe = Classe.objects.create(name="Terminale")
+        self.section = Section.objects.create(name="A")
+        # Le réplica choisi est la base de test elle-même
+        patcher = mock.patch('palmaresimara.routers.random.choice', return_value='default')
+        self.choice = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_routed_to_replica(self):
+        """Test que les lectures des élèves, inscriptions et analytics vont au réplica"""
+        for url in [
+            reverse('student-list'), reverse('enrollment-list'), reverse('analytics'),
+            reverse('async-enrollment-list'), reverse('async-analytics'),
+        ]:
+            with self.subTest(url=url):
+                self.choice.reset_mock()
+                # Analytics synchrone et asynchrone partagent leur résultat en cache
+                coalesce.invalidate()
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                # Un seul tirage par requête, quel que soit le nombre de lectures
+                self.choice.assert_called_once()
+
+        self.choice.reset_mock()
+        self.client.get(reverse('classe-list'))
+        self.assertFalse(self.choice.called)
+
+    def test_writes_stay_on_primary(self):
+        """Test que les écritures et leurs validations lisent la base principale"""
+        response = self.client.post(reverse('enrollment-list'), {
+            'student': self.student.pk,
+            'school_year': self.year.pk,
+            'classe': self.classe.pk,
+            'section': self.section.pk,
+            'percentage': 75.0
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(self.choice.called)
@@ -0,0 +1,76 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from django.conf import settings
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Base non SQLite')
+class SQLiteTuningTest(SimpleTestCase):
+    """
+    Tests du profil SQLite de production (SQLITE_TUNING_OPTIONS, appliqué
+    avec SQLITE_TUNING=True) sur une base fichier
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'tuning.sqlite3')
+        self.writer = self.connect()
+        self.reader = self.connect()
+
+    def connect(self):
+        """Connexion Django avec les options du profil, sur la base fichier"""
+        options = {**connection.settings_dict['OPTIONS'], **settings.SQLITE_TUNING_OPTIONS}
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict, 'NAME': self.path, 'OPTIONS': options}, alias='tuning'
+        )
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_pragmas_applied(self):
+        """Test des PRAGMA exécutés à l'ouverture de chaque connexion"""
+        with self.reader.cursor() as cursor:
+            pragmas = {
+                name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                for name in ['journal_mode', 'synchronous', 'temp_store', 'busy_timeout']
+            }
+        self.assertEqual(pragmas, {
+            'journal_mode': 'wal', 'synchronous': 1, 'temp_store': 2, 'busy_timeout': 20000
+        })
+        self.assertLess(self.reader.cursor().execute('PRAGMA cache_size').fetchone()[0], 0)
+
+    def test_readers_not_blocked_by_import(self):
+        """Test qu'une transaction d'écriture réserve le verrou sans bloquer les lectures"""
+        with self.writer.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, label TEXT)')
+            cursor.execute("INSERT INTO item (label) VALUES ('initial')")
+
+        # Transaction ouverte comme par transaction.atomic() : BEGIN IMMEDIATE
+        self.writer._start_transaction_under_autocommit()
+        try:
+            with self.writer.cursor() as cursor:
+                cursor.executemany(
+                    'INSERT INTO item (label) VALUES (%s)', [('x' * 500,)] * 20000
+                )
+
+            # Les lectures voient l'état validé, sans attendre l'écrivain
+            with self.reader.cursor() as cursor:
+                cursor.execute('SELECT COUNT(*) FROM item')
+                self.assertEqual(cursor.fetchone()[0], 1)
+
+            # Le verrou d'écriture est déjà pris : un second écrivain attend
+            other = sqlite3.connect(self.path, timeout=0)
+            self.addCleanup(other.close)
+            with self.assertRaisesMessage(sqlite3.OperationalError, 'locked'):
+                other.execute('BEGIN IMMEDIATE')
+        finally:
+            self.writer.connection.commit()
+            self.writer.set_autocommit(True)
+
+        with self.reader.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM item')
+            self.assertEqual(cursor.fetchone()[0], 20001)
@@ -0,0 +1,98 @@
+import io
+import os
+import tempfile
+from unittest import mock
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import pandas as pd
+from rest_framework import status
+from analytics.warming import warm_caches
+from students import leaderboard
+from students.models import Student, SchoolYear, Enrollment
+from .test_api import APITestCase
+
+
+class CacheWarmingTest(APITestCase):
+    """Tests du préchauffage des caches (analytics, classes, classements)"""
+
+    def setUp(self):
+        super().setUp()
+        self.other_year = SchoolYear.objects.create(year="2022-2023")
+        Enrollment.objects.create(
+            student=Student.objects.create(full_name="Ancien Élève"), school_year=self.other_year,
+            classe=self.classe, section=self.section, percentage=70
+        )
+
+    def assertCached(self, url, params=None):
+        with self.assertNumQueries(0):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_warm_years(self):
+        """Test que les lectures des années préchauffées ne font plus de requête"""
+        counts = warm_caches([self.school_year.pk])
+        self.assertEqual(counts, {'analytics': 3, 'class_analytics': 2, 'leaderboards': 4, 'errors': 0})
+
+        analytics = reverse('analytics')
+        self.assertCached(analytics)
+        self.assertCached(analytics, {'year': '2023-2024'})
+        self.assertCached(analytics, {'year': '2023-2024', 'classe': 'Terminale'})
+        class_analytics = reverse('class-analytics', args=[self.classe.pk])
+        self.assertCached(class_analytics)
+        self.assertCached(class_analytics, {'year': '2023-2024'})
+        for scope in [
+            (None, None, None), (self.school_year.pk, None, None),
+            (self.school_year.pk, self.classe.pk, None), (self.school_year.pk, self.classe.pk, self.section.pk),
+        ]:
+            with self.assertNumQueries(0):
+                leaderboard.get_leaderboard(scope)
+
+        # Année non préchauffée
+        with self.assertNumQueries(1):
+            leaderboard.get_leaderboard((self.other_year.pk, None, None))
+        response = self.client.get(analytics, {'year': '2022-2023'})
+        self.assertEqual(response.data['general_stats']['total_enrollments'], 1)
+
+    @mock.patch('analytics.warming.is_process_local', return_value=False)
+    def test_command(self, is_process_local):
+        """Test de la commande warm_caches (cache partagé)"""
+        call_command('warm_caches', '--year', '2022-2023', stdout=io.StringIO())
+        self.assertCached(reverse('analytics'), {'year': '2022-2023'})
+        with self.assertRaises(CommandError):
+            call_command('warm_caches', '--year', '1999-2000', stdout=io.StringIO())
+
+    def test_command_skipped_with_local_cache(self):
+        """Test qu'une commande ne préchauffe pas un cache propre à son processus"""
+        stdout = io.StringIO()
+        call_command('warm_caches', stdout=stdout)
+        self.assertIn('préchauffage ignoré', stdout.getvalue())
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('analytics'))
+        self.assertTrue(queries)
+
+    @mock.patch('analytics.warming.is_process_local', return_value=False)
+    def test_after_import(self, is_process_local):
+        """Test du préchauffage des années importées à la validation de l'import (cache partagé)"""
+        handle = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
+        handle.close()
+        self.addCleanup(os.unlink, handle.name)
+        pd.DataFrame([
+            {"nom_complet": "KOUAME Jean Marie", "annee": "2024-2025", "classe": "Terminale",
+             "section": "S", "pourcentage": 85.5},
+        ]).to_excel(handle.name, index=False, engine='openpyxl')
+
+        params = {'year': '2024-2025', 'classe': 'Terminale'}
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_excel', handle.name, '--no-warm-caches', stdout=io.StringIO())
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('analytics'), params)
+        self.assertTrue(queries)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_excel', handle.name, '--update', stdout=io.StringIO())
+        self.assertCached(reverse('analytics'), params)
+        response = self.client.get(reverse('analytics'), params)
+        self.assertEqual(response.data['general_stats']['total_enrollments'], 1)
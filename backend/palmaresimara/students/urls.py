@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     SchoolYearViewSet, ClasseViewSet, SectionViewSet,
-    StudentViewSet, EnrollmentViewSet
+    StudentViewSet, EnrollmentViewSet, ImportJobViewSet
 )
 
 # Création du router DRF
@@ -12,6 +12,7 @@ router.register(r'classes', ClasseViewSet, basename='classe')
 router.register(r'sections', SectionViewSet, basename='section')
 router.register(r'students', StudentViewSet, basename='student')
 router.register(r'enrollments', EnrollmentViewSet, basename='enrollment')
+router.register(r'imports', ImportJobViewSet, basename='importjob')
 
 urlpatterns = [
     path('', include(router.urls)),
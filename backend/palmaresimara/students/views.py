@@ -1,16 +1,27 @@
-from rest_framework import viewsets, permissions, status
+from django.conf import settings
+from django.db.models import Prefetch
+from rest_framework import mixins, serializers, viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from palmaresimara.middleware import measure_serialization
+from palmaresimara.routers import use_replica
+from palmaresimara.throttling import ExpensiveAnonRateThrottle
 
-from .models import SchoolYear, Classe, Section, Student, Enrollment
+from .models import SchoolYear, Classe, Section, Student, Enrollment, EnrollmentListing, ImportJob
 from .serializers import (
     SchoolYearSerializer, ClasseSerializer, SectionSerializer,
     StudentSerializer, StudentWithEnrollmentsSerializer,
-    EnrollmentSerializer, EnrollmentDetailSerializer
+    EnrollmentSerializer, EnrollmentDetailSerializer, ImportJobSerializer
 )
 from .filters import StudentFilter, EnrollmentFilter
+from .bulk import upsert_enrollments
+from . import dimensions, leaderboard, listing
+from .jobs import enqueue_import_job
+from .streaming import grouped_json_response
 
 
 class IsAdminOrReadOnly(permissions.BasePermission):
@@ -24,7 +35,120 @@ class IsAdminOrReadOnly(permissions.BasePermission):
         return request.user and request.user.is_staff
 
 
-class SchoolYearViewSet(viewsets.ModelViewSet):
+class ReplicaReadMixin:
+    """
+    Sert les requêtes en lecture (GET, HEAD, OPTIONS) depuis un réplica
+    quand DATABASE_URL_REPLICA_* est configuré ; les écritures, et les
+    lectures qui suivent une écriture, restent sur la base principale
+    """
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in permissions.SAFE_METHODS:
+            with use_replica():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+
+class SerializationTimingMixin:
+    """
+    Temps des serializers relevé par l'instrumentation des requêtes (métrique
+    `ser` de Server-Timing, voir palmaresimara.middleware)
+    """
+    def get_serializer(self, *args, **kwargs):
+        return measure_serialization(super().get_serializer(*args, **kwargs))
+
+
+class SparseFieldsMixin:
+    """
+    Champs partiels sur la liste : `?fields=id,percentage` ne renvoie que ces
+    champs, `?omit=created_at,updated_at` tous sauf ceux-là. Le queryset ne
+    charge alors que les colonnes nécessaires et ne joint que les tables des
+    champs imbriqués demandés (voir SparseFieldsetMixin).
+    """
+    sparse_actions = ('list',)
+
+    def sparse_fields(self):
+        """Champs demandés, ou None (tous) ; ValidationError si l'un est inconnu"""
+        if self.action not in self.sparse_actions:
+            return None
+        if not hasattr(self, '_sparse_fields'):
+            available = list(self.get_serializer_class()().fields)
+            params = {
+                param: [name.strip() for name in self.request.query_params.get(param, '').split(',') if name.strip()]
+                for param in ('fields', 'omit')
+            }
+            errors = {
+                param: [f"Champ inconnu : {name}" for name in names if name not in available]
+                for param, names in params.items()
+            }
+            errors = {param: messages for param, messages in errors.items() if messages}
+            if errors:
+                raise ValidationError(errors)
+
+            fields = None
+            if params['fields'] or params['omit']:
+                fields = [
+                    name for name in available
+                    if (not params['fields'] or name in params['fields']) and name not in params['omit']
+                ]
+            self._sparse_fields = fields
+        return self._sparse_fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.sparse_fields()
+        if fields is not None:
+            queryset = self.get_serializer_class().only_fields(queryset, fields)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.sparse_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+
+# Filtres de top_students : paramètre, dimension et comparaison du libellé
+# (voir dimensions.ids)
+TOP_STUDENTS_SCOPE = [
+    ('year', SchoolYear, 'exact'),
+    ('classe', Classe, 'iexact'),
+    ('section', Section, 'iexact'),
+]
+
+
+def top_students_scope(query_params):
+    """
+    Périmètre de top_students : identifiants (ou None) des filtres donnés par
+    nom, résolus dans le cache des dimensions ; None si l'un est inconnu
+    """
+    scope = []
+    for param, model, comparison in TOP_STUDENTS_SCOPE:
+        value = query_params.get(param)
+        if not value:
+            scope.append(None)
+            continue
+        found = dimensions.ids(model, **{comparison: value})
+        if not found:
+            return None
+        scope.append(min(found))
+    return tuple(scope)
+
+
+def top_students_limit(query_params):
+    """
+    Paramètre `limit` de top_students (10 par défaut), plafonné à
+    LEADERBOARD_SIZE ; ValueError avec le message d'erreur s'il est invalide
+    """
+    try:
+        limit = int(query_params.get('limit', 10))
+    except ValueError:
+        raise ValueError('Le paramètre limit doit être un entier')
+    if limit < 1:
+        raise ValueError('Le paramètre limit doit être positif')
+    return min(limit, settings.LEADERBOARD_SIZE)
+
+
+class SchoolYearViewSet(SerializationTimingMixin, viewsets.ModelViewSet):
     """
     ViewSet pour les années scolaires
     """
@@ -37,7 +161,7 @@ class SchoolYearViewSet(viewsets.ModelViewSet):
     ordering = ['-year']
 
 
-class ClasseViewSet(viewsets.ModelViewSet):
+class ClasseViewSet(SerializationTimingMixin, viewsets.ModelViewSet):
     """
     ViewSet pour les classes
     """
@@ -50,7 +174,7 @@ class ClasseViewSet(viewsets.ModelViewSet):
     ordering = ['name']
 
 
-class SectionViewSet(viewsets.ModelViewSet):
+class SectionViewSet(SerializationTimingMixin, viewsets.ModelViewSet):
     """
     ViewSet pour les sections
     """
@@ -63,7 +187,7 @@ class SectionViewSet(viewsets.ModelViewSet):
     ordering = ['name']
 
 
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(ReplicaReadMixin, SerializationTimingMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     """
     ViewSet pour les élèves
     """
@@ -84,24 +208,40 @@ class StudentViewSet(viewsets.ModelViewSet):
             return StudentWithEnrollmentsSerializer
         return StudentSerializer
     
+    def get_queryset(self):
+        """
+        Précharge l'historique des inscriptions pour le détail
+        (une requête au lieu d'une par inscription imbriquée)
+        """
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch('enrollments', queryset=Enrollment.objects.select_related('student'))
+            )
+        return queryset
+    
     @action(detail=True, methods=['get'])
     def enrollments(self, request, pk=None):
         """
         Retourne les inscriptions d'un élève spécifique
         """
         student = self.get_object()
-        enrollments = student.enrollments.all().order_by('-school_year__year')
+        enrollments = student.enrollments.select_related('student').order_by('-school_year__year', 'id')
+        
+        page = self.paginate_queryset(enrollments)
+        if page is not None:
+            serializer = EnrollmentSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = EnrollmentSerializer(enrollments, many=True)
         return Response(serializer.data)
 
 
-class EnrollmentViewSet(viewsets.ModelViewSet):
+class EnrollmentViewSet(ReplicaReadMixin, SerializationTimingMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     """
     ViewSet pour les inscriptions
     """
-    queryset = Enrollment.objects.select_related(
-        'student', 'school_year', 'classe', 'section'
-    ).all()
+    # Années, classes et sections sérialisées depuis le cache des dimensions
+    queryset = Enrollment.objects.select_related('student').all()
     serializer_class = EnrollmentSerializer
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -118,35 +258,135 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
             return EnrollmentDetailSerializer
         return EnrollmentSerializer
     
-    @action(detail=False, methods=['get'])
-    def top_students(self, request):
+    def list(self, request, *args, **kwargs):
         """
-        Retourne le top 10 des élèves par moyenne
+        Liste des inscriptions. Avec ENROLLMENT_READ_MODEL, filtres, recherche,
+        tri et pagination portent sur la vue de lecture (voir students.listing) :
+        seules les inscriptions de la page sont ensuite chargées.
         """
-        limit = int(request.query_params.get('limit', 10))
-        year = request.query_params.get('year')
-        
-        queryset = self.get_queryset()
-        if year:
-            queryset = queryset.filter(school_year__year=year)
-        
-        top_enrollments = queryset.order_by('-percentage')[:limit]
-        serializer = EnrollmentDetailSerializer(top_enrollments, many=True)
+        if not listing.is_enabled():
+            return super().list(request, *args, **kwargs)
+
+        ids = listing.filter_queryset(request, EnrollmentListing.objects.all()).values_list(
+            'enrollment_id', flat=True
+        )
+        page = self.paginate_queryset(ids)
+        enrollments = listing.in_order(self.get_queryset(), page if page is not None else ids)
+        serializer = self.get_serializer(enrollments, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'], throttle_classes=[ExpensiveAnonRateThrottle])
+    def top_students(self, request):
+        """
+        Retourne le top 10 (ou `limit`) des élèves par moyenne, ex aequo au
+        seuil compris, pour une année, une classe et une section optionnelles.
+
+        Servi depuis les classements précalculés (voir students.leaderboard) ;
+        `limit` est plafonné à LEADERBOARD_SIZE.
+        """
+        try:
+            limit = top_students_limit(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        scope = top_students_scope(request.query_params)
+        if scope is None:
+            return Response([])
+
+        return Response(leaderboard.top(scope, limit))
+    
     @action(detail=False, methods=['get'])
     def by_class(self, request):
         """
-        Retourne les inscriptions groupées par classe
+        Retourne les inscriptions triées par classe, paginées.
+        
+        Avec stream=true, la réponse est un flux JSON groupé par classe,
+        construit au fil d'un itérateur (mémoire constante, sans pagination).
         """
         year = request.query_params.get('year')
         classe = request.query_params.get('classe')
         
         queryset = self.get_queryset()
         if year:
-            queryset = queryset.filter(school_year__year=year)
+            queryset = queryset.filter(school_year_id__in=dimensions.ids(SchoolYear, exact=year))
         if classe:
-            queryset = queryset.filter(classe__name__icontains=classe)
+            queryset = queryset.filter(classe_id__in=dimensions.ids(Classe, contains=classe))
+        queryset = queryset.order_by('classe__name', 'classe_id', '-percentage', 'id')
         
+        if request.query_params.get('stream', '').lower() in ('1', 'true', 'yes'):
+            # Le flux est lu après la vue : on fixe la base choisie maintenant
+            return grouped_json_response(
+                queryset.using(queryset.db),
+                group_by=lambda enrollment: enrollment.classe_id,
+                group_label=lambda enrollment: {
+                    'classe': {'id': enrollment.classe_id, 'name': dimensions.label(Classe, enrollment.classe_id)}
+                },
+                serializer=self.get_serializer(),
+            )
+        
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Crée ou met à jour des inscriptions en masse.
+        
+        Accepte une liste de lignes (ou {"rows": [...], "update": bool}),
+        chaque référence étant donnée par identifiant ou par nom
+        (student_name, year, classe_name, section_name).
+        """
+        payload = request.data
+        update_existing = True
+        if isinstance(payload, dict):
+            try:
+                update_existing = serializers.BooleanField().to_internal_value(payload.get('update', True))
+            except ValidationError:
+                return Response(
+                    {'error': 'Le paramètre update doit être un booléen'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            payload = payload.get('rows')
+        
+        if not isinstance(payload, list):
+            return Response(
+                {'error': 'Une liste de lignes est attendue'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        max_rows = settings.BULK_ENROLLMENT_MAX_ROWS
+        if len(payload) > max_rows:
+            return Response(
+                {'error': f'Trop de lignes: {len(payload)} (maximum {max_rows})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        result = upsert_enrollments(payload, update_existing=update_existing)
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class ImportJobViewSet(SerializationTimingMixin,
+                       mixins.CreateModelMixin,
+                       mixins.RetrieveModelMixin,
+                       mixins.ListModelMixin,
+                       viewsets.GenericViewSet):
+    """
+    ViewSet pour les imports Excel asynchrones (admins seulement).
+    
+    Le fichier déposé est importé en arrière-plan ; le détail de l'import
+    indique l'étape, les lignes traitées, le débit et les erreurs.
+    """
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser, FormParser]
+    filter_backends = []
+    
+    def perform_create(self, serializer):
+        job = serializer.save(created_by=self.request.user)
+        enqueue_import_job(job)
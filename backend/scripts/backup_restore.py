@@ -3,7 +3,11 @@
 Script de sauvegarde et restauration de la base de données.
 Usage: 
   python scripts/backup_restore.py backup [nom_fichier]
-  python scripts/backup_restore.py restore nom_fichier.json
+  python scripts/backup_restore.py incremental [sauvegarde_precedente]
+  python scripts/backup_restore.py restore complete.ndjson.gz [incrementale...]
+
+Utilise les commandes backup_db et restore_db (NDJSON compressé, en flux) ;
+les anciennes sauvegardes .json (dumpdata) sont restaurées avec loaddata.
 """
 
 import os
@@ -13,25 +17,27 @@ import subprocess
 from datetime import datetime
 from pathlib import Path
 
-def run_django_command(command):
-    """Exécute une commande Django."""
-    venv_python = Path('venv/Scripts/python.exe')
-    manage_cmd = f'{venv_python} palmaresimara/manage.py'
-    
-    full_command = f'{manage_cmd} {command}'
-    print(f"Exécution: {full_command}")
+BACKUP_EXTENSION = '.ndjson.gz'
+
+
+def run_django_command(*args):
+    """Exécute une commande Django avec l'interpréteur courant (venv actif)."""
+    command = [sys.executable, str(Path('palmaresimara') / 'manage.py'), *args]
+    print(f"Exécution: {' '.join(command)}")
     
-    result = subprocess.run(full_command, shell=True, capture_output=True, text=True)
+    # Progression affichée en direct, erreurs capturées
+    result = subprocess.run(command, stderr=subprocess.PIPE, text=True)
     return result
 
-def backup_database(filename=None):
-    """Sauvegarde la base de données."""
+def backup_database(filename=None, previous=None):
+    """Sauvegarde la base de données (incrémentale si `previous` est donné)."""
     if filename is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"backup_{timestamp}.json"
+        suffix = '_incr' if previous else ''
+        filename = f"backup_{timestamp}{suffix}{BACKUP_EXTENSION}"
     
-    if not filename.endswith('.json'):
-        filename += '.json'
+    if not filename.endswith(BACKUP_EXTENSION) and not filename.endswith('.json'):
+        filename += BACKUP_EXTENSION
     
     # Créer le répertoire de sauvegarde
     backup_dir = Path('backups')
@@ -41,8 +47,11 @@ def backup_database(filename=None):
     
     print(f"🔄 Sauvegarde de la base de données vers {backup_path}")
     
-    # Utiliser Django dumpdata
-    result = run_django_command(f'dumpdata --indent=2 --natural-foreign --natural-primary > {backup_path}')
+    args = ['backup_db', str(backup_path.resolve())]
+    if previous:
+        print(f"   incrémentale depuis {previous.name}")
+        args += ['--incremental', str(previous.resolve())]
+    result = run_django_command(*args)
     
     if result.returncode == 0:
         print(f"✅ Sauvegarde réussie: {backup_path}")
@@ -57,13 +66,20 @@ def backup_database(filename=None):
         print(result.stderr)
         return False
 
-def restore_database(filename):
-    """Restaure la base de données."""
+def latest_backup():
+    """Sauvegarde la plus récente du répertoire backups."""
+    backups = sorted(Path('backups').glob(f'*{BACKUP_EXTENSION}'), key=lambda path: path.stat().st_mtime)
+    return backups[-1] if backups else None
+
+def restore_database(filename, incrementals=()):
+    """Restaure la base de données (sauvegarde complète puis incrémentales)."""
     backup_path = Path('backups') / filename
+    incremental_paths = [Path('backups') / name for name in incrementals]
     
-    if not backup_path.exists():
-        print(f"❌ Fichier de sauvegarde non trouvé: {backup_path}")
-        return False
+    for path in [backup_path, *incremental_paths]:
+        if not path.exists():
+            print(f"❌ Fichier de sauvegarde non trouvé: {path}")
+            return False
     
     print(f"🔄 Restauration de la base de données depuis {backup_path}")
     print("⚠️  ATTENTION: Cette opération va écraser les données existantes!")
@@ -73,18 +89,25 @@ def restore_database(filename):
         print("Restauration annulée.")
         return False
     
-    # Vider la base de données (flush)
-    print("🗑️  Vidage de la base de données...")
-    result = run_django_command('flush --noinput')
-    
-    if result.returncode != 0:
-        print("❌ Erreur lors du vidage de la base de données:")
-        print(result.stderr)
-        return False
-    
-    # Charger les données
-    print("📥 Chargement des données...")
-    result = run_django_command(f'loaddata {backup_path}')
+    if backup_path.suffix == '.json':
+        # Ancienne sauvegarde dumpdata
+        print("🗑️  Vidage de la base de données...")
+        result = run_django_command('flush', '--noinput')
+        
+        if result.returncode != 0:
+            print("❌ Erreur lors du vidage de la base de données:")
+            print(result.stderr)
+            return False
+        
+        print("📥 Chargement des données...")
+        result = run_django_command('loaddata', str(backup_path.resolve()))
+    else:
+        # Remplacement des tables dans une transaction (base inchangée en cas d'erreur)
+        print("📥 Chargement des données...")
+        result = run_django_command(
+            'restore_db', str(backup_path.resolve()),
+            *[str(path.resolve()) for path in incremental_paths], '--noinput'
+        )
     
     if result.returncode == 0:
         print(f"✅ Restauration réussie depuis {backup_path}")
@@ -102,7 +125,7 @@ def list_backups():
         print("📂 Aucun répertoire de sauvegarde trouvé.")
         return
     
-    backups = list(backup_dir.glob('*.json'))
+    backups = list(backup_dir.glob(f'*{BACKUP_EXTENSION}')) + list(backup_dir.glob('*.json'))
     
     if not backups:
         print("📂 Aucune sauvegarde trouvée.")
@@ -118,7 +141,8 @@ def main():
     if len(sys.argv) < 2:
         print("Usage:")
         print("  python scripts/backup_restore.py backup [nom_fichier]")
-        print("  python scripts/backup_restore.py restore nom_fichier.json")
+        print("  python scripts/backup_restore.py incremental [sauvegarde_precedente]")
+        print(f"  python scripts/backup_restore.py restore complete{BACKUP_EXTENSION} [incrementale...]")
         print("  python scripts/backup_restore.py list")
         sys.exit(1)
     
@@ -133,13 +157,20 @@ def main():
         filename = sys.argv[2] if len(sys.argv) > 2 else None
         backup_database(filename)
     
+    elif command == 'incremental':
+        # Par défaut, à la suite de la sauvegarde la plus récente
+        previous = Path('backups') / sys.argv[2] if len(sys.argv) > 2 else latest_backup()
+        if previous is None or not previous.exists():
+            print("❌ Erreur: aucune sauvegarde précédente (lancer d'abord une sauvegarde complète)")
+            sys.exit(1)
+        backup_database(previous=previous)
+    
     elif command == 'restore':
         if len(sys.argv) < 3:
             print("❌ Erreur: Nom du fichier de sauvegarde requis")
             sys.exit(1)
         
-        filename = sys.argv[2]
-        restore_database(filename)
+        restore_database(sys.argv[2], sys.argv[3:])
     
     elif command == 'list':
         list_backups()